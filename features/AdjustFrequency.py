@@ -1,13 +1,16 @@
 import numpy as np
-from scipy.interpolate import interp1d
 from copy import deepcopy
 from PyQt5 import QtWidgets, QtGui
 
 from util.conf import af_params
+from kernels import frequency
 from features.Feature import Feature
 
 class AdjustFrequency(Feature):
 
+    consumes = ('y',)
+    produces = ('y', 'frequency')
+
     def __init__(self, data, parent=None, liveplot=None):
         
         Feature.__init__(self, 'Adjust Frequency', data, parent, liveplot, display_name_label=False)
@@ -21,10 +24,11 @@ class AdjustFrequency(Feature):
         
         self.initMethodUI()
         self.initParametersUI()
-        
-        # disconnect the usual method because we dont want updates when the method is changed, only graphic updates.
-        self.disconnectMethodCombo()
-        self.method_combo.currentIndexChanged.connect(self.updateParametersUI)
+
+    def methodChanged(self):
+        # we dont want updates when the method is changed, only graphic updates.
+        self.state.method = self.method_combo.currentText()
+        self.updateParametersUI()
 
     def inputConfiguration(self):
         af_params = self.input['object_source_af_params']
@@ -38,11 +42,16 @@ class AdjustFrequency(Feature):
         # set active state
         self.active = active
         # set current method
-        self.method_combo.setCurrentIndex(method)
+        self.state.method = list(self.methods.keys())[method]
         # set parameter
         self.getMethod().parameters['adjusted_frequency'] = adjusted_freq
-        # refresh view
-        self.setButtonLabel(self.getMethod())
+        # refresh view if it shows this state
+        if self.isDisplayed():
+            self.disconnectMethodCombo()
+            self.method_combo.setCurrentIndex(method)
+            self.connectMethodCombo()
+            self.updateParametersUI()
+            self.setButtonLabel(self.getMethod())
 
     
     def initParametersUI(self):
@@ -51,6 +60,10 @@ class AdjustFrequency(Feature):
             method.initButton('adjusted_frequency', self.adjustedFrequencyButton)
             self.setButtonLabel(method)
 
+    def configureGUI(self):
+        for method in self.methods.values():
+            self.setButtonLabel(method)
+
     def show(self):
 
         Feature.show(self)
@@ -94,20 +107,13 @@ class AdjustFrequency(Feature):
     
     # call calculate and give the default frequency as parameter
     def nearestNeighbourWrapper(self, y, object_source_af_params, adjusted_frequency):
-        return self.calculate(y, object_source_af_params[0], adjusted_frequency, 'nearest')
+        return frequency.nearestNeighbour(y, object_source_af_params, adjusted_frequency)
 
     def linearWrapper(self, y, object_source_af_params, adjusted_frequency):
-        return self.calculate(y, object_source_af_params[0], adjusted_frequency, 'linear')
+        return frequency.linear(y, object_source_af_params, adjusted_frequency)
 
     def cubicWrapper(self, y, object_source_af_params, adjusted_frequency):
-        return self.calculate(y, object_source_af_params[0], adjusted_frequency, 'cubic')
-
-    def calculate(self, y, object_source_original_frequency, adjusted_frequency, method):
-        old_x_len = len(y)
-        interpolated = interp1d(range(old_x_len), y, kind = method)
-        factor = adjusted_frequency / object_source_original_frequency
-        new_x = np.linspace(0, old_x_len-1, num=round(factor * old_x_len), endpoint=True)
-        return {'y': interpolated(new_x)}
+        return frequency.cubic(y, object_source_af_params, adjusted_frequency)
 
     def updateLivePlot(self):
         pass
\ No newline at end of file
@@ -9,21 +9,32 @@ from util.conf import bs_roi_params, bs_perisomatic_params
 from util import colors
 from features.Feature import Feature
 from view.ImageView import ImageView
+from kernels import background
 
 class BackgroundSubtraction(Feature):
 
+    # the methods read the displayed image and move the rois of the view
+    cacheable = False
+    threadsafe = False
+
+    consumes = ('y', 'roi')
+    produces = ('y',)
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
         Feature.__init__(self, 'Background Subtraction', data, parent, liveplot)
 
         # data
-        self.input = {'y': None, 'roi_params':None, 'roi_image':None, 'cell': None, 'roi_ellipse_mode': None}
+        self.input = {'y': None, 'roi_params':None, 'roi_image':None, 'roi_ellipse_mode': None}
         self.output = {'background mean':None, 'y':None}
 
         self.imv = self.liveplot
         self.activateFunc = self.showGUI
 
+        # while a roi or the radius is dragged, the preview is calculated from a coarse level of the image pyramid
+        self.coarse_preview = False
+
         ## METHODS ##
 
         # 1 ROI Background Subtraction
@@ -67,9 +78,19 @@ class BackgroundSubtraction(Feature):
         roi_to_show = 'rect_roi' if (self.input['roi_ellipse_mode'] is not None and not self.input['roi_ellipse_mode']) else 'roi'
         self.getMethod().getParametersGUI(roi_to_show).show()
 
+    def configureGUI(self):
+        # the rois show the parameters and the input of the displayed state
+        if self.input['roi_ellipse_mode'] is not None:
+            self.setBackgroundROI(self.methods['ROI'].parameters['background_roi'])
+            if self.input['roi_params'] is not None:
+                self.setPerisomaticROI(self.input['roi_params'], self.methods['Perisomatic'].parameters['radius'])
+        # updateParametersUI shows all rois of the method
+        self.hideROIs()
+        self.showGUI()
+
     def showGUI(self):
         curr_pipeline = self.data.getCurrentPipeline()
-        if self.active and self is curr_pipeline._background_subtraction:
+        if self.active and self.isDisplayed() and self.state is curr_pipeline._background_subtraction:
             if self.input['roi_ellipse_mode'] is not None and not self.input['roi_ellipse_mode']:
                 show = 'rect_roi'
                 hide = 'roi'
@@ -94,7 +115,9 @@ class BackgroundSubtraction(Feature):
 
     def undisplayPlots(self):
         Feature.undisplayPlots(self)
+        self.hideROIs()
 
+    def hideROIs(self):
         # hide the self rois
         for roi_name in ['roi', 'rect_roi']:
             roi_view = self.getMethod().getParametersGUI(roi_name)
@@ -103,7 +126,34 @@ class BackgroundSubtraction(Feature):
 
     def updateOnlyProcessed(self, *args):
         if self.data.cell_selection.preview_mode:
-            self.update(stop_after_processing=True)
+            self.updateCoarsePreview()
+
+    def updateCoarsePreview(self):
+        self.coarse_preview = True
+        self.update(stop_after_processing=True)
+        self.coarse_preview = False
+
+    def previewImage(self):
+        '''
+        returns the image that the roi means are calculated from and the pyramid level it belongs to, or
+            None if it is the full resolution image.
+        '''
+        img = self.imv.getProcessedImage()
+        if self.coarse_preview and self.imv.pyramid is not None:
+            level = self.imv.pyramid.previewLevel()
+            return level.data, level
+        return img, None
+
+    def previewIntegralImage(self):
+        '''
+        returns the integral image that the means of rectangular rois are calculated from while they are dragged,
+            or None. starts building it if it does not exist.
+        '''
+        if not self.coarse_preview or self.input['roi_ellipse_mode']:
+            return None
+        cell_selection = self.data.cell_selection
+        cell_selection.prepareIntegralImage(cell_selection.input['source'])
+        return self.imv.integral_image
 
     def updateROIOnlyProcessed(self, *args):
         self.updateROI(only_processed = True)
@@ -123,7 +173,7 @@ class BackgroundSubtraction(Feature):
             size = (math.ceil(size[0]), math.ceil(size[1]))
             self.methods['ROI'].parameters['background_roi'] = (pos,size,0)
         if only_processed and self.data.cell_selection.preview_mode:
-            self.update(stop_after_processing = True)
+            self.updateCoarsePreview()
         else:
             self.update()
 
@@ -144,68 +194,43 @@ class BackgroundSubtraction(Feature):
         roi.sigRegionChangeFinished.connect(self.updateROIAll)
 
     # roi background subtraction
-    def ROIBackgroundSubtraction(self, y, roi_params, roi_image, cell, roi_ellipse_mode, background_roi):
+    def ROIBackgroundSubtraction(self, y, roi_params, roi_image, roi_ellipse_mode, background_roi):
         """Subtract the mean value of the background ROI from cell mean (frame by frame)."""
 
-        img = self.imv.getProcessedImage()
-
-        if self.input['roi_ellipse_mode']:
-            pos, size, angle = self.methods['ROI'].parameters['background_roi']
-            background_roi = self.methods['ROI'].getParametersGUI('roi')
-            self.disconnectUserROISignals()
-            background_roi.setPos(pos)
-            background_roi.setSize(size)
-            background_roi.setAngle(angle)
-            self.connectUserROISignals()
-            background = background_roi.getArrayRegion(img.view(np.ndarray), self.imv.imageItem, axes=(1,2))
-        else:
-            pos, size, _ = self.methods['ROI'].parameters['background_roi']
-            background_roi = self.methods['ROI'].getParametersGUI('rect_roi')
-            self.disconnectUserROISignals()
-            background_roi.setPos(pos)
-            background_roi.setSize(size)
-            background_roi.setAngle(0)
-            self.connectUserROISignals()
-            _slice = background_roi.getArraySlice(img.view(np.ndarray), self.imv.imageItem, axes=(1,2))
-            background = img[_slice[0]]
+        if self.isDisplayed():
+            self.setBackgroundROI(background_roi)
 
         # get background roi mean
-        background_mean = background.mean(axis=(1,2))
-
-        return {'background mean': background_mean, 'y': y - background_mean}
+        img, level = self.previewImage()
+        return background.roiBackgroundSubtraction(y, roi_params, img, roi_ellipse_mode, background_roi, level, self.previewIntegralImage())
 
     # perisomatic background subtraction
-    def perisomaticBackgroundSubtraction(self, y, roi_params, roi_image, cell, roi_ellipse_mode, radius):
+    def perisomaticBackgroundSubtraction(self, y, roi_params, roi_image, roi_ellipse_mode, radius):
         """Subtract the mean value of the area around cell (defined by radius) from cell mean."""
 
+        # set the radius of the perisomatic roi
+        if self.isDisplayed():
+            self.setPerisomaticROI(roi_params, radius)
+
+        img, level = self.previewImage()
+        return background.perisomaticBackgroundSubtraction(y, roi_params, img, roi_ellipse_mode, radius, level, self.previewIntegralImage())
+
+    def setBackgroundROI(self, background_roi):
+        """Sets the background roi of the view to the parameter, without an update."""
+        pos, size, angle = background_roi
+        roi = self.methods['ROI'].getParametersGUI('roi' if self.input['roi_ellipse_mode'] else 'rect_roi')
+        self.disconnectUserROISignals()
+        roi.setPos(pos)
+        roi.setSize(size)
+        roi.setAngle(angle if self.input['roi_ellipse_mode'] else 0)
+        self.connectUserROISignals()
+
+    def setPerisomaticROI(self, roi_params, radius):
+        """Sets the perisomatic roi of the view around the cell roi."""
         pos, size, angle = roi_params
-
-        # save user defined radius in parameters
-        self.methods['Perisomatic'].parameters['radius'] = radius
-
-        # get perisomatic roi and set its radius
-        roi_name = 'roi' if roi_ellipse_mode else 'rect_roi'
+        roi_name = 'roi' if self.input['roi_ellipse_mode'] else 'rect_roi'
         p_roi = self.methods['Perisomatic'].getParametersGUI(roi_name)
-        angle_of_position = math.radians(angle-135)
-        shift_x = math.sqrt(2) * math.cos(angle_of_position) * radius / 2
-        shift_y = math.sqrt(2) * math.sin(angle_of_position) * radius / 2
-        p_roi.setPos((pos[0] + shift_x, pos[1] + shift_y))
-        p_roi.setSize((size[0] + radius, size[1] + radius))
+        p_pos, p_size = background.perisomaticROI(pos, size, angle, radius)
+        p_roi.setPos(p_pos)
+        p_roi.setSize(p_size)
         p_roi.setAngle(angle)
-
-        # get perisomatic roi data
-        img = self.imv.getProcessedImage()
-        if roi_ellipse_mode:
-            p_cell = p_roi.getArrayRegion(img.view(np.ndarray), self.imv.imageItem, axes=(1,2))
-        else:
-            _slice = p_roi.getArraySlice(img.view(np.ndarray), self.imv.imageItem, axes=(1,2))
-            p_cell = img[_slice[0]]
-
-        # get roi mean. subtract cell mean because p_cell contains the cell and the area around it
-        p_ring = np.sum(p_cell, axis=(1,2)) - np.sum(cell, axis=(1,2))
-        _, p1, p2 = p_cell.shape
-        _, c1, c2 = cell.shape
-        p_ring_size = (p1 * p2) - (c1 * c2)
-        background_mean = p_ring / p_ring_size
-
-        return {'background mean': background_mean, 'y': y - background_mean}
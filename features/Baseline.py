@@ -1,15 +1,20 @@
 from PyQt5 import QtGui, QtWidgets, QtCore
 import pyqtgraph as pg
 import numpy as np
-from copy import copy
 
 from util.conf import bl_moving_average_params, bl_asymmetric_ls_params, bl_polynomial_fitting_params, bl_top_hat_params
 from util import colors
-from util.functions import fitting, getGradient, topHat, als, movingAverage, butter_lowpass_filter
+from kernels import baseline as bl
 from features.Feature import Feature
 
 class Baseline(Feature):
 
+    consumes = ('y',)
+    produces = ('y',)
+
+    # emitted if the asymmetric least squares can not be calculated. the warning is shown on the main thread.
+    als_failed = QtCore.pyqtSignal()
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
@@ -33,6 +38,7 @@ class Baseline(Feature):
         self.addMethod('Moving Average', bl_moving_average_params, self.movingAverageWrapper)
 
         self.activateFunc = self.showMarkers
+        self.als_failed.connect(self.showALSWarning)
 
         self.initMethodUI()
         self.initParametersUI()
@@ -48,8 +54,8 @@ class Baseline(Feature):
 
         updateFunc = self.update
         # poly fit
-        self.methods['Polynomial Fitting'].initSlider('polyorder', slider_params=(0,6,1,1), updateFunc=updateFunc)
-        self.methods['Polynomial Fitting'].getParametersGUI('polyorder').setAbsolutes(0, 6)
+        self.methods['Polynomial Fitting'].initSlider('polyorder', slider_params=(0,20,1,1), updateFunc=updateFunc)
+        self.methods['Polynomial Fitting'].getParametersGUI('polyorder').setAbsolutes(0, 20)
         self.methods['Polynomial Fitting'].initSlider('intercept', slider_params=(0,500,20,1), updateFunc=updateFunc)
         self.methods['Polynomial Fitting'].initCheckbox('use_marker', updateFunc=self.activateMarkers, label='Use Baseline Markers')
         self.methods['Polynomial Fitting'].initButton('Add Marker', updateFunc=self.addMarkerButtonClick)     
@@ -65,6 +71,12 @@ class Baseline(Feature):
         # update GUI
         self.updateParametersUI()
 
+    def configureGUI(self):
+        # the markers show the parameters of the displayed state
+        self.clearMarkers()
+        if self.active:
+            self.showMarkers()
+
     def updateLivePlot(self):
         seconds_range = self.input['object_source'].frameRange()
         baseline = self.output['baseline']
@@ -79,67 +91,42 @@ class Baseline(Feature):
 
     def alsWrapper(self, y, object_source, iterations, smooth, intercept, p=0.001):
         try:
-            baseline = als(y, iterations, smooth, p) + intercept
+            return bl.asymmetricLeastSquares(y, object_source, iterations, smooth, intercept, p)
         except:
-            warning = QtWidgets.QMessageBox(
-                QtWidgets.QMessageBox.Warning,
-                'Method not available',
-                'Asymmetric Least Squares does not work with the data. This is probably due to a memory error. Please choose another method.',
-                buttons = QtWidgets.QMessageBox.Ok,
-                parent = self.data.parent
-                )
-            warning.setWindowModality(QtCore.Qt.NonModal)
-            warning.finished.connect(lambda: self.method_combo.setCurrentIndex(0))
-            warning.show()
+            self.als_failed.emit()
             return {'baseline': None, 'y': None}
-        if object_source.filetype == 'tif':
-            y = getGradient(y, baseline)
-        else:
-            y = y - baseline
-        return {'baseline': baseline, 'y': y}
+
+    def showALSWarning(self):
+        warning = QtWidgets.QMessageBox(
+            QtWidgets.QMessageBox.Warning,
+            'Method not available',
+            'Asymmetric Least Squares does not work with the data. Please choose another method.',
+            buttons = QtWidgets.QMessageBox.Ok,
+            parent = self.data.parent
+            )
+        warning.setWindowModality(QtCore.Qt.NonModal)
+        warning.finished.connect(lambda: self.method_combo.setCurrentIndex(0))
+        warning.show()
 
     def topHatWrapper(self, y, object_source, factor):
-        baseline = topHat(y, factor)
-        if object_source.filetype == 'tif':
-            y = getGradient(y, baseline)
-        else:
-            y = y - baseline
-        return {'baseline': baseline, 'y': y}
+        return bl.topHat(y, object_source, factor)
 
     def movingAverageWrapper(self, y, object_source, window=11):
-        baseline = movingAverage(y, window)
-        if object_source.filetype == 'tif':
-            y = getGradient(y, baseline)
-        else:
-            y = y - baseline
-        return {'baseline': baseline, 'y': y}
+        return bl.movingAverage(y, object_source, window)
+
+    def prepareParameters(self, method):
+        # add markers if degree+1 is higher than the marker number, such that the fitted markers are part of the
+        # parameters and are shown with the live plot
+        source = self.input['object_source']
+        if method.name == 'Polynomial Fitting' and method.parameters['use_marker'] and source is not None:
+            parameters = method.parameters
+            parameters['marker'][:] = bl.completeMarkers(parameters['marker'], parameters['polyorder'], source.end - source.start)
 
     def polyFit(self, y, object_source, intercept, polyorder, use_marker, marker):
         """Polynomial fitting function with optional baseline markers. """
 
-        x = object_source.frameRange()
-
-        if use_marker:
-            # add marker if degree+1 is higher than marker number
-            minMarkerNum = polyorder+1      #degree+1
-            if len(marker) < minMarkerNum:
-                diff = (minMarkerNum-len(marker))
-                if diff == 1:
-                    self.addMarker()
-                else:
-                    pos = (len(y)-1)/diff
-                    for d in range(diff):
-                        self.setMarker(round((d+1)*pos))
-            # make least squares with markers
-            marker = np.array(marker)
-            baseline = fitting(x,marker,y[marker],intercept,polyorder)
-        else:
-            baseline = fitting(x,x,y,intercept,polyorder)
-        if object_source.filetype == 'tif':
-            y = getGradient(y, baseline)
-        else:
-            y = y - baseline
-        return {'baseline': baseline, 'y': y}
+        # make least squares, with markers if use_marker is set
+        return bl.polynomialFitting(y, object_source, intercept, polyorder, use_marker, marker)
 
     ## MARKERS ##
 
@@ -155,35 +142,7 @@ class Baseline(Feature):
         """
 
         positions = self.methods['Polynomial Fitting'].getParameters()['marker']
-
-        # check if initial position is valid
-        valid = True
-        for pos in positions:
-            if pos - min_difference < initial_position < pos + min_difference:
-                valid = False
-                break
-        if valid:
-            return initial_position
-
-        # initial position is not valid. 
-        # copy positions
-        positions = copy(positions)
-
-        # append borders if they are not in there yet
-        if not 0 in positions:
-            positions.append(0)
-        input_len = len(self.input['y'])
-        if not input_len in positions:
-            positions.append(input_len)
-        # sort positions
-        positions = sorted(positions)
-        # find biggest difference
-        best_difference, best_difference_position = max([(positions[i+1] - positions[i], positions[i]) for i in range(len(positions)-1)], key=lambda _tuple:_tuple[0])
-        # check if biggest difference is valid and return
-        if best_difference >= min_difference:
-            return best_difference_position + int(best_difference / 2)
-        else:
-            return -1
+        return bl.validMarkerPosition(positions, initial_position, len(self.input['y']), min_difference)
 
     def activateMarkers(self):
         poly = self.methods['Polynomial Fitting']
@@ -202,7 +161,8 @@ class Baseline(Feature):
             elif diff > 1:
                 pos = int((len(y)-1) / degree)
                 for i in range(0, diff):
-                    self.setMarker(pos * i)
+                    if not self.setMarker(pos * i):
+                        break
         else:
             self.clearMarkers()
             am.hide()
@@ -217,7 +177,7 @@ class Baseline(Feature):
 
     def showMarkers(self):
         curr_pipeline = self.data.getCurrentPipeline()
-        if self.getMethod() != self.methods['Polynomial Fitting'] or not self in curr_pipeline.getPipeline():
+        if self.getMethod() != self.methods['Polynomial Fitting'] or not self.isDisplayed() or self.state is not curr_pipeline._baseline:
             return
         marker = self.methods['Polynomial Fitting'].getParameters()['marker']
         invalid_marker_item = 0 < len([marker_ for marker_, marker_item in zip(marker, self.markerItems) if marker_ != int(marker_item.value())])
@@ -245,12 +205,17 @@ class Baseline(Feature):
     def setMarker(self, pos):
         valid_pos = self.findValidMarkerPosition(pos)
         if valid_pos == -1:
-            print('did not find a valid marker position.')
-            return
+            QtWidgets.QMessageBox.information(self,
+                'Add not possible',
+                'Marker can not be added because there is no valid position left. The missing markers are added when the baseline is calculated.',
+                QtWidgets.QMessageBox.Ok)
+            return False
         poly = self.methods['Polynomial Fitting']
         m = poly.getParameters()['marker']
         m.append(valid_pos)
-        self.createMarkerGUIObject(valid_pos)
+        if self.isDisplayed():
+            self.createMarkerGUIObject(valid_pos)
+        return True
 
     def markerMouseClickEvent(self, mrk, ev):
         if ev.button() == QtCore.Qt.RightButton:
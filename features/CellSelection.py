@@ -4,14 +4,25 @@ import pyqtgraph as pg
 import numpy as np
 import math
 
-from util.conf import cs_roi_params
+from util.conf import cs_roi_params, ii_params
 from util import colors
+from util.functions import isSameView
 from features.Feature import Feature
 from view.ImageView import ImageView
 from model.Object import Object
+from model.extraction import extractMeans
+from model.ImagePyramid import ImagePyramid, usePyramid
+from model.IntegralImage import IntegralImage
+from threads.Worker import Worker
 
 class CellSelection(Feature):
 
+    # the method reads the displayed image
+    cacheable = False
+    threadsafe = False
+
+    produces = ('y', 'roi')
+
     def __init__(self, data, parent=None, liveplot=None):
         # Init Feature
         Feature.__init__(self, 'Cell Selection', data, parent, liveplot, display_name_label=False)
@@ -27,10 +38,11 @@ class CellSelection(Feature):
         self.show_user_roi = False
         self.ellipse_mode = True
         self.update_on_ellipse_mode_change = True
+        self.coarse_preview = False
 
         # data
         self.input = {'source':None, 'roi_ellipse_mode': None}
-        self.output = {'cell':None, 'cell mean':None, 'roi':None}
+        self.output = {'cell mean':None, 'roi':None}
 
         # view / plot
         self.imv = ImageView()
@@ -162,11 +174,13 @@ class CellSelection(Feature):
         source = self.input['source']
         if source is not None:
             if source.filetype == 'tif':
-                if not np.array_equal(self.imv.image, source.getData()):
+                if not isSameView(self.imv.image, source.getData()):
                     self.imv.setImage(source.getData(), xvals = source.frameRange())
                     self.imv.showPlot()
                     if not (source.start <= self.imv.timeLine.value() <= source.end):
                         self.imv.timeLine.setValue(source.start)
+                    self.preparePyramid(source)
+                    self.setIntegralImage(source)
                 self.show_user_roi = True
             else:
                 self.imv.clear()
@@ -191,6 +205,67 @@ class CellSelection(Feature):
             self.show_user_roi = False
             self.getUserROI().hide()
 
+    def preparePyramid(self, source):
+        '''
+        sets the image pyramid of the source data to the imageview. if it does not exist, it is built in
+            the background and set when it is done, if the source data is still displayed.
+        '''
+        data = source.getData()
+        pyramid = source._pyramid
+        if pyramid is not None and isSameView(pyramid.data, data):
+            self.imv.setPyramid(pyramid if pyramid.built else None)
+            return
+        self.imv.setPyramid(None)
+        if not usePyramid(data):
+            return
+        source._pyramid = ImagePyramid(data)
+
+        def work(pyramid):
+            pyramid.build()
+            return pyramid
+
+        def callback(result):
+            pyramid = result['result']
+            if isSameView(self.imv.image, pyramid.data):
+                self.imv.setPyramid(pyramid)
+
+        worker = Worker(work = work, kwargs = {'pyramid': source._pyramid}, callback = callback)
+        QtCore.QThreadPool.globalInstance().start(worker)
+
+    def setIntegralImage(self, source):
+        '''
+        sets the integral image of the source data to the imageview, if it is built.
+        '''
+        integral_image = source._integral_image
+        if integral_image is not None and integral_image.built and isSameView(integral_image.data, source.getData()):
+            self.imv.integral_image = integral_image
+        else:
+            self.imv.integral_image = None
+
+    def prepareIntegralImage(self, source):
+        '''
+        builds the integral image of the source data in the background, if it does not exist, and sets it to the
+            imageview when it is done, if the source data is still displayed. called when a rectangular roi is
+            dragged, such that the integral image is only built for sources where it is used.
+        '''
+        data = source.getData()
+        integral_image = source._integral_image
+        if not ii_params['active'] or (integral_image is not None and isSameView(integral_image.data, data)):
+            return
+        source._integral_image = IntegralImage(data)
+
+        def work(integral_image):
+            integral_image.build()
+            return integral_image
+
+        def callback(result):
+            integral_image = result['result']
+            if isSameView(self.imv.image, integral_image.data):
+                self.imv.integral_image = integral_image
+
+        worker = Worker(work = work, kwargs = {'integral_image': source._integral_image}, callback = callback)
+        QtCore.QThreadPool.globalInstance().start(worker)
+
     def updateROIAll(self):
         self.updateROI(only_processed = False)
 
@@ -210,52 +285,47 @@ class CellSelection(Feature):
             self.methods['ROI'].parameters['roi'] = (pos,size,0)
 
         if not prevent_calculation:
-            self.update(stop_after_processing = only_processed and self.preview_mode)
+            # while the roi is dragged, the preview is calculated from a coarse level of the image pyramid
+            self.coarse_preview = only_processed and self.preview_mode
+            self.update(stop_after_processing = self.coarse_preview)
+            self.coarse_preview = False
 
     def calculateROI(self, source, roi_ellipse_mode, roi):
         if source.filetype == 'tif':
 
-            img = self.imv.getProcessedImage()
-
-            if roi_ellipse_mode:
-                ellipse_roi = self.methods['ROI'].getParametersGUI('roi')
-                pos, size, angle = self.methods['ROI'].parameters['roi']
-                self.disconnectUserROISignals()
-                ellipse_roi.setPos(pos)
-                ellipse_roi.setSize(size)
-                ellipse_roi.setAngle(angle)
-                self.connectUserROISignals()
-                cell = ellipse_roi.getArrayRegion(img.view(np.ndarray), self.imv.imageItem, axes=(1,2))
+            # set the user roi graphics
+            pos, size, angle = self.methods['ROI'].parameters['roi']
+            user_roi = self.methods['ROI'].getParametersGUI('roi' if roi_ellipse_mode else 'rect_roi')
+            self.disconnectUserROISignals()
+            user_roi.setPos(pos)
+            user_roi.setSize(size)
+            user_roi.setAngle(angle if roi_ellipse_mode else 0)
+            self.connectUserROISignals()
+
+            # Get ROI mean data. the frames are read in blocks, with the same pixel weights as getArrayRegion
+            # (ellipse) and getArraySlice (rectangle)
+            data = source.getData()
+            if self.coarse_preview and not roi_ellipse_mode:
+                # the exact means of dragged rectangles are calculated from the integral image
+                self.prepareIntegralImage(source)
+            if self.coarse_preview and not roi_ellipse_mode and self.imv.integral_image is not None:
+                cell_mean = self.imv.integral_image.rectMeans([(pos, size)], source.getPrecision())[0]
+            elif self.coarse_preview and self.imv.pyramid is not None:
+                cell_mean = self.imv.pyramid.previewLevel().extractMeans([(pos, size, angle, roi_ellipse_mode)], len(data), source.getPrecision())[0]
             else:
-                rect_roi = self.methods['ROI'].getParametersGUI('rect_roi')
-                pos, size, _ = self.methods['ROI'].parameters['roi']
-                self.disconnectUserROISignals()
-                rect_roi.setPos(pos)
-                rect_roi.setSize(size)
-                rect_roi.setAngle(0)
-                self.connectUserROISignals()
-                _slice = rect_roi.getArraySlice(img.view(np.ndarray), self.imv.imageItem, axes=(1,2))
-                cell = img[_slice[0]]
-
-            # Get ROI mean data
-            cell_mean = cell.mean(axis=(1,2))
+                cell_mean = extractMeans(data, [(pos, size, angle, roi_ellipse_mode)], dtype = source.getPrecision())[0]
 
-            # read roi params out of saved params
-            pos, size, angle = self.methods['ROI'].parameters['roi'] 
-            
-            return {'cell':cell,'cell mean':cell_mean,'roi':(cell_mean, pos, size, angle)}
+            return {'cell mean':cell_mean,'roi':(cell_mean, pos, size, angle)}
         else:
-            return {'cell': None, 'cell mean': None, 'roi': None}
+            return {'cell mean': None, 'roi': None}
 
     def editROI(self, roi_index):
         if self.allowEditROI and self.input['source'].filetype == 'tif':
             method = self.getMethod()
             pos, size, angle = method.parameters['roi']
             cell_mean = self.output['cell mean']
-            cell = self.output['cell']
             edit_data = {
                 'cell_mean': cell_mean,
-                'cell': cell,
                 'pos': pos,
                 'angle': angle,
                 'size': size
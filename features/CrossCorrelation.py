@@ -2,10 +2,8 @@
 from PyQt5 import QtGui, QtWidgets, QtCore
 import pyqtgraph as pg
 import numpy as np
-import math
-from scipy.signal import firwin, lfilter, lfilter_zi, hilbert, correlate
 
-from util.functions import movingAverage
+from kernels import correlation
 from features.Feature import Feature
 from util.conf import cc_train_params, cc_amplitude_params
 
@@ -150,35 +148,11 @@ class CrossCorrelation(Feature):
                 for j in range(i+1, n):
                     self.liveplot.setData('CC {} -- {}'.format(names[i], names[j]), [], [])
 
-    def adjustFrequencies(self, signals, freqs):
-        """
-        Input: a list of signals and their corresponding frequencies.
-        Return: the signals adjusted in a way such that their frequencies are adapted to the lowest of all
-        frequencies. Also, the lowest frequency.
-        """
-        min_freq = min(freqs)
-        for signal_index, freq in zip(range(len(signals)), freqs):
-            if freq != min_freq:
-                signal_len = len(signals[signal_index])
-                new_signal_len = math.ceil(signal_len * min_freq / freq)
-                signals[signal_index] = np.interp(np.linspace(0, signal_len-1, num = new_signal_len), np.arange(signal_len), signals[signal_index])
-        return signals, min_freq
-
-    def sliceSignals(self, len1, len2, offset1, offset2):
-        """
-        Input: the length of two signals and their offsets. Both values shall be given in amount of frames.
-        Return: the slices for the signals that determine the area where the signals are well-defined.
-        Example:
-        #           length          offset          well-defined    combined        slices
-        signal1     10              1               1-10            3-10            2-9
-        signal2     15              3               3-17            3-10            0-7
-        """
-        start = max(offset1, offset2)
-        end = min(offset1 + len1, offset2 + len2)
-        return slice(start-offset1, end-offset1), slice(start-offset2, end-offset2)
-
 class SpikeCrossCorrelation(CrossCorrelation):
 
+    consumes = ('trains_data', 'frequency')
+    produces = ()
+
     def __init__(self, data, parent=None, liveplot=None):
         CrossCorrelation.__init__(self, data, 'Spike Cross Correlation', 'trains_data', parent, liveplot, step_mode = True)
 
@@ -196,93 +170,13 @@ class SpikeCrossCorrelation(CrossCorrelation):
         self.updateParametersUI()
 
     def trainCorrelation(self, trains_data, binfactor, maxlag):
-        '''
-        binfactor: factor that will be multiplied with 1/freq to give binsize
-        '''
-
-        trains = [data['train'] for data in trains_data if data['train'] is not None]
-        freqs = [data['freq'] for data in trains_data if data['train'] is not None]
-        offsets = [data['offset'] for data in trains_data if data['train'] is not None]
-
-        n = len(trains)
-
-        if n < 2:
-            # TODO throw ui error: need multiple Objects with active eventdetection
-            return {'xrange': None, 'correlation': None, 'coefficient': None, 'delay':None, 'delay coefficient': None}
-
-        trains, freq = self.adjustFrequencies(trains, freqs)
-        offsets = [round(offset * freq) for offset in offsets]
-
-        lens = [len(train) for train in trains]
-
-        # bins
-        binsize = binfactor / freq
-        number_of_bins = round(maxlag/binsize)
-        #bins = np.arange(-number_of_bins-0.5, number_of_bins+0.5)*binsize
-        bins = np.arange(-number_of_bins, number_of_bins + 1) * binsize
-        
-        cc = np.zeros((n,n), dtype=object)
-        delay = np.zeros((n,n))
-        coef = np.zeros((n,n))
-        delay_coefficient = np.zeros((n,n))
-        
-        for i in range(n-1):
-            for j in range(i+1, n):
-
-                slice1, slice2 = self.sliceSignals(lens[i], lens[j], offsets[i], offsets[j])
-
-                data1 = trains[i][slice1]
-                data2 = trains[j][slice2]
-                
-                if len(data1) == 0 or len(data2) == 0:
-                    cc[i,j] = []
-                    delay[i,j] = np.nan
-                    coef[i,j] = np.nan
-                    delay_coefficient[i,j] = np.nan
-                    continue
-
-                #data1 -= np.mean(data1)
-                #data2 -= np.mean(data2)
-
-                norm_ones = np.ones(len(data1))
-                norm = correlate(norm_ones, norm_ones, mode='same')
-                scc = correlate(data1, data2, mode='same') / (np.std(data1) * np.std(data2) * norm)
-
-                valid_values = len(scc)
-                needed_values = 2 * number_of_bins
-                if valid_values < needed_values * binfactor:
-                    cc[i,j] = np.zeros(needed_values)
-                    if valid_values % 2 == 0:
-                        valid_left, valid_right = int(valid_values / 2), int(valid_values / 2)
-                    else:
-                        valid_left = int(valid_values / 2)
-                        valid_right = valid_values - valid_left
-                    padded_valid = np.pad(
-                        scc,
-                        [number_of_bins * binfactor - valid_left, number_of_bins * binfactor - valid_right],
-                        mode = 'constant')
-                    for k in range(needed_values):
-                        from_ = k * binfactor
-                        to_ = (k + 1) * binfactor
-                        cc[i,j][k] = sum(padded_valid[from_ : to_])
-                else:
-                    mid = int(len(scc) / 2)
-                    cc[i,j] = np.zeros(needed_values)
-                    for k in range(needed_values):
-                        from_ = mid + ((-number_of_bins + k) *binfactor)
-                        to_ = mid + ((-number_of_bins + k + 1) * binfactor)
-                        cc[i,j][k] = sum(scc[from_ : to_])
-
-                argmax = np.argmax(np.abs(cc[i,j]))
-                delay[i,j] = bins[argmax] + 0.5 * binsize
-                coef[i,j] = np.corrcoef(data1, data2)[0,1]
-                delay_coefficient[i,j] = np.nan
-
-
-        return {'xrange': bins, 'correlation': cc, 'coefficient': coef, 'delay': delay, 'delay coefficient': delay_coefficient}
+        return correlation.trainCorrelation(trains_data, binfactor, maxlag)
 
 class AmplitudeCrossCorrelation(CrossCorrelation):
 
+    consumes = ('y', 'frequency')
+    produces = ()
+
     def __init__(self, data, parent, liveplot):
         CrossCorrelation.__init__(self, data, 'Amplitude Cross Correlation', 'amplitudes_data', parent, liveplot, step_mode = False)
 
@@ -337,111 +231,5 @@ class AmplitudeCrossCorrelation(CrossCorrelation):
         if update:
             self.update()
         
-    def instantaneous_amplitude(self, signal):
-        hilbert_ = hilbert(signal)
-        return np.abs(hilbert_)
-    
-    def bandpass(self, signal, order, freq, highpass_freq, lowpass_freq):
-        filter_ = firwin(order, [highpass_freq, lowpass_freq], fs = freq, pass_zero = False)
-        zi = lfilter_zi(filter_, 1.0)
-        return lfilter(filter_, 1.0, signal, zi = zi * signal[0])[0]
-
     def amplitudeCorrelation(self, amplitudes_data, maxlag, use_bandpass, order, highpass_freq, lowpass_freq, use_instantaneous):
-        """
-        A Cross Correlation approach with options described in the following paper:
-
-        Title:
-            Cross-correlation of instantaneous amplitudes of field potential oscillations: a
-            straightforward method to estimate the directionality and lag between brain areas
-        Author:
-            Avishek Adhikari, Torfi Sigurdsson, Mihir A. Topiwala, and Joshua A. Gordon
-        Source:
-            https://www.ncbi.nlm.nih.gov/pmc/articles/PMC2924932/
-        """
-
-        n = len(amplitudes_data)
-        
-        if n < 2 or (use_bandpass and lowpass_freq <= highpass_freq):
-            # TODO throw ui error: please select multiple trains...
-            return {'xrange': None, 'correlation': None, 'coefficient': None, 'delay':None, 'delay coefficient': None}
-
-        amps = [np.copy(data['processed']) for data in amplitudes_data]
-        freqs = [data['freq'] for data in amplitudes_data]
-        offsets = [data['offset'] for data in amplitudes_data]
-
-        amps, freq = self.adjustFrequencies(amps, freqs)
-        offsets = [round(offset * freq) for offset in offsets]
-        
-        if use_bandpass:
-            if highpass_freq <= 0:
-                highpass_freq = 1
-            if lowpass_freq >= math.floor(freq/2):
-                lowpass_freq = math.floor(freq/2) - 1
-            if lowpass_freq <= highpass_freq or order >= round(freq) or order < 2:
-                return {'xrange': None, 'correlation': None, 'coefficient': None, 'delay':None, 'delay coefficient': None}
-        
-        lens = [len(amp) for amp in amps]
-
-        period_duration = 1.0 / freq
-        number_of_xrange_values = round(maxlag / period_duration)
-        xrange_ = np.arange(-number_of_xrange_values, number_of_xrange_values+1) * period_duration
-
-        cc = np.zeros((n,n), dtype=object)
-        delay = np.zeros((n,n))
-        coef = np.zeros((n,n))
-        delay_coefficient = np.zeros((n,n))
-
-        for i in range(n-1):
-            for j in range(i+1, n):
-
-                slice1, slice2 = self.sliceSignals(lens[i], lens[j], offsets[i], offsets[j])
-
-                data1 = amps[i][slice1]
-                data2 = amps[j][slice2]
-
-                if len(data1) == 0 or len(data2) == 0:
-                    cc[i,j] = []
-                    delay[i,j] = np.nan
-                    coef[i,j] = np.nan
-                    delay_coefficient[i,j] = np.nan
-                    continue
-
-                if use_bandpass:
-                    data1 = self.bandpass(data1, order, freq, highpass_freq, lowpass_freq)
-                    data2 = self.bandpass(data2, order, freq, highpass_freq, lowpass_freq)
-
-                if use_instantaneous:
-                    data1 = self.instantaneous_amplitude(data1)
-                    data2 = self.instantaneous_amplitude(data2)
-
-                data1 -= np.mean(data1)
-                data2 -= np.mean(data2)
-
-                norm_ones = np.ones(len(data1))
-                norm = correlate(norm_ones, norm_ones, mode='same')
-                acc = correlate(data1, data2, mode='same') / (np.std(data1) * np.std(data2) * norm)
-
-                valid_values = len(acc)
-                needed_values = 2 * number_of_xrange_values + 1
-                if valid_values < needed_values:
-                    cc[i,j] = np.zeros(needed_values)
-                    if valid_values % 2 == 0:
-                        valid_left, valid_right = int(valid_values / 2), int(valid_values / 2)
-                    else:
-                        valid_left = math.floor(valid_values / 2)
-                        valid_right = valid_values - valid_left
-                    cc[i,j][number_of_xrange_values - valid_left:number_of_xrange_values + valid_right] = acc
-                else:
-                    mid = int(len(acc) / 2)
-                    cc[i,j] = acc[mid-number_of_xrange_values:mid+number_of_xrange_values+1]
-                
-                argmax = np.argmax(np.abs(cc[i,j]))
-                delay[i,j] = xrange_[argmax]
-                coef[i,j] = np.corrcoef(data1, data2)[0,1]
-                offset_in_frames = argmax - number_of_xrange_values
-                slice1, slice2 = self.sliceSignals(len(data1), len(data2), 0, offset_in_frames)
-                data1 = data1[slice1]
-                data2 = data2[slice2]
-                delay_coefficient[i,j] = np.corrcoef(data1, data2)[0,1]
-
-        return {'xrange':xrange_, 'correlation':cc, 'coefficient':coef, 'delay': delay, 'delay coefficient': delay_coefficient}
+        return correlation.amplitudeCorrelation(amplitudes_data, maxlag, use_bandpass, order, highpass_freq, lowpass_freq, use_instantaneous)
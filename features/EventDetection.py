@@ -2,11 +2,9 @@ from PyQt5 import QtGui, QtWidgets, QtCore
 import pyqtgraph as pg
 import numpy as np
 from copy import deepcopy
-from scipy.signal import savgol_filter
-from scipy.optimize import curve_fit
 
 from util.conf import sd_params, bd_params
-from util.functions import movingAverage, func_exp
+from kernels import events
 from features.Feature import Feature
 
 
@@ -16,6 +14,9 @@ from features.Feature import Feature
 # ================
 class BurstDetection(Feature):
 
+    consumes = ('y', 'noise_std', 'frequency')
+    produces = ('burst_time',)
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
@@ -23,7 +24,7 @@ class BurstDetection(Feature):
 
          # data
         self.input = {'y':None, 'object_source_frequency': None, 'object_noise_std': None}
-        self.output = {'start':None, 'end':None, 'time':None, 'amplitude':None, 'duration':None, 'train':None, 'burst frequency':None, 'mean amplitude':None, 'mean duration':None, 'tPeak': None, 'aMax': None, 'τDecay': None, 'mean tPeak': None, 'mean aMax': None, 'mean τDecay': None}
+        self.output = {'start':None, 'end':None, 'time':None, 'amplitude':None, 'duration':None, 'train':None, 'burst frequency':None, 'mean amplitude':None, 'mean duration':None, 'tPeak': None, 'aMax': None, 'τDecay': None, 'mean tPeak': None, 'mean aMax': None, 'mean τDecay': None, 'amplitude threshold': None, 'base threshold': None}
 
         # dialog for averages
         self.showBtn = QtWidgets.QPushButton('Show quantities')
@@ -112,8 +113,8 @@ class BurstDetection(Feature):
         seconds_range = self.data.sources[self.data.source_selection].secondsRange()
         
         # threshold visualization
-        self.liveplot.setData('minimal amplitude', seconds_range, self.th1)
-        self.liveplot.setData('minimal base', seconds_range, self.th2)
+        self.liveplot.setData('minimal amplitude', seconds_range, self.output['amplitude threshold'])
+        self.liveplot.setData('minimal base', seconds_range, self.output['base threshold'])
 
         # plot input data
         self.liveplot.setData('y', seconds_range, y)
@@ -161,6 +162,9 @@ class BurstDetection(Feature):
         QtWidgets.QWidget.show(self)
         self.setThresholdState(update=False)
 
+    def configureGUI(self):
+        self.setThresholdState(update=False)
+
     def setThresholdState(self, update=True):
         bd = self.methods['Threshold']
 
@@ -199,173 +203,7 @@ class BurstDetection(Feature):
             self.update()
 
     def burstUpdate(self, y, object_source_frequency, object_noise_std, dynamic_threshold, relative_threshold, dynamic_smooth, absolute_amplitude, relative_amplitude_type, relative_amplitude, absolute_base, relative_base, duration, phase):
-
-        x = np.arange(len(y))
-
-        isDepolarization = phase == 'depolarization'
-
-        # if there is no noise std, we calculate a default noise and its std
-        if object_noise_std == 0:
-            noise = y - savgol_filter(y, 5, 3)
-            object_noise_std = np.std(noise)
-
-        # thresholds
-        if relative_threshold:
-            amplitude = relative_amplitude * (object_noise_std if relative_amplitude_type == 'use std of noise' else np.std(y))
-            if relative_base == 'minimal base: median':
-                base = np.median(y)
-            elif relative_base == 'minimal base: mean':
-                base = np.mean(y)
-            else:
-                base = 0
-        else:
-            base = absolute_base
-            amplitude = absolute_amplitude
-
-        if dynamic_threshold:
-            self.th1 = movingAverage(y, window=dynamic_smooth)+amplitude
-            self.th2 = movingAverage(y, window=dynamic_smooth)+base
-        else:
-            self.th1 = np.full(len(y), amplitude, dtype=float)
-            self.th2 = np.full(len(y), base, dtype=float)
-
-        # change duration from ms to frames
-        duration = object_source_frequency * duration / 1000.0 
-
-        # get bursts (starts,ends) as frame index
-        bursts = self.burstDetection(y, self.th1, self.th2, duration, isDepolarization)
-
-        # get meta data
-        if len(bursts[0]) is not 0:
-            
-            start = bursts[0]
-            end = bursts[1]
-            n = len(start)
-            burstStart = np.array(x[start])
-            burstEnd = np.array(x[end])
-            peak = [s+(np.argmax(y[s:e]) if isDepolarization else np.argmin(y[s:e])) for s,e in np.nditer([start,end])]
-            amplitude = y[peak]
-            duration = burstEnd-burstStart
-            tPeak = np.zeros(len(peak), dtype=np.int32)
-            np.subtract(peak, start, out = tPeak)
-            aMax = amplitude - self.th2[peak]
-            tDecay = np.zeros_like(aMax)
-            i = 0
-            for decay_start,decay_end in np.nditer([peak, burstEnd]):
-                decay_data = y[decay_start:decay_end]
-                if len(decay_data) < 3:
-                    tDecay[i] = np.nan
-                else:
-                    try:
-                        x_data = np.linspace(0, (decay_end-decay_start)/object_source_frequency, decay_end-decay_start)
-                        popt, _ = curve_fit(func_exp, xdata=x_data, ydata=decay_data, p0=[2.5, 15])
-                        tDecay[i] = 1/popt[1]
-                    except:
-                        tDecay[i] = np.nan
-                i += 1
-
-            return {
-                'start': burstStart,
-                'end': burstEnd,
-                'time': x[peak],
-                'amplitude': amplitude,
-                'duration': duration,
-                'train': self.getBurstTrain(bursts, len(y)),
-                'burst frequency': n*object_source_frequency/x[-1],
-                'mean amplitude': amplitude.mean(),
-                'mean duration': duration.mean(),
-                'tPeak': tPeak,
-                'aMax': aMax,
-                'τDecay': tDecay,
-                'mean tPeak': tPeak.mean(),
-                'mean aMax': aMax.mean(),
-                'mean τDecay': tDecay[~np.isnan(tDecay)].mean()
-            }
-        else:
-            return {
-                'start': np.array([]),
-                'end': np.array([]),
-                'time': np.array([]),
-                'amplitude': np.array([]),
-                'duration': np.array([]),
-                'train': np.zeros(len(y)-1),
-                'burst frequency': 0,
-                'mean amplitude': np.nan,
-                'mean duration': np.nan,
-                'tPeak': np.array([]),
-                'aMax': np.array([]),
-                'τDecay': np.array([]),
-                'mean tPeak': np.nan,
-                'mean aMax': np.nan,
-                'mean τDecay': np.nan
-            }
-
-#--------------------------------------------------------#
-#   Functional
-#--------------------------------------------------------#
-
-    def burstDetection(self, y, amplitude, base, duration, isDepolarization):
-        """
-        y: signal
-        amplitude: upper threshold to decide whether there is a burst or not
-        base: lower threshold to determine the start and end of the burst
-        duration: amount of frames that a burst's length must be at minimum
-        isDepolarization: defines if depolarization or hyperpolarization 
-                should be detected
-
-        returns tuple of arrays: start frames and end frames of the bursts
-
-        definition of burst: one point must be at least the upper threshold (amplitude). 
-        the start of the burst is the intersection of the signal (y) with the
-        lower threshold (base) on the left of the point above the upper threshold.
-        the end of the burst is the intersection of the signal (y) with the 
-        lower threshold (base) on the right of the point above the upper threshold.
-        the burst only counts if it is at least duration long.
-        """
-        bursts = ([],[])
-        n = len(y)
-        i = 1
-        while (i < n-2):
-            if (isDepolarization and y[i] > amplitude[i]) or (not isDepolarization and y[i] < amplitude[i]):
-                start, end, error = self.burstBorderDetection(y, base, i, 0 if len(bursts[0]) == 0 else bursts[1][-1]+1, isDepolarization)
-                if end-start > duration and not error:
-                    bursts[0].append(start)
-                    bursts[1].append(end)
-                i = end + 2
-            else:
-                i += 1
-        return bursts
-
-    def burstBorderDetection(self, y, base, i, leftborder, isDepolarization):
-        """
-        y: signal
-        base: lower threshold to determine start and end of burst
-        i: frame of the point above the upper threshold
-        leftborder: the most-left border the burst can start at
-        isDepolarization: defines if depolarization or hyperpolarization 
-                should be detected
-
-        returns the intersections of the signal with the base on both sides
-        of the point above the upper threshold, and an error-boolean. this 
-        is True when start/end are not below the base, but we stopped because
-        of the borders.
-        """
-        n = len(y) - 1
-        start = i - 1
-        while (start > leftborder and ((isDepolarization and y[start] >= base[start]) or (not isDepolarization and y[start] <= base[start]))):
-            start -= 1
-        end = i + 1
-        while (end < n and ((isDepolarization and y[end] >= base[end]) or (not isDepolarization and y[end] <= base[end]))):
-            end += 1
-        error = (isDepolarization and (y[start] >= base[start] or y[end] >= base[end])) or (not isDepolarization and (y[start] <= base[start] or y[end] <= base[end]))
-        return (start, end, error)
-
-    def getBurstTrain(self, bursts, n):
-        burst_train = np.zeros(n-1,dtype=float)
-        s,e = bursts
-        for i in range(len(s)):
-            burst_train[s[i]:e[i]] = 1
-        return burst_train
+        return events.burstDetection(y, object_source_frequency, object_noise_std, dynamic_threshold, relative_threshold, dynamic_smooth, absolute_amplitude, relative_amplitude_type, relative_amplitude, absolute_base, relative_base, duration, phase)
 
 
 # ================
@@ -374,6 +212,9 @@ class BurstDetection(Feature):
 
 class SpikeDetection(Feature):
 
+    consumes = ('y', 'noise_std', 'frequency')
+    produces = ('spike_time', 'trains_data')
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
@@ -381,7 +222,7 @@ class SpikeDetection(Feature):
 
          # data
         self.input = {'y':None, 'object_source_frequency': None, 'object_noise_std': None}
-        self.output = {'time':None, 'amplitude':None, 'train':None, 'spike frequency':None, 'mean amplitude':None, 'τDecay': None, 'mean τDecay': None}
+        self.output = {'time':None, 'amplitude':None, 'train':None, 'spike frequency':None, 'mean amplitude':None, 'τDecay': None, 'mean τDecay': None, 'threshold': None}
 
         # dialog for averages
         self.showBtn = QtWidgets.QPushButton('Show quantities')
@@ -441,7 +282,7 @@ class SpikeDetection(Feature):
         seconds_range = self.data.sources[self.data.source_selection].secondsRange()
         
         # threshold visualization
-        self.liveplot.setData('minimal amplitude', seconds_range, self.th)
+        self.liveplot.setData('minimal amplitude', seconds_range, self.output['threshold'])
 
         # plotting the signal
         self.liveplot.setData('y', seconds_range, y)
@@ -481,6 +322,9 @@ class SpikeDetection(Feature):
         QtWidgets.QWidget.show(self)
         self.setThresholdState(update=False)
 
+    def configureGUI(self):
+        self.setThresholdState(update=False)
+
     def setThresholdState(self, update=True):
         sd = self.methods['Threshold']
         if sd.getParametersGUI('dynamic_threshold').isChecked():
@@ -510,102 +354,4 @@ class SpikeDetection(Feature):
             self.update()
 
     def spikeUpdate(self, y, object_source_frequency, object_noise_std, dynamic_threshold, relative_threshold, dynamic_smooth, absolute_amplitude, relative_amplitude_type, relative_amplitude, interval):
-        
-        x = np.arange(len(y))
-
-        # if there is no noise std, we calculate a default noise and its std
-        if object_noise_std == 0:
-            noise = y - savgol_filter(y, 5, 3)
-            object_noise_std = np.std(noise)
-
-        if relative_threshold:
-            amplitude = relative_amplitude * (object_noise_std if relative_amplitude_type == 'use std of noise' else np.std(y))
-        else:
-            amplitude = absolute_amplitude
-
-        if dynamic_threshold:
-            self.th = movingAverage(y, window=dynamic_smooth)+amplitude
-        else:
-            self.th = np.full(len(y), amplitude, dtype = float)
-
-        # change interval from ms to frames
-        interval = object_source_frequency * interval / 1000.0
-
-        # get spike positions as frame numbers
-        spikes = self.spikeDetection(y, self.th, interval)
-
-        n = len(spikes)
-        if n is not 0:
-            time = x[spikes]
-            amplitude = y[spikes]
-
-            decay = np.zeros_like(amplitude)
-            i = 0
-            for decay_start in time:
-                if interval < 3:
-                    decay[i] = np.nan
-                else:
-                    decay_interval = round(interval/2)
-                    decay_data = y[decay_start:decay_start+decay_interval]
-                    try:
-                        x_data = np.linspace(0, decay_interval/object_source_frequency, decay_interval)
-                        popt, _ = curve_fit(func_exp, xdata=x_data, ydata=decay_data, p0=[2.5, 15])
-                        decay[i] = 1/popt[1]
-                    except:
-                        decay[i] = np.nan
-                i += 1
-
-            return {
-                'spike frequency': n*object_source_frequency/x[-1],
-                'mean amplitude': np.mean(amplitude),
-                'train': self.getSpikeTrain(spikes, len(y)),
-                'time': time,
-                'amplitude': amplitude,
-                'τDecay': decay,
-                'mean τDecay': decay[~np.isnan(decay)].mean()
-            }
-        else:
-            return {
-                'spike frequency': None,
-                'mean amplitude': None,
-                'train': None,
-                'time': None,
-                'amplitude': None,
-                'τDecay': None,
-                'mean τDecay': None
-            }
-
-#--------------------------------------------------------#
-#   Functional
-#--------------------------------------------------------#
-
-    def spikeDetection(self, y, thresh, interval):
-        """
-        interval in frames
-        """
-        spikes = []
-        i = 1
-        n = len(y)
-        while i < n-1:
-            # if value is over the threshold and a local maximum
-            if y[i]>thresh[i]:
-                if (y[i] >= y[i-1] and y[i] >= y[i+1]):
-                    spikes.append(i)
-            i+=1
-        j = 0
-        while j < len(spikes)-1:
-            if (spikes[j+1]-spikes[j]) < interval:
-                if y[spikes[j]]>y[spikes[j+1]]:
-                    del spikes[j+1]
-                else:
-                    del spikes[j]
-            else:
-                j+=1
-        return spikes
-
-
-    def getSpikeTrain(self, spikes, n):
-        spike_train = np.zeros(n-1,dtype=float)
-        for s in spikes:
-            spike_train[s] = 1
-        return spike_train
+        return events.spikeDetection(y, object_source_frequency, object_noise_std, dynamic_threshold, relative_threshold, dynamic_smooth, absolute_amplitude, relative_amplitude_type, relative_amplitude, interval)
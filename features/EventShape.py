@@ -3,12 +3,15 @@ import pyqtgraph as pg
 import numpy as np
 from util.conf import es_params
 
-from util.functions import movingAverage
+from kernels import shape
 from features.Feature import Feature
 import math
 
 class EventShape(Feature):
 
+    consumes = ('y', 'spike_time', 'burst_time', 'frequency')
+    produces = ()
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
@@ -35,6 +38,13 @@ class EventShape(Feature):
         self.updateParametersUI()
 
     def inputConfiguration(self):
+        # the slider shows the displayed state
+        if self.isDisplayed():
+            self.configureGUI()
+
+    def configureGUI(self):
+        if self.input['object_source_frequency'] is None:
+            return
         left, right = self.getMethod().parameters['interval']
         # get intervalsize in frames
         intervalSize = math.floor((left + right - 1) * self.input['object_source_frequency'] / 1000.0)
@@ -79,68 +89,7 @@ class EventShape(Feature):
         self.liveplot.setData('smoothed shape', [], [])
 
     def burstShapeCalculation(self, y, burst_time, spike_time, object_source_frequency, smooth, interval):
-        return self.eventShapeCalculation(y, burst_time, object_source_frequency, smooth, interval)
+        return shape.burstShape(y, burst_time, spike_time, object_source_frequency, smooth, interval)
 
     def spikeShapeCalculation(self, y, burst_time, spike_time, object_source_frequency, smooth, interval):
-        return self.eventShapeCalculation(y, spike_time, object_source_frequency, smooth, interval)
-
-    def eventShapeCalculation(self, y, time, object_source_frequency, smooth, interval):
-        '''Update Spike Shapes'''
-
-        if time is None or isinstance(time, bool):
-            return {
-                'shapes': None,
-                'mean shape': None,
-                'mean shape smoothed': None
-            }
-
-        left,right = interval
-        left = round(left * object_source_frequency / 1000.0)
-        right = round(right * object_source_frequency / 1000.0)
-        interval = left,right
-        shapes = self.getShapes(y, time, interval, object_source_frequency)
-        meanShape = self.getMeanShape(shapes)
-        meanShapeSmoothed = movingAverage(meanShape, window=smooth)
-
-        return {'shapes': shapes, 'mean shape': meanShape, 'mean shape smoothed': meanShapeSmoothed}
-
-    # ---------------------------------------------------------
-    #   Headless / Functional
-    # ---------------------------------------------------------
-
-    def getShapes(self, signal, peaks, interval, freq):
-        '''
-        Cut out spike/burst shapes from the signal
-        signal (ndarray) : signal from where the spikes are subtracted
-        peaks (ndarray) : time points of spike/burst peaks in seconds
-        interval (tuple) : area before and after peak in seconds
-        '''
-        n = len(peaks)
-        m = len(signal)
-        #peaks = (peaks*freq).astype(int)    # from seconds to frames
-        # start and end point
-        backward, forward = interval
-        shapes = []
-        for peak in peaks:
-            start = peak - backward
-            end = peak + forward
-            # if start is negative, repeat the first value of signal
-            if start < 0:
-                    diff_start = np.repeat(signal[0], abs(start))
-                    shape = np.concatenate([diff_start, signal[:end]])
-            # if end is bigger than signal length, repeat last value of signal
-            elif end >= m:
-                    diff_end = np.repeat(signal[m-1], (end-m))
-                    shape = np.concatenate([signal[start:],diff_end])
-            else:
-                shape = signal[start:end]
-            shapes.append(shape)
-        return np.array(shapes)
-
-
-    def getMeanShape(self, shapes):
-        '''
-        Calculate mean spike/burst shape
-        shapes (ndarray) : spike/burst shapes
-        '''
-        return shapes.mean(axis=0)
+        return shape.spikeShape(y, burst_time, spike_time, object_source_frequency, smooth, interval)
@@ -1,10 +1,39 @@
 from PyQt5 import QtGui, QtWidgets, QtCore
 import pyqtgraph as pg
+import numpy as np
 from copy import deepcopy
+from contextlib import contextmanager
+
+from model.ResultCache import ResultCache
+from model.StepState import StepState
+from util.conf import rc_params
+from util.functions import readOnly
+from util.profiling import profiler
 
 # Feature interface
 class Feature(QtWidgets.QWidget):
 
+    # results of the methods of all features. a result is reused if a method is called with the same input
+    # and parameters again.
+    result_cache = ResultCache()
+
+    # determines if the results of the methods are cached. must be False if the methods depend on anything
+    # else than their input and parameters, or if they have side effects.
+    cacheable = True
+
+    # determines if the methods can be called on another thread than the main thread. must be False if the
+    # methods use the GUI. parameter changes of threadsafe features refresh the pipeline on a background
+    # thread, see RefreshScheduler.
+    threadsafe = True
+
+    # the data of the pipeline the feature consumes and produces. the pipeline only recalculates a feature if
+    # data it consumes changed, see Pipeline.getDependentIndices. the data is:
+    #     'roi': the cell roi. 'y': the trace. 'noise_std': the standard deviation of the noise.
+    #     'frequency': the frequency of the trace. 'spike_time', 'burst_time': the times of the events.
+    #     'trains_data': the spike trains, which are used by the spike cross correlation of all objects.
+    consumes = ()
+    produces = ()
+
     def __init__(self, name, data, parent=None, liveplot=None, display_name_label=True):
 
         if parent is not None and isinstance(parent, QtWidgets.QStackedWidget):
@@ -19,6 +48,13 @@ class Feature(QtWidgets.QWidget):
         # name
         self.name = name
 
+        # state. the active state, the selected method, the parameters, the input and the output are kept in a
+        # StepState. the features of the pipeline are shared by the objects and are bound to the state of an
+        # object, see bind. the default state holds the defaults for new states, see createState.
+        self.default_state = StepState(self, False, None, {})
+        self.state = self.default_state
+        self.displayed_state = self.default_state
+
         # active
         self.active = False
 
@@ -58,12 +94,123 @@ class Feature(QtWidgets.QWidget):
             font_metrics = QtGui.QFontMetrics(font)
             name_label.setMaximumHeight(font_metrics.height())
 
+    # State
+    @property
+    def active(self):
+        return self.state.active
+
+    @active.setter
+    def active(self, active):
+        self.state.active = active
+
+    @property
+    def input(self):
+        return self.state.input
+
+    @input.setter
+    def input(self, input_):
+        self.state.input = input_
+
+    @property
+    def output(self):
+        return self.state.output
+
+    @output.setter
+    def output(self, output):
+        self.state.output = output
+
+    @property
+    def feature(self):
+        # the feature of a step of the pipeline, which is a StepState or a feature that is not bound to objects
+        return self
+
+    def createState(self, template = None):
+        '''
+        template:
+            StepState or None. default is None.
+            the state whose active state, method and parameters are copied. if None, the defaults of the
+                feature are used.
+        returns a new state of the feature with an empty input and output.
+        '''
+        if template is None:
+            template = self.default_state
+        return StepState(self,
+            template.active,
+            template.method,
+            deepcopy(template.parameters),
+            dict.fromkeys(self.default_state.input.keys()),
+            dict.fromkeys(self.default_state.output.keys()))
+
+    def bind(self, state):
+        '''
+        binds the feature to the state: the active state, the method, the parameters, the input and the
+            output of the feature are the ones of the state. the GUI is not changed, see display.
+        '''
+        self.state = state
+
+    @contextmanager
+    def boundTo(self, state):
+        '''
+        binds the feature to the state within the context. afterwards, the feature is bound to the state it
+            was bound to before, or to the displayed state if another state has been displayed meanwhile.
+        '''
+        previous = self.state
+        displayed = self.displayed_state
+        self.bind(state)
+        try:
+            yield self
+        finally:
+            self.bind(previous if self.displayed_state is displayed else self.displayed_state)
+
+    def display(self, state):
+        '''
+        binds the feature to the state and shows the method and the parameters of the state in the GUI,
+            without an update.
+        '''
+        self.bind(state)
+        self.displayed_state = state
+        self.disconnectMethodCombo()
+        self.method_combo.setCurrentText(state.method)
+        self.connectMethodCombo()
+        for method in self.methods.values():
+            method.refreshParametersGUI()
+        self.updateParametersUI()
+        self.configureGUI()
+
+    def isDisplayed(self):
+        '''
+        returns True if the GUI shows the state the feature is bound to. if not, the methods must not change
+            the GUI.
+        '''
+        return self.state is self.displayed_state
+
+    def pipelineStep(self):
+        '''
+        returns the step of the pipeline that the feature is bound to: the state of an object, or the feature
+            itself if it is not bound to objects (e.g. the cross correlations).
+        '''
+        return self if self.state is self.default_state else self.state
+
+    def objectName(self):
+        '''
+        returns the name of the object that the state of the feature belongs to, or None if it does not belong
+            to an object.
+        '''
+        for object_ in getattr(self.data, 'objects', []):
+            if any(step is self.state for step in object_.pipeline.getCalculatingPipeline()):
+                return object_.name
+        return None
+
     def connectMethodCombo(self):
-        self.method_combo.currentIndexChanged.connect(self.activate)
+        self.method_combo.currentIndexChanged.connect(self.methodChanged)
 
     def disconnectMethodCombo(self):
         self.method_combo.currentIndexChanged.disconnect()
 
+    def methodChanged(self):
+        self.state.method = self.method_combo.currentText()
+        self.activate()
+
     # Optional
     def activateFunc(self):
         pass
@@ -91,20 +238,33 @@ class Feature(QtWidgets.QWidget):
             self.methods[name].hide()
             self.methods[name].hideParametersGUI()
         # show selected method parameters
-        method_name = self.method_combo.currentText()
+        method_name = self.state.method
         self.methods[method_name].show()
         self.methods[method_name].showParametersGUI()
 
     def inputConfiguration(self):
         pass
 
+    def prepareParameters(self, method):
+        '''
+        completes the parameters of the method before it is calculated, on the main thread. the parameters are
+            part of the key of the result cache, so the methods must not change them while calculating.
+        '''
+        pass
+
+    # Optional
+    def configureGUI(self):
+        """Sets the GUI elements that depend on the input or the parameters, but not on a single parameter, e.g. slider ranges. Called when a state is displayed."""
+        pass
+
     # Method
     def addMethod(self, name, parameters, function):
         self.methods[name] = FeatureMethod(self, name, deepcopy(parameters), function)
+        if self.state.method is None:
+            self.state.method = name
 
     def getMethod(self):
-        name = self.method_combo.currentText()
-        return self.methods[name]
+        return self.methods[self.state.method]
 
     # Plot
     def updateLiveplot(self):
@@ -131,17 +291,55 @@ class Feature(QtWidgets.QWidget):
             method = self.getMethod()
             if method.prevent_update:
                 return
-            input_dict = {**{k:v for k,v in self.input.items()}, **method.parameters}
-            if set_source_attributes_callback_kwargs is not None:
-                input_dict['set_source_attributes_callback_kwargs'] = set_source_attributes_callback_kwargs
-            out = method.function(**input_dict)
-            self.output = out
-            # update plot
-            if plot:
-                self.updateLivePlot()
-            # update dependend
-            if updateDependend:
-                self.data.refreshPipeline(start_with_feature = self, start_after_start_with_feature = True, plot = plot, **kargs)
+            self.prepareParameters(method)
+            with profiler.measure('update', 'update', self.objectName() if profiler.active else None, self.name, method.name):
+                step = self.pipelineStep()
+                # let the scheduler calculate the feature and the dependend features in the background, if possible
+                if updateDependend and set_source_attributes_callback_kwargs is None and self.data.refresh_scheduler.schedule(step, plot = plot, **kargs):
+                    return
+                input_dict = {**{k:v for k,v in self.input.items()}, **method.parameters}
+                if set_source_attributes_callback_kwargs is not None:
+                    input_dict['set_source_attributes_callback_kwargs'] = set_source_attributes_callback_kwargs
+                out = self.calculate(method, input_dict)
+                self.output = out
+                # update plot
+                if plot:
+                    self.updateLivePlot()
+                # update dependend
+                if updateDependend:
+                    self.data.refreshPipeline(start_with_feature = step, start_after_start_with_feature = True, plot = plot, **kargs)
+
+    def calculate(self, method, input_dict):
+        '''
+        returns the output of the method for the input dict (input and parameters). if the feature is
+            cacheable, the output is taken from the result cache if the method was called with the same
+            input dict before. the arrays in the output are read-only, because they are shared with the
+            following steps and the cache. outputs with None values are not stored: the methods return them if
+            the calculation failed (e.g. Baseline.alsWrapper), which shall be reported again by the next call.
+        '''
+        if not (self.cacheable and rc_params['active']) or 'set_source_attributes_callback_kwargs' in input_dict:
+            return self.readOnlyOutput(method.function(**input_dict))
+        try:
+            key = Feature.result_cache.key(self.name, method.name, input_dict)
+        except TypeError:
+            # the input contains objects that can not be fingerprinted
+            return self.readOnlyOutput(method.function(**input_dict))
+        out = Feature.result_cache.load(key)
+        if out is None:
+            out = self.readOnlyOutput(method.function(**input_dict))
+            if all(value is not None for value in out.values()):
+                Feature.result_cache.store(key, out)
+        return out
+
+    def readOnlyOutput(self, out):
+        '''
+        returns the output with read-only arrays. the arrays that were created by the method (that own their
+            data) are frozen, such that their digests are kept by the result cache (see ResultCache.arrayDigest).
+        '''
+        for value in out.values():
+            if isinstance(value, np.ndarray) and value.base is None:
+                value.flags.writeable = False
+        return {key: readOnly(value) for key, value in out.items()}
 
     # Activate
     def setActive(self, active, **kargs_for_update):
@@ -197,6 +395,15 @@ class FeatureMethod(QtWidgets.QWidget):
         # for preventing an update
         self.prevent_update = False
 
+    @property
+    def parameters(self):
+        # the parameters are kept in the state the feature is bound to
+        return self.feature.state.parameters[self.name]
+
+    @parameters.setter
+    def parameters(self, parameters):
+        self.feature.state.parameters[self.name] = parameters
+
     def getParameters(self):
         """Returns method parameters as dictionary."""
         return self.parameters
@@ -205,9 +412,9 @@ class FeatureMethod(QtWidgets.QWidget):
         '''
         params:
             dict.
-            parameters to set. if the parameters refer the graphical objects, the values of the
-                graphical objects are set too. if no change in a parameter has been made, it will
-                be ignored.
+            parameters to set. if the parameters refer the graphical objects and the feature is
+                displayed, the values of the graphical objects are set too. if no change in a parameter
+                has been made, it will be ignored.
         prevent_update:
             bool. default is False.
             determines if an update should be prevented.
@@ -220,48 +427,77 @@ class FeatureMethod(QtWidgets.QWidget):
             if key in self.parameters.keys():
                 if self.parameters[key] == value:
                     continue
-            # check for graphical object
-            if key in self.param_gui.keys():
-                gui_elem = self.param_gui[key]
-                if type(gui_elem) is Slider:
-                    # check if absolutes are set and value may be out of range. if so, do not set value!
-                    if gui_elem.absolutes_set and (gui_elem.absolute_min * gui_elem.multiplier > value or gui_elem.absolute_max * gui_elem.multiplier < value):
-                        continue
-                    # check if we have to set minimum of slider
-                    if gui_elem.slider.minimum() * gui_elem.multiplier > value:
-                        gui_elem.setMinimum(value)
-                    # check if we have to set maximum of slider
-                    if gui_elem.slider.maximum() * gui_elem.multiplier < value:
-                        gui_elem.setMaximum(value)
-                    gui_elem.setValue(value)
-                elif type(gui_elem) is QtWidgets.QCheckBox:
-                    gui_elem.setChecked(value)
-                elif type(gui_elem) is list and len(gui_elem) > 0 and type(gui_elem[0]) is QtWidgets.QRadioButton:
-                    for gui_sub_elem in gui_elem:
-                        gui_sub_elem.setChecked(gui_sub_elem.text() == value)
-                elif type(gui_elem) is pg.EllipseROI:
-                    pos, size, angle = value
-                    gui_elem.setPos(pos)
-                    gui_elem.setSize(size)
-                    gui_elem.setAngle(angle)
-                elif type(gui_elem) is pg.RectROI:
-                    pos, size, _ = value
-                    gui_elem.setPos(pos)
-                    gui_elem.setSize(size)
-                elif type(gui_elem) is QtWidgets.QWidget:
-                    _layout = gui_elem.layout()
-                    if type(_layout) is QtWidgets.QHBoxLayout and _layout.count() == 2 and type(_layout.itemAt(1)) is QtWidgets.QComboBox:
-                        comboBox = gui_elem.itemAt(1)
-                        for i in range(comboBox.count()):
-                            if (comboBox.itemText(i) == value):
-                                comboBox.setCurrentIndex(i)
-                                break
+            # check if value is out of the range of the graphical object. if so, do not set value!
+            if not self.validParameterGUIValue(key, value):
+                continue
+            # set the graphical object
+            if self.feature.isDisplayed():
+                self.setParameterGUI(key, value)
             # set the data parameter
             if key in self.parameters.keys():
                 self.parameters[key] = value
         if prevent_update or self is not self.feature.getMethod():
             self.feature.getMethod().prevent_update = prevent_update_before
 
+    def refreshParametersGUI(self):
+        '''
+        sets the graphical objects to the parameters without an update, e.g. after the feature has been
+            displayed with another state.
+        '''
+        prevent_update_before = self.feature.getMethod().prevent_update
+        self.feature.getMethod().prevent_update = True
+        for key, value in list(self.parameters.items()):
+            if self.validParameterGUIValue(key, value):
+                self.setParameterGUI(key, value)
+        self.feature.getMethod().prevent_update = prevent_update_before
+
+    def validParameterGUIValue(self, key, value):
+        '''
+        returns False if the parameter refers a slider with absolutes and the value is out of them.
+        '''
+        gui_elem = self.param_gui.get(key)
+        if type(gui_elem) is Slider and gui_elem.absolutes_set:
+            return gui_elem.absolute_min * gui_elem.multiplier <= value <= gui_elem.absolute_max * gui_elem.multiplier
+        return True
+
+    def setParameterGUI(self, key, value):
+        '''
+        sets the graphical object of the parameter to the value, if there is one.
+        '''
+        if key not in self.param_gui.keys():
+            return
+        gui_elem = self.param_gui[key]
+        if type(gui_elem) is Slider:
+            # check if we have to set minimum of slider
+            if gui_elem.slider.minimum() * gui_elem.multiplier > value:
+                gui_elem.setMinimum(value)
+            # check if we have to set maximum of slider
+            if gui_elem.slider.maximum() * gui_elem.multiplier < value:
+                gui_elem.setMaximum(value)
+            gui_elem.setValue(value)
+        elif type(gui_elem) is QtWidgets.QCheckBox:
+            gui_elem.setChecked(value)
+        elif type(gui_elem) is list and len(gui_elem) > 0 and type(gui_elem[0]) is QtWidgets.QRadioButton:
+            for gui_sub_elem in gui_elem:
+                gui_sub_elem.setChecked(gui_sub_elem.text() == value)
+        elif type(gui_elem) is pg.EllipseROI:
+            pos, size, angle = value
+            gui_elem.setPos(pos)
+            gui_elem.setSize(size)
+            gui_elem.setAngle(angle)
+        elif type(gui_elem) is pg.RectROI:
+            pos, size, _ = value
+            gui_elem.setPos(pos)
+            gui_elem.setSize(size)
+        elif type(gui_elem) is QtWidgets.QWidget:
+            _layout = gui_elem.layout()
+            if type(_layout) is QtWidgets.QHBoxLayout and _layout.count() == 2 and type(_layout.itemAt(1).widget()) is QtWidgets.QComboBox:
+                comboBox = _layout.itemAt(1).widget()
+                for i in range(comboBox.count()):
+                    if (comboBox.itemText(i) == value):
+                        comboBox.setCurrentIndex(i)
+                        break
+
     ## GUI ##
 
     def showParametersGUI(self):
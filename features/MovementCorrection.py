@@ -1,8 +1,4 @@
 from PyQt5 import QtCore, QtWidgets, QtGui
-from pystackreg import StackReg
-from copy import deepcopy
-from dipy.align.imwarp import SymmetricDiffeomorphicRegistration
-from dipy.align.metrics import CCMetric
 import numpy as np
 
 from features.Feature import Feature
@@ -11,6 +7,10 @@ from threads.Worker import Worker
 
 class MovementCorrection(Feature):
 
+    # the correction is calculated in the background
+    cacheable = False
+    threadsafe = False
+
     def __init__(self, data, parent=None, liveplot=None):
         
         Feature.__init__(self, 'Movement Correction', data, parent, liveplot, display_name_label=False)
@@ -25,13 +25,15 @@ class MovementCorrection(Feature):
 
         self.symmetric_diffeomorphic_option = 'Symmetric Diffeomorphic'
 
+        # pystackreg and dipy are only imported when a correction is calculated, so the options
+        # hold the names of the StackReg transformations.
         self.options = [
             ('None [original image]', None),
             (self.symmetric_diffeomorphic_option, None),
-            ('Translation', StackReg.TRANSLATION),
-            ('Rigid Body', StackReg.RIGID_BODY),
-            ('Scaled Rotation', StackReg.SCALED_ROTATION),
-            ('Affine', StackReg.AFFINE)
+            ('Translation', 'TRANSLATION'),
+            ('Rigid Body', 'RIGID_BODY'),
+            ('Scaled Rotation', 'SCALED_ROTATION'),
+            ('Affine', 'AFFINE')
         ]
 
         self.calculated = []
@@ -84,11 +86,14 @@ class MovementCorrection(Feature):
                 worker_max_progress_signal.emit(end_iteration)
                 self.end_set = True
             worker_progress_signal.emit(current_iteration)
-        sr = StackReg(option)
+        from pystackreg import StackReg
+        sr = StackReg(getattr(StackReg, option))
         corrected = sr.register_transform_stack(uncorrected, reference='first', progress_callback = progress_callback_pystackreg)
         return {'corrected': corrected}
 
     def dipy_work(self, uncorrected, worker_progress_signal):
+        from dipy.align.imwarp import SymmetricDiffeomorphicRegistration
+        from dipy.align.metrics import CCMetric
         radius = 4
         sigma_diff = 3.0
         metric = CCMetric(2, sigma_diff, radius)
@@ -135,8 +140,8 @@ class MovementCorrection(Feature):
         self.data.progress_dialog.setMinimum(0)
         self.data.progress_dialog.setMaximum(0)
 
-        # copy the original data
-        uncorrected = deepcopy(source.getOriginalData())
+        # copy the original data. np.array also reads image sequences that are not in memory
+        uncorrected = np.array(source.getOriginalData())
 
         # passing the callback kwargs
         callback_kwargs = {
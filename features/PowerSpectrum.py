@@ -4,12 +4,15 @@ import numpy as np
 from copy import deepcopy
 
 from util.conf import fs_fft_params
-from util.functions import movingAverage
+from kernels import spectrum
 from features.Feature import Feature
 
 
 class PowerSpectrum(Feature):
 
+    consumes = ('y', 'frequency')
+    produces = ()
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
@@ -43,33 +46,7 @@ class PowerSpectrum(Feature):
                 self.update()
 
     def updateFourier(self, y, object_source_frequency, smooth, threshold, interval):
-        y_detrended = y - np.mean(y)
-
-        fft = np.fft.fft(y_detrended)
-        fft = fft / len(fft)
-        psd = np.abs(fft)**2
-        freqs = np.fft.fftfreq(len(y_detrended), 1 / object_source_frequency)
-
-        left_closest_index = np.argmin(np.abs(freqs - interval[0]))
-        right_closest_index = np.argmin(np.abs(freqs - interval[1]))
-
-        freqs = freqs[left_closest_index:right_closest_index+1]
-        psd = psd[left_closest_index:right_closest_index+1]
-
-        psd[psd < threshold] = 0
-        psd = movingAverage(psd, window = smooth)
-        
-        if len(freqs) != len(psd):
-            return {
-                'frequencies': None,
-                'psd': None,
-                'max power': None,
-                'max power frequency': None
-            }
-        peak = np.argmax(psd)
-        peak_frequency = freqs[peak]
-        peak = psd[peak]
-        return {'frequencies':freqs, 'psd':psd, 'max power': peak, 'max power frequency': peak_frequency}
+        return spectrum.fourier(y, object_source_frequency, smooth, threshold, interval)
 
     def updateLivePlot(self):
         frequencies = self.output['frequencies']
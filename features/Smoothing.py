@@ -1,14 +1,16 @@
 from PyQt5 import QtGui, QtWidgets, QtCore
 import pyqtgraph as pg
 import numpy as np
-from scipy import signal
 
 from util.conf import sg_savitzky_golay_params, sg_moving_average_params, sg_butterworth_params, sg_scaled_window_convolution_params
-from util.functions import movingAverage, butter_lowpass_filter
+from kernels import smoothing
 from features.Feature import Feature
 
 class Smoothing(Feature):
 
+    consumes = ('y', 'frequency')
+    produces = ('y', 'noise_std')
+
     def __init__(self, data, parent=None, liveplot=None):
 
         # Init Feature
@@ -52,6 +54,9 @@ class Smoothing(Feature):
         if self.input['object_source_frequency'] is not None:
             self.setButterworthMaxHighcut()
 
+    def configureGUI(self):
+        self.setButterworthMaxHighcut()
+
     def setButterworthMaxHighcut(self):
         if self.input['object_source_frequency'] is None:
             return
@@ -62,6 +67,11 @@ class Smoothing(Feature):
             max_highcut = int(freq / 2) # rounds down
 
         curr_highcut = self.methods['Butterworth'].getParameters()['highcut']
+        if not self.isDisplayed():
+            # the slider shows another state
+            if curr_highcut > max_highcut:
+                self.methods['Butterworth'].getParameters()['highcut'] = max_highcut
+            return
         if curr_highcut > max_highcut:
             self.methods['Butterworth'].getParametersGUI('highcut').setValue(max_highcut)
         
@@ -70,53 +80,21 @@ class Smoothing(Feature):
         
 
     def movingAverageWrapper(self, y, object_source_frequency, window=11):
-        y_smoothed = movingAverage(y, window)
-        noise = y - y_smoothed
-        return {'y': y_smoothed, 'noise_std': np.std(noise)}
+        return smoothing.movingAverage(y, object_source_frequency, window)
 
     def butter_lowpass_filter_wrapper(self, y, object_source_frequency, highcut, order):
-        y_smoothed = butter_lowpass_filter(y, object_source_frequency, highcut, order)
-        noise = y - y_smoothed
-        return {'y': y_smoothed, 'noise_std': np.std(noise)}
+        return smoothing.butterworth(y, object_source_frequency, highcut, order)
 
     def updateSGData(self, y, object_source_frequency, polyorder, window):
         """Savitzky Golay Filtering"""
+        return smoothing.savitzkyGolay(y, object_source_frequency, polyorder, window)
 
-        if window%2 == 0:
-            window+=1
-        if window > polyorder:
-            sg = signal.savgol_filter(y, window, polyorder)
-        else:
-            sg = y
-
-        noise = y - sg
-
-        return {'y': sg, 'noise_std': np.std(noise)}
-        
     def scaled_window_convolution(self, y, object_source_frequency, window_len, window):
         """
         scaled window smoothing.
         code adapted from https://scipy-cookbook.readthedocs.io/items/SignalSmooth.html
         """
-        
-        if window_len % 2 == 0:
-            window_len += 1
-        s=np.r_[y[window_len-1:0:-1],y,y[-2:-window_len-1:-1]]
-        if (window == 'hamming'):
-            w = np.hamming(window_len)
-        elif (window == 'bartlett'):
-            w = np.bartlett(window_len)
-        elif (window == 'blackman'):
-            w = np.blackman(window_len)
-        else:
-            w = np.hanning(window_len)
-        
-        swc = np.convolve(w/w.sum(), s, mode='valid')
-        swc = swc[(int(window_len/2)-1):-int(window_len/2)-1]
-
-        noise = y - swc
-
-        return {'y': swc, 'noise_std': np.std(noise)}
+        return smoothing.scaledWindowConvolution(y, object_source_frequency, window_len, window)
 
     def swcWindowChanged(self):
         swc = self.methods['Scaled Window Convolution']
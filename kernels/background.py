@@ -0,0 +1,73 @@
+import math
+
+from model.extraction import roiWeights, ringWeights, extractTraces, extractMeans
+
+def perisomaticROI(pos, size, angle, radius):
+    '''
+    returns (pos, size) of the perisomatic roi, which is the cell roi enlarged by radius around its center.
+    '''
+    angle_of_position = math.radians(angle-135)
+    shift_x = math.sqrt(2) * math.cos(angle_of_position) * radius / 2
+    shift_y = math.sqrt(2) * math.sin(angle_of_position) * radius / 2
+    return (pos[0] + shift_x, pos[1] + shift_y), (size[0] + radius, size[1] + radius)
+
+def roiBackgroundSubtraction(y, roi_params, roi_image, roi_ellipse_mode, background_roi, level = None, integral_image = None):
+    '''
+    Subtract the mean value of the background ROI from cell mean (frame by frame).
+    roi_params:
+        tuple.
+        (pos, size, angle) of the cell roi. not used, the argument is there such that all background
+        subtraction kernels take the same input.
+    roi_image:
+        np.ndarray.
+        the image sequence with shape (frames, width, height).
+    background_roi:
+        tuple.
+        (pos, size, angle) of the background roi.
+    level:
+        PyramidLevel, or None. default is None.
+        if set, the background mean is calculated from this level of the image pyramid instead of roi_image.
+    integral_image:
+        IntegralImage, or None. default is None.
+        if set and the roi is a rectangle, the background mean is calculated from the integral image of
+        roi_image. takes precedence over level.
+    '''
+    pos, size, angle = background_roi
+    background_roi = (pos, size, angle, roi_ellipse_mode)
+    if integral_image is not None and not roi_ellipse_mode:
+        background_mean = integral_image.rectMeans([(pos, size)], y.dtype)[0]
+    elif level is None:
+        background_mean = extractMeans(roi_image, [background_roi], dtype = y.dtype)[0]
+    else:
+        background_mean = level.extractMeans([background_roi], len(y), y.dtype)[0]
+
+    return {'background mean': background_mean, 'y': y - background_mean}
+
+def perisomaticBackgroundSubtraction(y, roi_params, roi_image, roi_ellipse_mode, radius, level = None, integral_image = None):
+    '''
+    Subtract the mean value of the area around cell (defined by radius) from cell mean.
+    roi_params:
+        tuple.
+        (pos, size, angle) of the cell roi.
+    for roi_image, level and integral_image, see roiBackgroundSubtraction.
+    '''
+    pos, size, angle = roi_params
+    p_pos, p_size = perisomaticROI(pos, size, angle, radius)
+    if integral_image is not None and not roi_ellipse_mode:
+        background_mean = integral_image.ringMeans((p_pos, p_size), (pos, size), y.dtype)
+        return {'background mean': background_mean, 'y': y - background_mean}
+
+    # get perisomatic roi and cell roi sums in one pass
+    p_roi = (p_pos, p_size, angle, roi_ellipse_mode)
+    cell_roi = (pos, size, angle, roi_ellipse_mode)
+    img = roi_image
+    if level is not None:
+        img = level.data
+        p_roi, cell_roi = level.scaleROI(*p_roi), level.scaleROI(*cell_roi)
+    # the background is the ring around the cell: the perisomatic roi without the cell roi
+    ring_weights = ringWeights(roiWeights(img.shape[1:], *p_roi), roiWeights(img.shape[1:], *cell_roi))
+    background_mean = extractTraces(img, [ring_weights], dtype = y.dtype)[0]
+    if level is not None:
+        background_mean = level.upsample(background_mean, len(y))
+
+    return {'background mean': background_mean, 'y': y - background_mean}
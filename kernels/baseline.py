@@ -0,0 +1,136 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+
+from model.ResultCache import fingerprint
+from util import functions
+from util.conf import al_params, bb_params, bl_gradient_params
+
+class ALSStates():
+    '''
+    The weights of the latest asymmetric least squares calculations, such that a calculation of the same trace
+        with the same smooth and p continues where the previous one stopped instead of starting again, e.g.
+        when the iterations are increased. at most al_params['states'] calculations are kept.
+    '''
+
+    def __init__(self):
+        self.states = OrderedDict()
+        self.lock = threading.Lock()
+
+    def calculate(self, y, iterations, smooth, p):
+        '''
+        returns the baseline of functions.als, with the dtype of functions.floatType(y).
+        '''
+        key = fingerprint((y, smooth, p))
+        with self.lock:
+            state = self.states.get(key)
+        if state is not None and state[0] == iterations:
+            baseline = state[1]
+        else:
+            if state is not None and state[0] < iterations:
+                # continue with the weights of the previous calculation
+                baseline, w = alsIterations(y, iterations - state[0], smooth, p, state[2])
+            else:
+                baseline, w = alsIterations(y, iterations, smooth, p)
+            with self.lock:
+                self.states[key] = (iterations, baseline, w)
+                self.states.move_to_end(key)
+                while len(self.states) > al_params['states']:
+                    self.states.popitem(last = False)
+        return baseline.astype(functions.floatType(y))
+
+als_states = ALSStates()
+
+def blockMode(y):
+    '''
+    returns True if the baseline of y is calculated in blocks, see bb_params.
+    '''
+    return bb_params['active'] and len(y) >= bb_params['min_length']
+
+def alsIterations(y, iterations, smooth, p, w = None):
+    '''
+    see functions.alsIterations. long traces are calculated in blocks, see functions.blockALS.
+    '''
+    if blockMode(y):
+        return functions.blockALS(y, iterations, smooth, p, w, bb_params['block_size'], bb_params['tolerance'], bb_params['workers'])
+    return functions.alsIterations(y, iterations, smooth, p, w)
+
+def subtractBaseline(y, baseline, object_source):
+    '''
+    returns y relative to the baseline: the gradient in percent for image sequences (see bl_gradient_params), the
+        difference otherwise. y and baseline may have several traces in their rows.
+    '''
+    if object_source.filetype == 'tif':
+        return functions.getGradient(y, baseline, **bl_gradient_params)
+    return y - baseline
+
+def validMarkerPosition(marker, initial_position, n, min_difference = 4):
+    '''
+    returns the initial position if it is not within min_difference of a marker. otherwise, returns the middle
+        of the largest gap between the markers and the borders 0 and n, or -1 if the gap is smaller than
+        min_difference.
+    '''
+    if all(not (pos - min_difference < initial_position < pos + min_difference) for pos in marker):
+        return initial_position
+    positions = sorted(set(marker) | {0, n})
+    best_difference, best_difference_position = max([(positions[i+1] - positions[i], positions[i]) for i in range(len(positions)-1)], key = lambda _tuple: _tuple[0])
+    if best_difference >= min_difference:
+        return best_difference_position + int(best_difference / 2)
+    return -1
+
+def completeMarkers(marker, polyorder, n):
+    '''
+    marker:
+        list of int.
+        the positions of the baseline markers.
+    n:
+        int.
+        the length of the trace.
+    returns a new list with the markers and evenly distributed markers that are added if there are less than
+        polyorder+1 markers. markers that can not be placed are left out.
+    '''
+    marker = list(marker)
+    diff = polyorder + 1 - len(marker)
+    if diff <= 0:
+        return marker
+    if diff == 1:
+        positions = [round((n-1)/2)]
+    else:
+        positions = [round((d+1)*(n-1)/diff) for d in range(diff)]
+    for pos in positions:
+        valid_pos = validMarkerPosition(marker, pos, n)
+        if valid_pos != -1:
+            marker.append(valid_pos)
+    return marker
+
+def polynomialFitting(y, object_source, intercept, polyorder, use_marker, marker):
+    '''
+    Polynomial fitting with optional baseline markers. if use_marker is set, only the values at the markers
+        are fitted. markers are added if there are less than polyorder+1 markers, see completeMarkers.
+    '''
+    x = object_source.frameRange()
+    if use_marker:
+        marker = np.array(completeMarkers(marker, polyorder, len(y)), dtype = int)
+        baseline = functions.fitting(x, x[marker], y[marker], intercept, polyorder)
+    else:
+        baseline = functions.fitting(x, x, y, intercept, polyorder)
+    return {'baseline': baseline, 'y': subtractBaseline(y, baseline, object_source)}
+
+def asymmetricLeastSquares(y, object_source, iterations, smooth, intercept, p = 0.001):
+    '''
+    raises an exception if the least squares problem can not be solved. the calculation continues from a
+        previous calculation of the trace with less iterations, see ALSStates.
+    '''
+    baseline = als_states.calculate(y, iterations, smooth, p) + intercept
+    return {'baseline': baseline, 'y': subtractBaseline(y, baseline, object_source)}
+
+def topHat(y, object_source, factor):
+    if blockMode(y):
+        baseline = functions.blockTopHat(y, factor, bb_params['block_size'], bb_params['workers'])
+    else:
+        baseline = functions.topHat(y, factor)
+    return {'baseline': baseline, 'y': subtractBaseline(y, baseline, object_source)}
+
+def movingAverage(y, object_source, window = 11):
+    baseline = functions.movingAverage(y, window)
+    return {'baseline': baseline, 'y': subtractBaseline(y, baseline, object_source)}
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+
+from model.Source import Source
+from kernels import baseline, frequency, smoothing, events, shape, spectrum
+from util.conf import (bl_polynomial_fitting_params, bl_asymmetric_ls_params, bl_top_hat_params, bl_moving_average_params,
+    af_params, sg_savitzky_golay_params, sg_moving_average_params, sg_butterworth_params, sg_scaled_window_convolution_params,
+    sd_params, bd_params, es_params, fs_fft_params, al_params)
+
+# the kernels of the trace steps with the default parameters of their methods, see model.batch.calculating_steps.
+# the kernels are called with the input of the step and the parameters as keyword arguments.
+benchmark_kernels = [
+    ('Baseline', 'Polynomial Fitting', baseline.polynomialFitting, bl_polynomial_fitting_params),
+    ('Baseline', 'Asymmetric Least Squares', baseline.asymmetricLeastSquares, bl_asymmetric_ls_params),
+    ('Baseline', 'Top Hat', baseline.topHat, bl_top_hat_params),
+    ('Baseline', 'Moving Average', baseline.movingAverage, bl_moving_average_params),
+    ('Adjust Frequency', 'Nearest Neighbour', frequency.nearestNeighbour, af_params),
+    ('Adjust Frequency', 'Linear', frequency.linear, af_params),
+    ('Adjust Frequency', 'Cubic', frequency.cubic, af_params),
+    ('Smoothing', 'Savitzky Golay', smoothing.savitzkyGolay, sg_savitzky_golay_params),
+    ('Smoothing', 'Moving Average', smoothing.movingAverage, sg_moving_average_params),
+    ('Smoothing', 'Butterworth', smoothing.butterworth, sg_butterworth_params),
+    ('Smoothing', 'Scaled Window Convolution', smoothing.scaledWindowConvolution, sg_scaled_window_convolution_params),
+    ('Spike Detection', 'Threshold', events.spikeDetection, sd_params),
+    ('Burst Detection', 'Threshold', events.burstDetection, bd_params),
+    ('Event Shape', 'Spike Shape', shape.spikeShape, es_params),
+    ('Event Shape', 'Burst Shape', shape.burstShape, es_params),
+    ('Power Spectrum', 'Fast Fourier Transform', spectrum.fourier, fs_fft_params)
+]
+
+def syntheticTrace(length, frequency, seed = 0):
+    '''
+    returns a trace with a slow drift, noise and spikes, and its ABF source.
+    '''
+    rng = np.random.default_rng(seed)
+    x = np.arange(length)
+    y = 0.5 * np.sin(x / length * np.pi) + rng.normal(0, 0.1, length)
+    y[rng.choice(length, max(1, length // 500), replace = False)] += 2
+    source = Source(filetype = 'abf', original_frequency = frequency, adjusted_frequency = frequency / 2,
+        start = 0, end = length, offset = 0.0, _data = y)
+    return y, source
+
+def benchmark(kernel, kwargs, repeat = 5):
+    '''
+    returns the best wall time of repeat calls of the kernel with the keyword arguments in seconds.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        kernel(**kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmarkKernels(length = 100000, frequency = 250.0, repeat = 3):
+    '''
+    benchmarks the kernels of benchmark_kernels on a synthetic trace, without Qt.
+    returns a list of (step name, method name, seconds) with the best wall time of every kernel.
+    '''
+    y, source = syntheticTrace(length, frequency)
+    spike_time = events.spikeDetection(y, frequency, 0, **sd_params)['time']
+    burst_time = events.burstDetection(y, frequency, 0, **bd_params)['time']
+    input_ = {
+        'y': y,
+        'object_source': source,
+        'object_source_frequency': frequency,
+        'object_source_af_params': (source.original_frequency, source.adjusted_frequency, True, 0),
+        'object_noise_std': 0,
+        'burst_time': burst_time,
+        'spike_time': spike_time
+    }
+    results = []
+    # the kernels are measured without warm starts, such that repeated calls calculate again
+    als_states = al_params['states']
+    al_params['states'] = 0
+    try:
+        for name, method, kernel, parameters in benchmark_kernels:
+            kernel_input = {key: value for key, value in input_.items() if key in kernel.__code__.co_varnames[:kernel.__code__.co_argcount]}
+            results.append((name, method, benchmark(kernel, {**kernel_input, **parameters}, repeat)))
+    finally:
+        al_params['states'] = als_states
+    return results
@@ -0,0 +1,295 @@
+import numpy as np
+from scipy.signal import savgol_filter
+
+from util.functions import movingAverage, func_exp
+
+def defaultNoiseStd(y, object_noise_std):
+    '''
+    returns object_noise_std, or the std of a default noise if there is no noise std (0).
+    '''
+    if object_noise_std == 0:
+        noise = y - savgol_filter(y, 5, 3)
+        return np.std(noise)
+    return object_noise_std
+
+def threshold(y, value, dynamic_threshold, dynamic_smooth):
+    '''
+    returns the threshold for every frame: the moving average of y plus value if dynamic_threshold is set,
+        otherwise value.
+    '''
+    if dynamic_threshold:
+        return movingAverage(y, window=dynamic_smooth)+value
+    return np.full(len(y), value, dtype=y.dtype)
+
+# ================
+# burst detection
+# ================
+
+def burstDetection(y, object_source_frequency, object_noise_std, dynamic_threshold, relative_threshold, dynamic_smooth, absolute_amplitude, relative_amplitude_type, relative_amplitude, absolute_base, relative_base, duration, phase):
+    '''
+    returns the bursts and their quantities. 'amplitude threshold' and 'base threshold' are the thresholds
+        that were used for every frame.
+    '''
+
+    x = np.arange(len(y))
+
+    isDepolarization = phase == 'depolarization'
+
+    # if there is no noise std, we calculate a default noise and its std
+    object_noise_std = defaultNoiseStd(y, object_noise_std)
+
+    # thresholds
+    if relative_threshold:
+        amplitude = relative_amplitude * (object_noise_std if relative_amplitude_type == 'use std of noise' else np.std(y))
+        if relative_base == 'minimal base: median':
+            base = np.median(y)
+        elif relative_base == 'minimal base: mean':
+            base = np.mean(y)
+        else:
+            base = 0
+    else:
+        base = absolute_base
+        amplitude = absolute_amplitude
+
+    th1 = threshold(y, amplitude, dynamic_threshold, dynamic_smooth)
+    th2 = threshold(y, base, dynamic_threshold, dynamic_smooth)
+
+    # change duration from ms to frames
+    duration = object_source_frequency * duration / 1000.0
+
+    # get bursts (starts,ends) as frame index
+    bursts = detectBursts(y, th1, th2, duration, isDepolarization)
+
+    # get meta data
+    if len(bursts[0]) != 0:
+        from scipy.optimize import curve_fit
+
+        start = bursts[0]
+        end = bursts[1]
+        n = len(start)
+        burstStart = np.array(x[start])
+        burstEnd = np.array(x[end])
+        peak = [s+(np.argmax(y[s:e]) if isDepolarization else np.argmin(y[s:e])) for s,e in np.nditer([start,end])]
+        amplitude = y[peak]
+        duration = burstEnd-burstStart
+        tPeak = np.zeros(len(peak), dtype=np.int32)
+        np.subtract(peak, start, out = tPeak)
+        aMax = amplitude - th2[peak]
+        tDecay = np.zeros_like(aMax)
+        i = 0
+        for decay_start,decay_end in np.nditer([peak, burstEnd]):
+            decay_data = y[decay_start:decay_end]
+            if len(decay_data) < 3:
+                tDecay[i] = np.nan
+            else:
+                try:
+                    x_data = np.linspace(0, (decay_end-decay_start)/object_source_frequency, decay_end-decay_start)
+                    popt, _ = curve_fit(func_exp, xdata=x_data, ydata=decay_data, p0=[2.5, 15])
+                    tDecay[i] = 1/popt[1]
+                except:
+                    tDecay[i] = np.nan
+            i += 1
+
+        return {
+            'start': burstStart,
+            'end': burstEnd,
+            'time': x[peak],
+            'amplitude': amplitude,
+            'duration': duration,
+            'train': burstTrain(bursts, len(y), y.dtype),
+            'burst frequency': n*object_source_frequency/x[-1],
+            'mean amplitude': amplitude.mean(),
+            'mean duration': duration.mean(),
+            'tPeak': tPeak,
+            'aMax': aMax,
+            'τDecay': tDecay,
+            'mean tPeak': tPeak.mean(),
+            'mean aMax': aMax.mean(),
+            'mean τDecay': tDecay[~np.isnan(tDecay)].mean(),
+            'amplitude threshold': th1,
+            'base threshold': th2
+        }
+    else:
+        return {
+            'start': np.array([]),
+            'end': np.array([]),
+            'time': np.array([]),
+            'amplitude': np.array([]),
+            'duration': np.array([]),
+            'train': np.zeros(len(y)-1, dtype=y.dtype),
+            'burst frequency': 0,
+            'mean amplitude': np.nan,
+            'mean duration': np.nan,
+            'tPeak': np.array([]),
+            'aMax': np.array([]),
+            'τDecay': np.array([]),
+            'mean tPeak': np.nan,
+            'mean aMax': np.nan,
+            'mean τDecay': np.nan,
+            'amplitude threshold': th1,
+            'base threshold': th2
+        }
+
+def detectBursts(y, amplitude, base, duration, isDepolarization):
+    """
+    y: signal
+    amplitude: upper threshold to decide whether there is a burst or not
+    base: lower threshold to determine the start and end of the burst
+    duration: amount of frames that a burst's length must be at minimum
+    isDepolarization: defines if depolarization or hyperpolarization
+            should be detected
+
+    returns tuple of arrays: start frames and end frames of the bursts
+
+    definition of burst: one point must be at least the upper threshold (amplitude).
+    the start of the burst is the intersection of the signal (y) with the
+    lower threshold (base) on the left of the point above the upper threshold.
+    the end of the burst is the intersection of the signal (y) with the
+    lower threshold (base) on the right of the point above the upper threshold.
+    the burst only counts if it is at least duration long.
+    """
+    bursts = ([],[])
+    n = len(y)
+    i = 1
+    while (i < n-2):
+        if (isDepolarization and y[i] > amplitude[i]) or (not isDepolarization and y[i] < amplitude[i]):
+            start, end, error = burstBorders(y, base, i, 0 if len(bursts[0]) == 0 else bursts[1][-1]+1, isDepolarization)
+            if end-start > duration and not error:
+                bursts[0].append(start)
+                bursts[1].append(end)
+            i = end + 2
+        else:
+            i += 1
+    return bursts
+
+def burstBorders(y, base, i, leftborder, isDepolarization):
+    """
+    y: signal
+    base: lower threshold to determine start and end of burst
+    i: frame of the point above the upper threshold
+    leftborder: the most-left border the burst can start at
+    isDepolarization: defines if depolarization or hyperpolarization
+            should be detected
+
+    returns the intersections of the signal with the base on both sides
+    of the point above the upper threshold, and an error-boolean. this
+    is True when start/end are not below the base, but we stopped because
+    of the borders.
+    """
+    n = len(y) - 1
+    start = i - 1
+    while (start > leftborder and ((isDepolarization and y[start] >= base[start]) or (not isDepolarization and y[start] <= base[start]))):
+        start -= 1
+    end = i + 1
+    while (end < n and ((isDepolarization and y[end] >= base[end]) or (not isDepolarization and y[end] <= base[end]))):
+        end += 1
+    error = (isDepolarization and (y[start] >= base[start] or y[end] >= base[end])) or (not isDepolarization and (y[start] <= base[start] or y[end] <= base[end]))
+    return (start, end, error)
+
+def burstTrain(bursts, n, dtype=float):
+    burst_train = np.zeros(n-1,dtype=dtype)
+    s,e = bursts
+    for i in range(len(s)):
+        burst_train[s[i]:e[i]] = 1
+    return burst_train
+
+# ================
+# spike detection
+# ================
+
+def spikeDetection(y, object_source_frequency, object_noise_std, dynamic_threshold, relative_threshold, dynamic_smooth, absolute_amplitude, relative_amplitude_type, relative_amplitude, interval):
+    '''
+    returns the spikes and their quantities. 'threshold' is the threshold that was used for every frame.
+    '''
+
+    x = np.arange(len(y))
+
+    # if there is no noise std, we calculate a default noise and its std
+    object_noise_std = defaultNoiseStd(y, object_noise_std)
+
+    if relative_threshold:
+        amplitude = relative_amplitude * (object_noise_std if relative_amplitude_type == 'use std of noise' else np.std(y))
+    else:
+        amplitude = absolute_amplitude
+
+    th = threshold(y, amplitude, dynamic_threshold, dynamic_smooth)
+
+    # change interval from ms to frames
+    interval = object_source_frequency * interval / 1000.0
+
+    # get spike positions as frame numbers
+    spikes = detectSpikes(y, th, interval)
+
+    n = len(spikes)
+    if n != 0:
+        from scipy.optimize import curve_fit
+        time = x[spikes]
+        amplitude = y[spikes]
+
+        decay = np.zeros_like(amplitude)
+        i = 0
+        for decay_start in time:
+            if interval < 3:
+                decay[i] = np.nan
+            else:
+                decay_interval = round(interval/2)
+                decay_data = y[decay_start:decay_start+decay_interval]
+                try:
+                    x_data = np.linspace(0, decay_interval/object_source_frequency, decay_interval)
+                    popt, _ = curve_fit(func_exp, xdata=x_data, ydata=decay_data, p0=[2.5, 15])
+                    decay[i] = 1/popt[1]
+                except:
+                    decay[i] = np.nan
+            i += 1
+
+        return {
+            'spike frequency': n*object_source_frequency/x[-1],
+            'mean amplitude': np.mean(amplitude),
+            'train': spikeTrain(spikes, len(y), y.dtype),
+            'time': time,
+            'amplitude': amplitude,
+            'τDecay': decay,
+            'mean τDecay': decay[~np.isnan(decay)].mean(),
+            'threshold': th
+        }
+    else:
+        return {
+            'spike frequency': None,
+            'mean amplitude': None,
+            'train': None,
+            'time': None,
+            'amplitude': None,
+            'τDecay': None,
+            'mean τDecay': None,
+            'threshold': th
+        }
+
+def detectSpikes(y, thresh, interval):
+    """
+    interval in frames
+    """
+    spikes = []
+    i = 1
+    n = len(y)
+    while i < n-1:
+        # if value is over the threshold and a local maximum
+        if y[i]>thresh[i]:
+            if (y[i] >= y[i-1] and y[i] >= y[i+1]):
+                spikes.append(i)
+        i+=1
+    j = 0
+    while j < len(spikes)-1:
+        if (spikes[j+1]-spikes[j]) < interval:
+            if y[spikes[j]]>y[spikes[j+1]]:
+                del spikes[j+1]
+            else:
+                del spikes[j]
+        else:
+            j+=1
+    return spikes
+
+def spikeTrain(spikes, n, dtype=float):
+    spike_train = np.zeros(n-1,dtype=dtype)
+    for s in spikes:
+        spike_train[s] = 1
+    return spike_train
@@ -0,0 +1,23 @@
+import numpy as np
+from scipy.interpolate import interp1d
+
+def interpolate(y, object_source_original_frequency, adjusted_frequency, kind):
+    '''
+    returns y interpolated with the given kind ('nearest', 'linear' or 'cubic') such that its frequency
+        changes from the original to the adjusted frequency.
+    '''
+    old_x_len = len(y)
+    interpolated = interp1d(range(old_x_len), y, kind = kind)
+    factor = adjusted_frequency / object_source_original_frequency
+    new_x = np.linspace(0, old_x_len-1, num=round(factor * old_x_len), endpoint=True)
+    return {'y': interpolated(new_x)}
+
+# object_source_af_params is (original frequency, adjusted frequency, active, method)
+def nearestNeighbour(y, object_source_af_params, adjusted_frequency):
+    return interpolate(y, object_source_af_params[0], adjusted_frequency, 'nearest')
+
+def linear(y, object_source_af_params, adjusted_frequency):
+    return interpolate(y, object_source_af_params[0], adjusted_frequency, 'linear')
+
+def cubic(y, object_source_af_params, adjusted_frequency):
+    return interpolate(y, object_source_af_params[0], adjusted_frequency, 'cubic')
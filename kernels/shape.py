@@ -0,0 +1,66 @@
+import numpy as np
+
+from util.functions import movingAverage
+
+def spikeShape(y, burst_time, spike_time, object_source_frequency, smooth, interval):
+    return eventShape(y, spike_time, object_source_frequency, smooth, interval)
+
+def burstShape(y, burst_time, spike_time, object_source_frequency, smooth, interval):
+    return eventShape(y, burst_time, object_source_frequency, smooth, interval)
+
+def eventShape(y, time, object_source_frequency, smooth, interval):
+    '''
+    returns the shapes around the events at time (in frames), their mean and the smoothed mean.
+        interval is the area before and after the events in ms.
+    '''
+
+    if time is None or isinstance(time, bool):
+        return {
+            'shapes': None,
+            'mean shape': None,
+            'mean shape smoothed': None
+        }
+
+    left,right = interval
+    left = round(left * object_source_frequency / 1000.0)
+    right = round(right * object_source_frequency / 1000.0)
+    interval = left,right
+    shapes = getShapes(y, time, interval)
+    meanShape = getMeanShape(shapes)
+    meanShapeSmoothed = movingAverage(meanShape, window=smooth)
+
+    return {'shapes': shapes, 'mean shape': meanShape, 'mean shape smoothed': meanShapeSmoothed}
+
+def getShapes(signal, peaks, interval):
+    '''
+    Cut out spike/burst shapes from the signal
+    signal (ndarray) : signal from where the spikes are subtracted
+    peaks (ndarray) : time points of spike/burst peaks in frames
+    interval (tuple) : area before and after peak in frames
+    '''
+    m = len(signal)
+    # start and end point
+    backward, forward = interval
+    shapes = []
+    for peak in peaks:
+        start = peak - backward
+        end = peak + forward
+        # if start is negative, repeat the first value of signal
+        if start < 0:
+                diff_start = np.repeat(signal[0], abs(start))
+                shape = np.concatenate([diff_start, signal[:end]])
+        # if end is bigger than signal length, repeat last value of signal
+        elif end >= m:
+                diff_end = np.repeat(signal[m-1], (end-m))
+                shape = np.concatenate([signal[start:],diff_end])
+        else:
+            shape = signal[start:end]
+        shapes.append(shape)
+    return np.array(shapes)
+
+def getMeanShape(shapes):
+    '''
+    Calculate mean spike/burst shape
+    shapes (ndarray) : spike/burst shapes
+    '''
+    return shapes.mean(axis=0)
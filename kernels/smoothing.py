@@ -0,0 +1,52 @@
+import numpy as np
+from scipy import signal
+
+from util import functions
+
+def savitzkyGolay(y, object_source_frequency, polyorder, window):
+    '''Savitzky Golay Filtering'''
+    if window%2 == 0:
+        window+=1
+    if window > polyorder:
+        sg = signal.savgol_filter(y, window, polyorder)
+    else:
+        sg = y
+
+    noise = y - sg
+
+    return {'y': sg, 'noise_std': np.std(noise)}
+
+def movingAverage(y, object_source_frequency, window = 11):
+    y_smoothed = functions.movingAverage(y, window)
+    noise = y - y_smoothed
+    return {'y': y_smoothed, 'noise_std': np.std(noise)}
+
+def butterworth(y, object_source_frequency, highcut, order):
+    y_smoothed = functions.butter_lowpass_filter(y, object_source_frequency, highcut, order)
+    noise = y - y_smoothed
+    return {'y': y_smoothed, 'noise_std': np.std(noise)}
+
+def scaledWindowConvolution(y, object_source_frequency, window_len, window):
+    '''
+    scaled window smoothing.
+    code adapted from https://scipy-cookbook.readthedocs.io/items/SignalSmooth.html
+    '''
+    if window_len % 2 == 0:
+        window_len += 1
+    s=np.r_[y[window_len-1:0:-1],y,y[-2:-window_len-1:-1]]
+    if (window == 'hamming'):
+        w = np.hamming(window_len)
+    elif (window == 'bartlett'):
+        w = np.bartlett(window_len)
+    elif (window == 'blackman'):
+        w = np.blackman(window_len)
+    else:
+        w = np.hanning(window_len)
+
+    w = w.astype(functions.floatType(y))
+    swc = np.convolve(w/w.sum(), s, mode='valid')
+    swc = swc[(int(window_len/2)-1):-int(window_len/2)-1]
+
+    noise = y - swc
+
+    return {'y': swc, 'noise_std': np.std(noise)}
@@ -0,0 +1,36 @@
+import numpy as np
+
+from util.functions import movingAverage
+
+def fourier(y, object_source_frequency, smooth, threshold, interval):
+    '''
+    returns the power spectral density of y in the frequency interval, with values below threshold set to 0
+        and smoothed with a moving average.
+    '''
+    y_detrended = y - np.mean(y)
+
+    fft = np.fft.fft(y_detrended)
+    fft = fft / len(fft)
+    psd = np.abs(fft)**2
+    freqs = np.fft.fftfreq(len(y_detrended), 1 / object_source_frequency)
+
+    left_closest_index = np.argmin(np.abs(freqs - interval[0]))
+    right_closest_index = np.argmin(np.abs(freqs - interval[1]))
+
+    freqs = freqs[left_closest_index:right_closest_index+1]
+    psd = psd[left_closest_index:right_closest_index+1]
+
+    psd[psd < threshold] = 0
+    psd = movingAverage(psd, window = smooth)
+
+    if len(freqs) != len(psd):
+        return {
+            'frequencies': None,
+            'psd': None,
+            'max power': None,
+            'max power frequency': None
+        }
+    peak = np.argmax(psd)
+    peak_frequency = freqs[peak]
+    peak = psd[peak]
+    return {'frequencies':freqs, 'psd':psd, 'max power': peak, 'max power frequency': peak_frequency}
@@ -1,22 +1,96 @@
-from PyQt5 import QtGui, QtWidgets, QtCore
-import pyqtgraph as pg
-import qdarkstyle
+import time
+start_time = time.perf_counter()
+
+import argparse
 import sys
 
-from view.Nosa import Nosa
-from model.TIFLoader import TIFLoader
+def parseArguments():
+    parser = argparse.ArgumentParser(description = 'NOSA - Neuro-Optical Signal Analysis')
+    parser.add_argument('--batch', nargs = '+', metavar = 'FILE',
+        help = 'process the TIF and ABF files without the GUI and export each to an xlsx file')
+    parser.add_argument('--rois', metavar = 'JSON',
+        help = 'JSON file with the rois of the TIF files, see model.batch.readROIs')
+    parser.add_argument('--pipeline', metavar = 'JSON',
+        help = 'JSON file with the methods and parameters of the pipeline steps, see model.batch.readPipelineConfiguration')
+    parser.add_argument('--output', default = '.', metavar = 'DIRECTORY',
+        help = 'directory of the exported files (default: current directory)')
+    parser.add_argument('--frequency', type = float, default = 250.0,
+        help = 'recording frequency of TIF files in Hz, if it is not cached (default: 250.0)')
+    parser.add_argument('--workers', type = int, default = 0,
+        help = 'amount of worker processes, 0 means one per CPU (default: 0)')
+    parser.add_argument('--test', action = 'store_true',
+        help = 'run the unittests and exit')
+    parser.add_argument('--startup-time', action = 'store_true',
+        help = 'print the time it takes until the GUI is usable')
+    parser.add_argument('--profile', metavar = 'TRACE',
+        help = 'record the feature updates and plot refreshes and export them as a Chrome trace file at exit')
+    parser.add_argument('--benchmark', action = 'store_true',
+        help = 'print the calculation times of the feature methods on a synthetic trace and exit')
+    return parser.parse_args()
 
-import unittest
-from tests.BaselineTest import BaselineTest
-from tests.SmoothingTest import SmoothingTest
-from tests.SpikeDetectionTest import SpikeDetectionTest
-from tests.BurstDetectionTest import BurstDetectionTest
-from tests.EventShapeTest import EventShapeTest
-from tests.PowerSpectrumTest import PowerSpectrumTest
+def batch(args):
+    '''
+    processes the files headless: no QApplication and no widget is created.
+    '''
+    from model.batch import runBatch, readROIs, readPipelineConfiguration
 
-if __name__ == '__main__':
+    def callback(result):
+        filepath, export_path, error = result
+        if error is None:
+            print('{} -> {}'.format(filepath, export_path))
+        else:
+            print('{} failed:\n{}'.format(filepath, error), file = sys.stderr)
+
+    results = runBatch(
+        args.batch,
+        readROIs(args.rois),
+        readPipelineConfiguration(args.pipeline),
+        args.output,
+        original_frequency = args.frequency,
+        workers = args.workers,
+        callback = callback)
+    return 0 if all(error is None for _, _, error in results) else 1
+
+def test():
+    '''
+    runs the unittests and returns the exit code.
+    '''
+    import unittest
+
+    suite = unittest.defaultTestLoader.loadTestsFromName('tests.FeatureTests')
+    result = unittest.TextTestRunner().run(suite)
+    return 0 if result.wasSuccessful() else 1
+
+def benchmark():
+    '''
+    prints the calculation times of the kernels, see kernels.benchmark. Qt is not imported.
+    '''
+    from kernels.benchmark import benchmarkKernels
+
+    for name, method, seconds in benchmarkKernels():
+        print('{:<20}{:<30}{:>10.2f} ms'.format(name, method, seconds * 1000))
+    return 0
+
+def gui(show_startup_time, profile_path = None):
+    '''
+    starts the GUI.
+    show_startup_time:
+        bool.
+        if True, the time from the start of the process until the event loop runs is printed.
+    profile_path:
+        str, or None. default is None.
+        if not None, the profiler records from the start and the records are exported to the path at exit,
+        see util.profiling.Profiler.
+    '''
+    from PyQt5 import QtGui, QtWidgets, QtCore
+    import pyqtgraph as pg
+    import qdarkstyle
 
-    unittest.main(exit = False)
+    from view.Nosa import Nosa
+    from util.profiling import profiler
+
+    if profile_path is not None:
+        profiler.setActive(True)
 
     app = QtGui.QApplication(['-platform', 'minimal'])
     app.setStyleSheet(qdarkstyle.load_stylesheet_pyqt5())
@@ -26,6 +100,26 @@ if __name__ == '__main__':
     nosa = Nosa(conf)
     nosa.show()
 
+    if show_startup_time:
+        # the timer fires as soon as the event loop processes events, i.e. when the window is usable
+        QtCore.QTimer.singleShot(0, lambda: print('Startup time: {:.3f} s'.format(time.perf_counter() - start_time)))
+
     app.exec_()
 
     QtCore.QThreadPool.globalInstance().waitForDone()
+
+    if profile_path is not None:
+        profiler.exportChromeTrace(profile_path)
+
+if __name__ == '__main__':
+
+    args = parseArguments()
+
+    if args.test:
+        sys.exit(test())
+    elif args.benchmark:
+        sys.exit(benchmark())
+    elif args.batch:
+        sys.exit(batch(args))
+    else:
+        gui(args.startup_time, args.profile)
@@ -1,11 +1,125 @@
 from PyQt5 import QtCore, QtWidgets
-import quantities as pq
 import numpy as np
 import pyabf
 
 from threads.Worker import Worker
 from view.ABFLoaderDialog import ABFLoaderDialog
 from model.Source import Source
+from model.SourceCache import SourceCache
+from util.conf import sc_params
+
+def memoryMapABF(abf):
+    '''
+    abf:
+        pyabf.ABF.
+        abf opened with loadData = False.
+    returns the raw samples of the abf file as read-only memmap with shape (points, channels), without reading them.
+    '''
+    return np.memmap(
+        abf.abfFilePath,
+        dtype = abf._dtype,
+        mode = 'r',
+        offset = abf.dataByteStart,
+        shape = (abf.dataPointCount // abf.channelCount, abf.channelCount))
+
+def sweepBounds(abf, sweep):
+    '''
+    returns (first point, amount of points) of the sweep, the same way as pyabf.ABF.setSweep determines them.
+    '''
+    if abf.sweepCount > 1 and hasattr(abf, '_synchArraySection') and len(set(abf._synchArraySection.lLength)) > 1:
+        point_start = sum(abf._synchArraySection.lLength[i] // abf.channelCount for i in range(sweep))
+        return point_start, abf._synchArraySection.lLength[sweep] // abf.channelCount
+    return abf.sweepPointCount * sweep, abf.sweepPointCount
+
+def scaleABFSamples(abf, channel, samples):
+    '''
+    returns the raw samples of the channel as float32, scaled like pyabf does.
+    '''
+    data = samples.astype(np.float32)
+    if abf._dtype == np.int16:
+        data *= abf._dataGain[channel]
+        data += abf._dataOffset[channel]
+    return data
+
+def readABFSignal(abf, raw, channel, sweeps):
+    '''
+    abf:
+        pyabf.ABF.
+    raw:
+        np.memmap.
+        the memmap of the samples, see memoryMapABF.
+    channel:
+        int.
+        channel to read.
+    sweeps:
+        list of int.
+        sweeps to read. they are concatenated.
+    returns the scaled samples of the channel in the sweeps. only these samples are read and decoded.
+    '''
+    bounds = [sweepBounds(abf, sweep) for sweep in sweeps]
+    data = np.empty(sum(count for _, count in bounds), dtype = np.float32)
+    position = 0
+    for start, count in bounds:
+        data[position:position + count] = scaleABFSamples(abf, channel, raw[start:start + count, channel])
+        position += count
+    return data
+
+def abfSignals(abf, raw):
+    '''
+    abf:
+        pyabf.ABF.
+        abf opened with loadData = False.
+    raw:
+        np.memmap.
+        the memmap of the samples, see memoryMapABF. only the first and the last sample of each signal are read.
+    returns the lists of connected (one per channel) and unconnected (one per channel and sweep) signals that
+        can be imported. each signal is a dict with the tabledata for the ABFLoaderDialog, the channel and the sweeps.
+    '''
+    connected_data = []
+    unconnected_data = []
+    unconnected_counter = 0
+
+    for channel_index in abf.channelList:
+        bounds = [sweepBounds(abf, sweep) for sweep in abf.sweepList]
+        for sweep, (start, count) in zip(abf.sweepList, bounds):
+            unconnected_counter += 1
+            unconnected_data.append(
+                {
+                    'tabledata':
+                    [
+                        unconnected_counter,
+                        '{} (sweep {})'.format(abf.adcNames[channel_index], str(sweep)),
+                        scaleABFSamples(abf, channel_index, raw[start, channel_index]),
+                        scaleABFSamples(abf, channel_index, raw[start + count - 1, channel_index]),
+                        abf.adcUnits[channel_index],
+                        count,
+                        None
+                    ],
+                    'channel': channel_index,
+                    'sweeps': [sweep]
+                }
+            )
+
+        first_start, _ = bounds[0]
+        last_start, last_count = bounds[-1]
+        connected_data.append(
+            {
+                'tabledata':
+                [
+                    channel_index+1,
+                    abf.adcNames[channel_index],
+                    scaleABFSamples(abf, channel_index, raw[first_start, channel_index]),
+                    scaleABFSamples(abf, channel_index, raw[last_start + last_count - 1, channel_index]),
+                    abf.adcUnits[channel_index],
+                    sum(count for _, count in bounds),
+                    None
+                ],
+                'channel': channel_index,
+                'sweeps': list(abf.sweepList)
+            }
+        )
+
+    return connected_data, unconnected_data
 
 class ABFLoader():
 
@@ -21,9 +135,9 @@ class ABFLoader():
         
         def initialWork(filepath):
             """
-            Reads the blocks and the sampling rate.
+            Reads the header. The samples are not read.
             """
-            abf = pyabf.ABF(filepath)
+            abf = pyabf.ABF(filepath, loadData = False)
             return {'abf': abf,  'filepath': filepath}
         
         def initialWorkCallback(result_dict):
@@ -32,29 +146,78 @@ class ABFLoader():
 
             Asks the user which signals to import.
 
-            Creates the data objects if there are signals chosen.
+            Starts a Worker that reads the chosen signals.
             """
             result = result_dict['result']
             abf = result['abf']
+            raw = memoryMapABF(abf)
             data_manager.progress_dialog.setMaximum(1)
             data_manager.progress_dialog.setValue(1)
 
-            abf_loader_dialog = ABFLoaderDialog(data_manager.source_manager, abf)
+            connected_data, unconnected_data = abfSignals(abf, raw)
+            abf_loader_dialog = ABFLoaderDialog(data_manager.source_manager, connected_data, unconnected_data)
             ok = abf_loader_dialog.exec()
 
             if ok != QtWidgets.QDialog.Accepted:
                 return
 
-            data, number_displayed_options = abf_loader_dialog.getSelectedData()
-            amount = len(data)
+            signals, number_displayed_options = abf_loader_dialog.getSelectedData()
 
-            if amount == 0:
+            if len(signals) == 0:
                 return
 
-            filepath = result['filepath']
+            data_manager.progressDialog()
+            data_manager.progress_dialog.setMinimum(0)
+
+            load_worker = Worker(
+                work = loadWork,
+                kwargs = {'abf': abf, 'raw': raw, 'signals': signals},
+                callback = loadWorkCallback,
+                callback_kwargs = {'filepath': result['filepath'], 'number_displayed_options': number_displayed_options},
+                max_progress_callback = max_progress_callback,
+                progress_callback = progress_callback
+            )
+            QtCore.QThreadPool.globalInstance().start(load_worker)
+
+        def loadWork(abf, raw, signals, worker_max_progress_signal, worker_progress_signal):
+            """
+            Reads the samples of the chosen signals.
+            """
+            worker_max_progress_signal.emit(len(signals))
+            cache = SourceCache() if sc_params['active'] else None
+            for index, signal in enumerate(signals):
+                # decoded signals are memory-mapped from the cache
+                if cache is not None:
+                    cache_key = cache.key([abf.abfFilePath], channel = signal['channel'], sweeps = signal['sweeps'])
+                    cache_entry = cache.load(cache_key)
+                    if cache_entry is not None and cache_entry[0] is not None:
+                        signal['data'] = cache_entry[0]
+                        worker_progress_signal.emit(index + 1)
+                        continue
+                signal['data'] = readABFSignal(abf, raw, signal['channel'], signal['sweeps'])
+                if cache is not None:
+                    metadata = {'frequency': abf.dataRate, 'unit': signal['tabledata'][4], 'dtype': str(signal['data'].dtype), 'shape': list(signal['data'].shape)}
+                    cache.store(cache_key, metadata, signal['data'])
+                worker_progress_signal.emit(index + 1)
+            return {'abf': abf, 'signals': signals}
+
+        def max_progress_callback(max_progress):
+            data_manager.progress_dialog.setMaximum(max_progress)
+
+        def progress_callback(progress):
+            data_manager.progress_dialog.setValue(progress)
+
+        def loadWorkCallback(result_dict):
+            """
+            Creates the data objects for the chosen signals.
+            """
+            result = result_dict['result']
+            callback_kwargs = result_dict['callback_kwargs']
+            filepath = callback_kwargs['filepath']
+            number_displayed_options = callback_kwargs['number_displayed_options']
             name = filepath.split('/')[-1].split('.')[0]
-            freq = abf.dataRate
-            for  d in data:
+            freq = result['abf'].dataRate
+            for d in result['signals']:
                 data_ = d['data']
 
                 data_manager.sources.append(
@@ -67,7 +230,7 @@ class ABFLoader():
                         offset = 0.0,
                         _data = data_,
                         short_name = data_manager._source_name,
-                        unit = d['tabledata'][5]
+                        unit = d['tabledata'][4]
                     )
                 )
 
@@ -81,4 +244,4 @@ class ABFLoader():
         )
         
         QtCore.QThreadPool.globalInstance().start(initial_worker)
-        
\ No newline at end of file
+        
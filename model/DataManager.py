@@ -1,12 +1,17 @@
 import time
+import os
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5 import QtWidgets, QtCore
 import numpy as np
-from copy import deepcopy
 
 from features.AdjustFrequency import AdjustFrequency
-from features.EventDetection import SpikeDetection, BurstDetection
 from model.Object import Object
-from util.conf import af_params, cs_roi_params
+from model.PipelineRefresh import PipelineRefresh, StepRefresh, calculateInProcess
+from model.extraction import extractMeans
+from util.conf import af_params, cs_roi_params, br_params
+from util.functions import readOnly
+from util.profiling import refreshAllocationCounter, profiler
+from threads.RefreshScheduler import RefreshScheduler
 
 class DataManager():
 
@@ -35,6 +40,7 @@ class DataManager():
 
     def __init__(self, parent):
         self.parent = parent
+        self.refresh_scheduler = RefreshScheduler(self)
 
     def finishLoadSource(self):
         # set the adjusted frequency setting for the source
@@ -193,6 +199,44 @@ class DataManager():
             self.progressDialog()
             self.progress_dialog.setMaximum(5)
 
+        self.createObject(source, mask_object_index, update_progress)
+        
+        if update_progress:
+            self.progress_dialog.setValue(2)
+        
+        # calculate the new pipeline for first time
+        self.refreshPipeline(object_index = len(self.objects) - 1, start_with_feature = self.cell_selection, plot = False)
+        
+        if update_progress:
+            self.progress_dialog.setValue(3)
+            
+        self.showNewObjects(update_progress)
+
+        # finish time measure
+        self._time_needed_to_add_object = time.process_time() - start_time
+
+    def addObjects(self, mask_object_indices):
+        '''
+        mask_object_indices:
+            list of int.
+            determines what objects shall be used as copies for the initial settings of the new objects.
+        adds an object to the selected source for every mask object, see addObject. the pipelines of the new
+            objects are calculated at once, see refreshPipelines.
+        '''
+        if self.source_selection is None or len(mask_object_indices) == 0:
+            return
+        source = self.sources[self.source_selection]
+        for mask_object_index in mask_object_indices:
+            self.createObject(source, mask_object_index)
+        new_object_indices = list(range(len(self.objects) - len(mask_object_indices), len(self.objects)))
+        self.refreshPipelines(new_object_indices, start_with_feature = self.cell_selection, plot = False)
+        self.showNewObjects()
+
+    def createObject(self, source, mask_object_index = None, update_progress = False):
+        '''
+        creates an object for the source and initializes its pipeline, without calculating it. for
+            mask_object_index, see addObject.
+        '''
         # if no mask is specified: use selected object
         # copy spa (size, position, angle) only if there is a mask specified
         copy_spa = True
@@ -243,7 +287,7 @@ class DataManager():
         # create new object
         object_ = Object(name = name, source = source, **data)
         self.objects.append(object_)
-        object_.pipeline.initPipeline(self, source_is_tif = source_is_tif, parent = self.pipeline_manager.feature_view)
+        object_.pipeline.initPipeline(self, source_is_tif = source_is_tif)
         if mask_object_index is not None:
             object_.pipeline.initMethodConfigurations(self.objects[mask_object_index].pipeline, source.filetype)
 
@@ -253,16 +297,11 @@ class DataManager():
             source.adjust_frequency_active,
             source.adjust_frequency_method)
         object_.pipeline._adjust_frequency.inputConfiguration()
-        
-        if update_progress:
-            self.progress_dialog.setValue(2)
-        
-        # calculate the new pipeline for first time
-        self.refreshPipeline(object_index = len(self.objects) - 1, start_with_feature = self.cell_selection, plot = False)
-        
-        if update_progress:
-            self.progress_dialog.setValue(3)
-            
+
+    def showNewObjects(self, update_progress = False):
+        '''
+        resets the plots and views after objects have been added and selects the last object.
+        '''
         # reset the CC and compare plots. must be done before selectobject, because selectobject refreshes the plots
         # and for that we need the new created plots
         self.plot_manager.resetCrossCorrelationPlots()
@@ -281,9 +320,6 @@ class DataManager():
         if update_progress:
             self.progress_dialog.setValue(5)
 
-        # finish time measure
-        self._time_needed_to_add_object = time.process_time() - start_time
-
     def selectObject(self, selection = None, force_source_selection = False, force_plot_resizing = False, prevent_feature_undisplay = False):
         '''
         selection:
@@ -305,6 +341,7 @@ class DataManager():
         if selection is None:
             if len(self.objects) == 0:
                 self.object_selection = None
+                self.pipeline_manager.displayPipeline()
                 # call refreshPlots s.t. plots will be undisplayed
                 self.refreshPlots()
                 # may call selectsource to set valid source_selection
@@ -333,6 +370,9 @@ class DataManager():
         # set the change
         self.object_selection = selection
 
+        # let the features show the states of the selected object
+        self.pipeline_manager.displayPipeline()
+
         # set the correct state of the objectmanager buttons
         object_manager_buttons_enabled = selection is not None and self.objects[selection].source.filetype == 'tif'
         self.object_manager.add_btn.setEnabled(object_manager_buttons_enabled)
@@ -573,7 +613,8 @@ class DataManager():
                         source.adjust_frequency_active,
                         source.adjust_frequency_method)
                 feature.inputConfiguration()
-                self.refreshPipeline(plot = True, object_index = i, start_with_feature = feature, ignore_cross_correlation = i != affected_object_indices[-1])
+            self.refreshPipelines(affected_object_indices,
+                start_with_feature = [self.objects[i].pipeline._adjust_frequency for i in affected_object_indices])
 
     def setSourceAttributesCallback(self, set_source_attributes_callback_kwargs = None):
         
@@ -586,10 +627,16 @@ class DataManager():
         # get objects for the source
         object_indices_for_that_source = [i for i, o in enumerate(self.objects) if o.source is self.sources[self.source_selection]]
 
-        # refresh the pipeline for the affected objects
-        for index in object_indices_for_that_source:
-            # only do CC for the last object
-            self.refreshPipeline(plot = True, object_index = index, start_with_feature = self.cell_selection, ignore_cross_correlation = index != object_indices_for_that_source[-1])
+        # extract the cell means of all affected objects in one pass over the image sequence
+        source = self.sources[self.source_selection]
+        if source.filetype == 'tif' and len(object_indices_for_that_source) > 0:
+            objects = [self.objects[index] for index in object_indices_for_that_source]
+            cell_means = extractMeans(source.getData(), [(o.pos, o.size, o.angle, o.ellipse_mode) for o in objects], dtype = source.getPrecision())
+            for object_, cell_mean in zip(objects, cell_means):
+                object_.cell_mean = cell_mean
+
+        # refresh the pipeline for the affected objects at once, starting after the cellselection
+        self.refreshPipelines(object_indices_for_that_source, start_with_feature = 0)
 
 
     def setObjectAttributes(self, object_index = None, attributes = {}, prevent_object_manager_refresh = False, prevent_roiview_refresh = False):
@@ -721,14 +768,6 @@ class DataManager():
         # max processing index
         max_processing_index = max([calculating_pipeline.index(f) for f in pipeline.getProcessingFeatures()])
 
-        # spike detection and spike cc index
-        spike_detection_index = calculating_pipeline.index(pipeline._spike_detection)
-        spike_cc_index = calculating_pipeline.index(pipeline._spike_cross_correlation)
-
-        # eventdetection and eventshape index
-        burst_detection_index = calculating_pipeline.index(pipeline._burst_detection)
-        event_shape_index = calculating_pipeline.index(pipeline._event_shape)
-
         # determine where to start
         start_with_cell = False
         start_before = 0
@@ -764,34 +803,35 @@ class DataManager():
         if only_cross_correlation:
             start_before = min(cc_indices)
 
-        # determine where to stop
-        # default: stop after last feature.
-        stop_after = len(calculating_pipeline)-1
-        # if ignore cc: stop before cc.
-        if ignore_cross_correlation:
-            stop_after = min(cc_indices)-1
-        # if we start before the last processing feature, processing data is changed. this leads 
-        # to all features after it needing to be recalculated.
-        # but: if we start after the last processing feature, processing data will not be changed,
-        # only the analysing feature. this means we can stop right after the analysing feature.
-        # subtracting start_after_start_with_feature because this would otherwise falsify the statement.
-        # also check if processing_changed is True, because this indicates a change no matter what
-        if start_before - start_after_start_with_feature > max_processing_index and not processing_changed:
-            # exception: if analysing feature is spike detection, spike cc and eventshape must be updated.
-            if start_before - start_after_start_with_feature == spike_detection_index:
-                stop_after = max(spike_cc_index, event_shape_index)
-            # otherwise: if analysing feature is an eventdetection, eventshape must be updated.
-            elif start_before - start_after_start_with_feature == burst_detection_index:
-                stop_after = event_shape_index
-            # otherwise: stop right after the analysing feature
-            else:
-                stop_after = start_before
-        # if we should stop after processing: stop after processing.
-        if stop_after_processing:
-            stop_after = max_processing_index
-        # if we should only do cc: stop after cc.
+        # determine what to calculate: the steps that consume data that changed, directly or through data
+        # produced by other steps. see Feature.consumes and Pipeline.getDependentIndices.
         if only_cross_correlation:
-            stop_after = max(cc_indices)
+            calculate_indices = list(cc_indices)
+        elif start_after_processing:
+            # invert is done right after processing
+            calculate_indices = pipeline.getDependentIndices(max_processing_index + 1, [], invert_changed = processing_changed)
+        elif start_with_cell or edit_roi:
+            # the cell roi and its mean changed
+            calculate_indices = pipeline.getDependentIndices(0, self.cell_selection.produces, invert_changed = processing_changed)
+        elif start_with_feature is None or isinstance(start_with_feature, int) or start_with_feature not in calculating_pipeline:
+            # everything changed from start_before on, e.g. the source
+            calculate_indices = list(range(start_before, len(calculating_pipeline)))
+        else:
+            # the feature changed. it is calculated itself unless it has been already, which is the case
+            # if start_before is after it
+            feature_index = calculating_pipeline.index(start_with_feature)
+            calculate_indices = [feature_index] if start_before == feature_index else []
+            calculate_indices += pipeline.getDependentIndices(feature_index + 1, start_with_feature.produces, invert_changed = processing_changed)
+        # if ignore cc: do not calculate cc.
+        if ignore_cross_correlation and not only_cross_correlation:
+            calculate_indices = [index for index in calculate_indices if index not in cc_indices]
+        # if we should stop after processing: do not calculate after processing.
+        if stop_after_processing and not only_cross_correlation:
+            calculate_indices = [index for index in calculate_indices if index <= max_processing_index]
+
+        # stop after the last step that is calculated, but never before processing is done. the steps that
+        # are not calculated provide their previous output, which sets the processed data.
+        stop_after = max(calculate_indices + [max_processing_index])
 
         return (object_index,
             object_,
@@ -803,7 +843,8 @@ class DataManager():
             start_before,
             edit_roi, 
             stop_after,
-            cc_indices)
+            cc_indices,
+            calculate_indices)
 
     def refreshPipeline(self, plot = True, **kwargs):
         '''
@@ -811,21 +852,113 @@ class DataManager():
             bool. default is True.
             determines if refreshPlots will be called.
         for keyword arguments, see self._preparePipelineLoop
+        if pf_params['report_allocations'] is set, the bytes allocated by the refresh are printed.
+        the refresh is done right away. scheduled refreshes of the object (see RefreshScheduler) are done before.
+        '''
+        self.refresh_scheduler.flush(kwargs.get('object_index'))
+        self._refreshPipeline(plot, **kwargs)
+
+    def _refreshPipeline(self, plot, **kwargs):
+        with refreshAllocationCounter('refreshPipeline'):
+            refresh = self.preparePipelineRefresh(**kwargs)
+            if refresh is None:
+                # return if there are no objects available.
+                return
+            refresh.calculate()
+            self.publishPipelineRefresh(refresh, plot, **kwargs)
+
+    def refreshPipelines(self, object_indices, plot = True, **kwargs):
+        '''
+        refreshes the pipelines of several objects at once. the pipelines are calculated in worker processes
+            (see br_params), the cross correlations are calculated once after them and the plots are
+            refreshed once.
+        object_indices:
+            list of int.
+            the objects to refresh.
+        plot:
+            bool. default is True.
+            determines if the plots will be refreshed.
+        for keyword arguments, see self._preparePipelineLoop. start_with_feature may be a list with an entry for
+            every object. object_index and only_cross_correlation are not possible.
+        '''
+        if len(object_indices) == 0:
+            return
+        start_with_features = kwargs.pop('start_with_feature', None)
+        if not isinstance(start_with_features, list):
+            start_with_features = [start_with_features for _ in object_indices]
+        ignore_cross_correlation = kwargs.pop('ignore_cross_correlation', False)
+
+        with refreshAllocationCounter('refreshPipelines'):
+            # prepare the refreshes on the main thread, without cross correlations
+            refreshes = []
+            process_refreshes = []
+            for object_index, start_with_feature in zip(object_indices, start_with_features):
+                self.refresh_scheduler.flush(object_index)
+                refresh = self.preparePipelineRefresh(object_index = object_index, start_with_feature = start_with_feature,
+                    ignore_cross_correlation = True, **kwargs)
+                if refresh is None:
+                    continue
+                refreshes.append(refresh)
+                # features that use the GUI are calculated on the main thread right away, because preparing the
+                # next refresh changes the GUI, e.g. the image of the cell selection
+                if refresh.isThreadSafe():
+                    process_refreshes.append(refresh)
+                else:
+                    refresh.calculate()
+
+            if len(process_refreshes) < br_params['min_objects']:
+                for refresh in process_refreshes:
+                    refresh.calculate()
+                process_refreshes = []
+            if len(process_refreshes) > 0:
+                from model.batch import getKernel
+                workers = br_params['workers']
+                with profiler.measure('calculate in processes', 'calculate'), \
+                    ProcessPoolExecutor(max_workers = min(workers if workers > 0 else os.cpu_count(), len(process_refreshes))) as executor:
+                    results = executor.map(calculateInProcess, [refresh.forProcess(getKernel) for refresh in process_refreshes])
+                    for refresh, result in zip(process_refreshes, results):
+                        if isinstance(result, str):
+                            # calculate the failed refresh with the features, which handle the errors
+                            refresh.calculate()
+                        else:
+                            refresh.setProcessResult(result)
+
+            for refresh in refreshes:
+                self.publishPipelineRefresh(refresh, plot = False, object_index = refresh.object_index)
+
+            # the cross correlations use the data of all objects
+            if not ignore_cross_correlation:
+                self._refreshPipeline(False, object_index = object_indices[-1], only_cross_correlation = True)
+
+        if plot:
+            active_objects = [self.objects[object_index] for object_index in object_indices if self.objects[object_index].active]
+            if len(active_objects) > 0:
+                self.plot_manager.refreshAllPlotsForObjectComparison(objects = active_objects)
+            if self.object_selection in object_indices:
+                self.refreshPlots()
+            elif not ignore_cross_correlation:
+                self.refreshPlots(only_cross_correlation = True)
+
+    def preparePipelineRefresh(self, **kwargs):
+        '''
+        updates the cellselection if necessary and configures the steps that will be calculated.
+        for keyword arguments, see self._preparePipelineLoop
+        returns a PipelineRefresh, or None if there are no objects available.
         '''
 
         prepare_pipeline_loop = self._preparePipelineLoop(**kwargs)
         if prepare_pipeline_loop is None:
-            # return if there are no objects available.
-            return
+            return None
         object_index = prepare_pipeline_loop[0]
         object_ = prepare_pipeline_loop[1]
+        pipeline = prepare_pipeline_loop[2]
         calculating_pipeline = prepare_pipeline_loop[3]
         max_raw_index = prepare_pipeline_loop[4]
         max_processing_index = prepare_pipeline_loop[5]
         start_with_cell = prepare_pipeline_loop[6]
-        start_before = prepare_pipeline_loop[7]
         edit_roi = prepare_pipeline_loop[8]
         stop_after = prepare_pipeline_loop[9]
+        calculate_indices = prepare_pipeline_loop[11]
 
         # check if we start with cellselection
         if start_with_cell:
@@ -846,42 +979,35 @@ class DataManager():
             # let the cellselection update our data structure
             self.cell_selection.editROI(roi_index = object_index)
 
-        # set initial object attributes
+        # the initial trace is converted to the precision of the source if necessary. it is a read-only view,
+        # such that it is shared between the steps instead of copied: steps return new arrays, and the
+        # outputs are read-only views too (see Feature.calculate).
+        precision = object_.source.getPrecision()
         if object_.cell_mean is None:
-            object_.processed = deepcopy(object_.source.getData())
-            object_.raw = deepcopy(object_.source.getData())
+            processed = readOnly(np.asarray(object_.source.getData(), dtype = precision))
         else:
-            object_.processed = deepcopy(object_.cell_mean)
-            object_.raw = deepcopy(object_.cell_mean)
-        # set variables used in loop 
-        burst_time = False
-        spike_time = False
-        object_noise_std = 0
+            processed = readOnly(np.asarray(object_.cell_mean, dtype = precision))
+
+        refresh = PipelineRefresh(
+            object_index = object_index,
+            object_ = object_,
+            objects = [o for o in self.objects if o.active],
+            spike_detection = pipeline._spike_detection,
+            max_raw_index = max_raw_index,
+            max_processing_index = max_processing_index,
+            stop_after = stop_after,
+            calculate_indices = calculate_indices,
+            start_with_cell = start_with_cell,
+            edit_roi = edit_roi,
+            invert = object_.invert,
+            processed = processed)
 
         for index, step in enumerate(calculating_pipeline):
-
-            # if we just finished with raw: set raw
-            if index == max_raw_index + 1:
-                object_.raw = deepcopy(object_.processed)
-
-            # if we just finished with processed: invert
-            if index == max_processing_index + 1 and object_.invert:
-                object_.processed = -object_.processed
-
-            # stop if stop_after indicates it
-            if index > stop_after:
-                break
-        
-            # continue if feature is not active
-            if not step.active:
-                continue  
-
-            # update feature if start_after indicates it
-            if index >= start_before:
-
-                # set input 
+            calculate = index in calculate_indices and index <= stop_after and step.active
+            if calculate:
+                # set the input that does not depend on other steps and configure the feature with it. the
+                # input that depends on other steps is set by the calculation.
                 for key, value in [
-                    ('y', object_.processed),
                     ('roi_ellipse_mode', object_.ellipse_mode),
                     ('roi_params', (object_.pos, object_.size, object_.angle)),
                     ('object_source', object_.source),
@@ -889,58 +1015,45 @@ class DataManager():
                     ('object_source_af_params', (object_.source.original_frequency,
                         object_.source.adjusted_frequency,
                         object_.source.adjust_frequency_active,
-                        object_.source.adjust_frequency_method)),
-                    ('object_noise_std', object_noise_std),
-                    ('cell', object_.cell),
-                    ('burst_time', burst_time),
-                    ('spike_time', spike_time)
+                        object_.source.adjust_frequency_method))
                 ]:
                     if key in step.input.keys():
                         step.input[key] = value
-                if 'trains_data' in step.input.keys():
-                    trains_data = []
-                    for o in self.objects:
-                        if o.active:
-                            spike_train = o.pipeline._spike_detection.output['train']
-                            trains_data.append({
-                                'train': spike_train,
-                                'freq': o.source.getFrequency(),
-                                'name': o.name,
-                                'offset': o.source.offset
-                            })
-                    step.input['trains_data'] = trains_data
-                if 'amplitudes_data' in step.input.keys():
-                    amplitudes_data = []
-                    for o in self.objects:
-                        if o.active:
-                            amplitudes_data.append({
-                                'freq': o.source.getFrequency(),
-                                'name': o.name,
-                                'processed': o.processed,
-                                'offset': o.source.offset
-                            })
-                    step.input['amplitudes_data'] = amplitudes_data
-
-                # update
                 step.inputConfiguration()
                 step.activateFunc()
-                step.update(updateDependend = False, plot = False)
-
-            # get output
-            if 'y' in step.output.keys() and step.output['y'] is not None:
-                object_.processed = step.output['y']
-            if 'noise_std' in step.output.keys() and step.output['noise_std'] is not None:
-                object_noise_std = step.output['noise_std']
-            if 'time' in step.output.keys():
-                if isinstance(step, BurstDetection):
-                    burst_time = step.output['time']
-                elif isinstance(step, SpikeDetection):
-                    spike_time = step.output['time']
-
-        #if start_with_cell or edit_roi:
-        if start_with_cell or edit_roi:
+                # the configuration may deactivate the feature
+                calculate = step.active and not step.getMethod().prevent_update
+            method = step.getMethod() if calculate else None
+            if calculate:
+                step.prepareParameters(method)
+            refresh.steps.append(StepRefresh(
+                index = index,
+                feature = step,
+                active = step.active,
+                calculate = calculate,
+                method = method,
+                parameters = dict(method.parameters) if calculate else None,
+                input = dict(step.input) if calculate else None,
+                threadsafe = step.threadsafe if calculate else True))
+
+        return refresh
+
+    def publishPipelineRefresh(self, refresh, plot = True, **kwargs):
+        '''
+        sets the input and output of the calculated steps and the traces of the object, and refreshes the
+            views.
+        for keyword arguments, see self._preparePipelineLoop
+        '''
+        for step in refresh.steps:
+            if step.calculate and step.output is not None:
+                step.feature.input.update(step.input)
+                step.feature.output = step.output
+        refresh.object_.raw = refresh.raw
+        refresh.object_.processed = refresh.processed
+
+        if refresh.start_with_cell or refresh.edit_roi:
             # reset the cellselection user roi if its not the currently selected object
-            if object_index != self.object_selection and self.object_selection is not None:
+            if refresh.object_index != self.object_selection and self.object_selection is not None:
                 self.refreshCellSelectionView(object_index = self.object_selection,
                     prevent_roiview_refresh = True)
         else:
@@ -950,12 +1063,17 @@ class DataManager():
 
         if plot:
             self.refreshPlots(**kwargs, from_refresh_pipeline = True)
-            
+
     def refreshPlots(self, **kwargs):
         '''
         for keyword arguments, see self._preparePipelineLoop
         '''
-        
+        object_index = kwargs.get('object_index', self.object_selection)
+        object_name = self.objects[object_index].name if profiler.active and object_index is not None and object_index < len(self.objects) else None
+        with profiler.measure('refreshPlots', 'plot', object_name):
+            self._refreshPlots(**kwargs)
+
+    def _refreshPlots(self, **kwargs):
         prepare_pipeline_loop = self._preparePipelineLoop(**kwargs)
         if prepare_pipeline_loop is None:
             # undisplay plots and return if there are no objects available
@@ -974,6 +1092,7 @@ class DataManager():
         start_before = prepare_pipeline_loop[7]
         stop_after = prepare_pipeline_loop[9]
         cc_indices = prepare_pipeline_loop[10]
+        calculate_indices = prepare_pipeline_loop[11]
 
         # refresh the compare plots for the object
         self.plot_manager.refreshComparePlots(object_index = object_index)
@@ -1008,14 +1127,15 @@ class DataManager():
                     step.undisplayPlots()
                     continue
 
-                # plot if start_after indicates it
-                if index >= start_before:
-                    step.updateLivePlot()
+                # plot if it has been calculated
+                if index in calculate_indices:
+                    with profiler.measure('updateLivePlot', 'plot', object_.name, step.name, step.getMethod().name):
+                        step.updateLivePlot()
 
         # special case for cc plots: these shall be updated, even if the object is not the selected object
         else:
             for index in cc_indices:
-                if index > stop_after or index < start_before:
+                if index not in calculate_indices:
                     continue
                 step = calculating_pipeline[index]
                 if not step.active:
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+import numpy as np
+
+from util.conf import ip_params
+from model.extraction import extractMeans
+
+@dataclass
+class PyramidLevel():
+    # amount of pixels in each direction that are averaged to one pixel
+    spatial_bin: int
+    # every temporal_step-th frame is used
+    temporal_step: int
+    # the binned and decimated frames with shape (frames, width, height)
+    data: np.ndarray = None
+
+    def frame(self, index):
+        '''
+        returns the frame of this level that is closest to the frame index of the full resolution data.
+        '''
+        return self.data[min(index // self.temporal_step, len(self.data) - 1)]
+
+    def scaleROI(self, pos, size, angle, ellipse_mode):
+        '''
+        returns the roi parameters (pos, size, angle, ellipse_mode) in the coordinates of this level.
+        '''
+        return ((pos[0] / self.spatial_bin, pos[1] / self.spatial_bin),
+            (size[0] / self.spatial_bin, size[1] / self.spatial_bin),
+            angle,
+            ellipse_mode)
+
+    def upsample(self, trace, frame_amount):
+        '''
+        returns the trace of this level linearly interpolated to the frame_amount frames of the full resolution data.
+        '''
+        return np.interp(np.arange(frame_amount), np.arange(len(trace)) * self.temporal_step, trace).astype(trace.dtype, copy = False)
+
+    def extractMeans(self, rois, frame_amount, dtype = np.float64):
+        '''
+        rois:
+            list of tuples.
+            (pos, size, angle, ellipse_mode) of each roi in the coordinates of the full resolution data.
+        returns the roi means with the given dtype calculated from this level, upsampled to frame_amount frames.
+        '''
+        traces = extractMeans(self.data, [self.scaleROI(*roi) for roi in rois], dtype = dtype)
+        return [self.upsample(trace, frame_amount) for trace in traces]
+
+def usePyramid(data):
+    '''
+    returns True if the image sequence is large enough such that a pyramid is worth its memory and inaccuracy.
+    '''
+    return data is not None and data.size >= ip_params['min_size']
+
+def binFrames(frames, spatial_bin):
+    '''
+    returns the frames with shape (frames, width, height) where each spatial_bin x spatial_bin pixel square is
+        averaged. pixels at the border that do not fill a square are dropped.
+    '''
+    t, w, h = frames.shape
+    w, h = w // spatial_bin, h // spatial_bin
+    frames = frames[:, :w * spatial_bin, :h * spatial_bin].reshape(t, w, spatial_bin, h, spatial_bin)
+    return frames.mean(axis = (2, 4), dtype = np.float32)
+
+class ImagePyramid():
+    '''
+    Spatially binned and temporally decimated versions of an image sequence, used to display and preview
+        while the user interacts with the image or the rois. the levels are set in ip_params['levels'].
+    '''
+
+    def __init__(self, data):
+        '''
+        data:
+            np.ndarray.
+            the full resolution image sequence with shape (frames, width, height).
+        '''
+        self.data = data
+        self.levels = [PyramidLevel(spatial_bin, temporal_step) for spatial_bin, temporal_step in ip_params['levels']]
+        self.built = False
+
+    def build(self, progress_callback = None):
+        '''
+        calculates the levels. the full resolution data is read in blocks, and only its frames that are used.
+        progress_callback:
+            function, or None. default is None.
+            called with the amount of processed frames of the full resolution data.
+        '''
+        frame_amount = len(self.data)
+        block_size = ip_params['block_size']
+        blocks = [[] for _ in self.levels]
+        for start in range(0, frame_amount, block_size):
+            stop = min(start + block_size, frame_amount)
+            for level, level_blocks in zip(self.levels, blocks):
+                # first frame of the block that is used by the level
+                first = start + (-start) % level.temporal_step
+                if first < stop:
+                    level_blocks.append(binFrames(np.asarray(self.data[first:stop:level.temporal_step]), level.spatial_bin))
+            if progress_callback is not None:
+                progress_callback(stop)
+        for level, level_blocks in zip(self.levels, blocks):
+            level.data = np.concatenate(level_blocks)
+        self.built = True
+
+    def displayLevel(self):
+        return self.levels[ip_params['display_level']]
+
+    def previewLevel(self):
+        return self.levels[ip_params['preview_level']]
@@ -0,0 +1,106 @@
+import tempfile
+import numpy as np
+
+from util.conf import ii_params
+from model.extraction import rectWeights
+
+def integralDtype(data):
+    '''
+    returns the dtype of the integral image of the image sequence: integer data is summed exactly, with uint32 if
+        the sum of a frame can not overflow it, with int64 otherwise. other data is summed with float64.
+    '''
+    if np.issubdtype(data.dtype, np.integer):
+        info = np.iinfo(data.dtype)
+        if info.min >= 0 and int(info.max) * data.shape[1] * data.shape[2] < 2**32:
+            return np.dtype(np.uint32)
+        return np.dtype(np.int64)
+    return np.dtype(np.float64)
+
+class IntegralImage():
+    '''
+    The summed-area table of every frame of an image sequence: sums[t, x, y] is the sum of the pixels
+        data[t, :x, :y]. the sum of a rectangle is four lookups per frame, so the means of rectangular rois
+        are calculated in O(frames), regardless of their size. used while a rectangular roi is dragged.
+    Large tables are stored in a temporary memmap file (see ii_params). The table belongs to the data of a
+        source (Source._integral_image), so it is shared by the objects of the source.
+    '''
+
+    def __init__(self, data):
+        '''
+        data:
+            np.ndarray.
+            the image sequence with shape (frames, width, height).
+        '''
+        self.data = data
+        self.sums = None
+        self.built = False
+
+    def build(self, progress_callback = None):
+        '''
+        calculates the table. the data is read in blocks of ii_params['block_size'] frames.
+        progress_callback:
+            function, or None. default is None.
+            called with the amount of processed frames.
+        '''
+        frame_amount, width, height = self.data.shape
+        dtype = integralDtype(self.data)
+        shape = (frame_amount, width + 1, height + 1)
+        if frame_amount * (width + 1) * (height + 1) * dtype.itemsize >= ii_params['memmap_size']:
+            # the file is deleted when the memmap is closed
+            sums = np.memmap(tempfile.TemporaryFile(dir = ii_params['directory']), dtype = dtype, mode = 'w+', shape = shape)
+        else:
+            sums = np.empty(shape, dtype = dtype)
+        sums[:, 0, :] = 0
+        sums[:, :, 0] = 0
+        block_size = ii_params['block_size']
+        for start in range(0, frame_amount, block_size):
+            stop = min(start + block_size, frame_amount)
+            block = np.asarray(self.data[start:stop])
+            np.cumsum(np.cumsum(block, axis = 1, dtype = dtype), axis = 2, out = sums[start:stop, 1:, 1:])
+            if progress_callback is not None:
+                progress_callback(stop)
+        self.sums = sums
+        self.built = True
+
+    def rectSums(self, pos, size):
+        '''
+        returns the sum of the pixels of the not rotated rectangular roi for each frame and the amount of pixels.
+            the pixels are the same as the ones of model.extraction.rectWeights.
+        '''
+        roi_weights = rectWeights(self.data.shape[1:], pos, size)
+        if roi_weights.area == 0:
+            return np.zeros(len(self.data)), 0
+        x0, x1 = roi_weights.x_slice.start, roi_weights.x_slice.stop
+        y0, y1 = roi_weights.y_slice.start, roi_weights.y_slice.stop
+        # integer sums are subtracted as int64, such that uint32 sums do not wrap around
+        work_dtype = np.float64 if self.sums.dtype == np.float64 else np.int64
+        corners = [self.sums[:, x, y].astype(work_dtype) for x, y in [(x1, y1), (x0, y1), (x1, y0), (x0, y0)]]
+        return corners[0] - corners[1] - corners[2] + corners[3], roi_weights.area
+
+    def rectMeans(self, rois, dtype = np.float64):
+        '''
+        rois:
+            list of tuples.
+            (pos, size) of each not rotated rectangular roi.
+        returns a list with the mean of each roi for each frame with the given dtype. the mean of a roi without
+            pixels is nan, like in model.extraction.extractTraces.
+        '''
+        means = []
+        for pos, size in rois:
+            sums, area = self.rectSums(pos, size)
+            means.append((sums / area).astype(dtype) if area > 0 else np.full(len(self.data), np.nan, dtype = dtype))
+        return means
+
+    def ringMeans(self, outer, inner, dtype = np.float64):
+        '''
+        outer, inner:
+            tuple.
+            (pos, size) of a not rotated rectangular roi and of a roi inside of it.
+        returns the mean of the pixels of the outer roi that are not pixels of the inner roi for each frame.
+        '''
+        outer_sums, outer_area = self.rectSums(*outer)
+        inner_sums, inner_area = self.rectSums(*inner)
+        area = outer_area - inner_area
+        if area <= 0:
+            return np.full(len(self.data), np.nan, dtype = dtype)
+        return ((outer_sums - inner_sums) / area).astype(dtype)
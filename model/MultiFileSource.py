@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+
+from model.Source import Source
+
+@dataclass(eq = False)
+class MultiFileSource(Source):
+    '''
+    Source of an image sequence that is split into an ordered list of TIF files. _data is a VirtualStack over
+        all files, such that frameRange, getData and getOriginalData work across file boundaries while a file is
+        only read when its frames are accessed.
+    '''
+    filepaths: list = field(default_factory = list)
@@ -11,7 +11,6 @@ class Object():
     source: Source
     active: bool = True
     cell_mean: np.ndarray = None
-    cell: np.ndarray = None
     processed: np.ndarray = None
     raw: np.ndarray = None
     pos: tuple = None
@@ -2,41 +2,44 @@ from dataclasses import dataclass
 from copy import deepcopy
 import numpy as np
 
-from features.BackgroundSubtraction import BackgroundSubtraction
-from features.Baseline import Baseline
-from features.Smoothing import Smoothing
-from features.AdjustFrequency import AdjustFrequency
-from features.EventDetection import SpikeDetection, BurstDetection
-from features.EventShape import EventShape
-from features.PowerSpectrum import PowerSpectrum
+from model.StepState import StepState
 from features.CrossCorrelation import SpikeCrossCorrelation, AmplitudeCrossCorrelation
 
 @dataclass
 class Pipeline():
-    _background_subtraction: BackgroundSubtraction = None
-    _baseline: Baseline = None
-    _smoothing: Smoothing = None
+    '''
+    The pipeline of an object. The steps are the StepStates of the object for the shared features of the
+        PipelineManager, except for the cross correlations, which use the data of all objects and are the
+        features themselves.
+    '''
+    _background_subtraction: StepState = None
+    _baseline: StepState = None
+    _smoothing: StepState = None
     _adjust_frequency = None
-    _spike_detection: SpikeDetection = None
-    _burst_detection: BurstDetection = None
-    _event_shape: EventShape = None
-    _power_spectrum: PowerSpectrum = None
+    _spike_detection: StepState = None
+    _burst_detection: StepState = None
+    _event_shape: StepState = None
+    _power_spectrum: StepState = None
     _spike_cross_correlation: SpikeCrossCorrelation = None
     _amplitude_cross_correlation: AmplitudeCrossCorrelation = None
 
-    def initPipeline(self, data_manager, source_is_tif, parent = None):
-        self._background_subtraction = BackgroundSubtraction(data_manager, parent=parent, liveplot=data_manager.plot_manager.background_subtraction)
-        baseline_liveplot = (data_manager.plot_manager.cell_selection.ui.roiPlot, data_manager.plot_manager.baseline)
-        self._baseline = Baseline(data_manager, parent=parent, liveplot=baseline_liveplot)
+    def initPipeline(self, data_manager, source_is_tif):
+        '''
+        creates the states of the features with their defaults. the features are not created, they are
+            shared by all pipelines, see PipelineManager.
+        '''
+        pipeline_manager = data_manager.pipeline_manager
+        self._background_subtraction = pipeline_manager.background_subtraction.createState()
+        self._baseline = pipeline_manager.baseline.createState()
         self._baseline.active = source_is_tif
-        self._smoothing = Smoothing(data_manager, parent=parent, liveplot=data_manager.plot_manager.smoothing)
-        self._adjust_frequency = AdjustFrequency(data_manager, parent=data_manager.source_manager.adjust_frequency_dialog.feature_view)
-        self._spike_detection = SpikeDetection(data_manager, parent=parent, liveplot=data_manager.plot_manager.spike_detection)
-        self._burst_detection = BurstDetection(data_manager, parent=parent, liveplot=data_manager.plot_manager.burst_detection)
-        self._event_shape = EventShape(data_manager, parent=parent, liveplot=data_manager.plot_manager.event_shape)
-        self._power_spectrum = PowerSpectrum(data_manager, parent=parent, liveplot=data_manager.plot_manager.frequency_spectrum)
-        self._spike_cross_correlation = data_manager.pipeline_manager.spike_cross_correlation
-        self._amplitude_cross_correlation = data_manager.pipeline_manager.amplitude_cross_correlation
+        self._smoothing = pipeline_manager.smoothing.createState()
+        self._adjust_frequency = pipeline_manager.adjust_frequency.createState()
+        self._spike_detection = pipeline_manager.spike_detection.createState()
+        self._burst_detection = pipeline_manager.burst_detection.createState()
+        self._event_shape = pipeline_manager.event_shape.createState()
+        self._power_spectrum = pipeline_manager.power_spectrum.createState()
+        self._spike_cross_correlation = pipeline_manager.spike_cross_correlation
+        self._amplitude_cross_correlation = pipeline_manager.amplitude_cross_correlation
 
     def getPipeline(self):
         return [
@@ -71,16 +74,14 @@ class Pipeline():
     def initMethodConfigurations(self, conf_pipeline, filetype):
         conf_p = conf_pipeline.getPipeline()
         for index,step in enumerate(self.getPipeline()):
-            # set activated method
-            step.disconnectMethodCombo()
-            step.method_combo.setCurrentIndex(conf_p[index].method_combo.currentIndex())
-            step.updateParametersUI()
-            step.connectMethodCombo()
-            # set parameters
-            for key,method in step.methods.items():
-                method.setParameters(deepcopy(conf_p[index].methods[key].parameters), prevent_update = True)
+            # the cross correlations are shared
+            if step is conf_p[index]:
+                continue
+            # set activated method and parameters
+            step.method = conf_p[index].method
+            step.parameters = deepcopy(conf_p[index].parameters)
             # never activate BSR for non-tif-sources
-            if isinstance(step, BackgroundSubtraction) and filetype != 'tif':
+            if step is self._background_subtraction and filetype != 'tif':
                 step.active = False
             else:
                 step.active = conf_p[index].active
@@ -95,6 +96,35 @@ class Pipeline():
             step.active for step in self.getCalculatingPipeline()
         ]
 
+    def getDependentIndices(self, start_index, changed, invert_changed = False):
+        '''
+        start_index:
+            int.
+            index of the first step in the calculating pipeline that is checked.
+        changed:
+            iterable of str.
+            the data that changed before the step at start_index, see Feature.consumes.
+        invert_changed:
+            bool. default is False.
+            determines if invert changed. invert is done right after the last processing feature and
+            counts as a step that consumes and produces 'y'.
+        returns the sorted list of indices of the steps from start_index on that consume changed data, directly
+            or through data produced by other steps. inactive steps do not produce data.
+        '''
+        calculating_pipeline = self.getCalculatingPipeline()
+        invert_index = max([calculating_pipeline.index(f) for f in self.getProcessingFeatures()]) + 1
+        changed = set(changed)
+        dependent_indices = []
+        for index in range(start_index, len(calculating_pipeline)):
+            if index == invert_index and invert_changed:
+                changed.add('y')
+            step = calculating_pipeline[index]
+            if changed.intersection(step.consumes):
+                dependent_indices.append(index)
+                if step.active:
+                    changed.update(step.produces)
+        return dependent_indices
+
     def getRawFeatures(self):
         return [
             self._background_subtraction
@@ -0,0 +1,216 @@
+from dataclasses import dataclass, field, replace
+from contextlib import nullcontext
+import traceback
+
+from model.StepState import StepState
+from util.functions import readOnly
+from util.profiling import profiler
+
+@dataclass
+class StepRefresh():
+    '''
+    A step of the calculating pipeline in a PipelineRefresh. input and parameters are copies that are made
+        before the calculation, such that the calculation does not depend on the GUI. input and output are
+        set on the feature when the refresh is published. threadsafe is read from the state of the step on the
+        main thread (see StepState.threadsafe), such that the calculation does not bind the shared feature.
+    '''
+    index: int
+    feature: object
+    active: bool
+    calculate: bool
+    method: object = None
+    parameters: dict = None
+    input: dict = None
+    output: dict = None
+    threadsafe: bool = True
+
+@dataclass
+class KernelFeature():
+    '''
+    Replaces the feature of a StepRefresh such that the refresh can be calculated in another process, see
+        PipelineRefresh.forProcess. the method of the step is the kernel of the feature method.
+    '''
+    produces: tuple
+    output: dict
+    threadsafe = True
+
+    def calculate(self, method, input_dict):
+        output = method(**input_dict)
+        return {key: readOnly(value) for key, value in output.items()}
+
+def calculateInProcess(refresh):
+    '''
+    calculates a refresh that has been copied with PipelineRefresh.forProcess in a worker process.
+    returns the refresh, or the traceback if the calculation failed. the kernels do not handle errors like the
+        features do (e.g. Baseline shows a warning if the asymmetric least squares fail), so a failed refresh
+        is calculated again with the features, see DataManager.refreshPipelines.
+    '''
+    try:
+        refresh.calculate()
+    except Exception:
+        return traceback.format_exc()
+    return refresh
+
+@dataclass
+class PipelineRefresh():
+    '''
+    The calculation of the pipeline of an object, see DataManager.refreshPipeline. it is prepared and published
+        on the main thread, calculate does not use the GUI and can run on another thread if the calculated
+        features are threadsafe.
+    '''
+    object_index: int
+    object_: object
+    # the active objects, for the input of the cross correlations
+    objects: list
+    spike_detection: object
+    max_raw_index: int
+    max_processing_index: int
+    stop_after: int
+    calculate_indices: list
+    start_with_cell: bool
+    edit_roi: bool
+    invert: bool
+    processed: object
+    raw: object = None
+    steps: list = field(default_factory = list)
+    # set when the refresh is superseded. calculate stops before the next step.
+    cancelled: bool = False
+
+    def isThreadSafe(self):
+        return all(step.threadsafe for step in self.steps if step.calculate and step.active)
+
+    def forProcess(self, getKernel):
+        '''
+        getKernel:
+            function.
+            returns the kernel for the name of a feature and the name of its method, see model.batch.getKernel.
+        returns a copy of the refresh that can be sent to another process: the features are replaced by
+            KernelFeatures, the methods by their kernels and the sources in the input by sources without data.
+            the objects are removed, so the cross correlations can not be calculated.
+        '''
+        steps = []
+        for step in self.steps:
+            # the steps that are not calculated provide their previous output
+            output = step.feature.output if step.active and not step.calculate and step.index <= self.stop_after else {}
+            steps.append(replace(step,
+                feature = KernelFeature(step.feature.produces, output),
+                method = getKernel(step.feature.name, step.method.name) if step.calculate else None,
+                input = {key: replace(value, _data = None, _data_corrected = None, _data_owner = None, _pyramid = None, _integral_image = None)
+                    if key == 'object_source' else value for key, value in step.input.items()} if step.calculate else None))
+        return replace(self, object_ = None, objects = [], spike_detection = None, steps = steps)
+
+    def setProcessResult(self, result):
+        '''
+        sets the outputs and traces of a refresh that has been calculated in another process.
+        result:
+            PipelineRefresh.
+            the calculated copy of the refresh, see forProcess.
+        '''
+        for step, result_step in zip(self.steps, result.steps):
+            if step.calculate and result_step.output is not None:
+                step.output = {key: readOnly(value) for key, value in result_step.output.items()}
+                step.input = {key: step.input[key] if key == 'object_source' else readOnly(value) for key, value in result_step.input.items()}
+        self.raw = readOnly(result.raw)
+        self.processed = readOnly(result.processed)
+
+    def measure(self, step):
+        '''
+        returns the context that profiles the calculation of the step, see Profiler.measure. copies for another
+            process are not profiled, because the records would stay in the other process.
+        '''
+        if self.object_ is None or not profiler.active:
+            return nullcontext()
+        return profiler.measure('calculate', 'calculate', self.object_.name, step.feature.name, step.method.name)
+
+    def getOutput(self, feature):
+        '''
+        returns the output of the feature, which is the new output if the feature has been calculated.
+        '''
+        for step in self.steps:
+            if step.feature is feature and step.output is not None:
+                return step.output
+        return feature.output
+
+    def calculate(self):
+        '''
+        calculates the steps from the prepared input and parameters and sets raw and processed.
+        returns False if the refresh has been cancelled, True otherwise.
+        '''
+        processed = self.processed
+        raw = processed
+        burst_time = False
+        spike_time = False
+        object_noise_std = 0
+
+        for step in self.steps:
+            index = step.index
+
+            # if we just finished with raw: set raw
+            if index == self.max_raw_index + 1:
+                raw = processed
+
+            # if we just finished with processed: invert
+            if index == self.max_processing_index + 1 and self.invert:
+                processed = readOnly(-processed)
+
+            # stop if stop_after indicates it
+            if index > self.stop_after:
+                break
+
+            # continue if feature is not active
+            if not step.active:
+                continue
+
+            if step.calculate:
+                if self.cancelled:
+                    return False
+
+                # set input
+                input_ = dict(step.input)
+                for key, value in [
+                    ('y', processed),
+                    ('object_noise_std', object_noise_std),
+                    ('burst_time', burst_time),
+                    ('spike_time', spike_time)
+                ]:
+                    if key in input_.keys():
+                        input_[key] = value
+                if 'trains_data' in input_.keys():
+                    input_['trains_data'] = [{
+                        'train': (self.getOutput(self.spike_detection) if o is self.object_ else o.pipeline._spike_detection.output)['train'],
+                        'freq': o.source.getFrequency(),
+                        'name': o.name,
+                        'offset': o.source.offset
+                    } for o in self.objects]
+                if 'amplitudes_data' in input_.keys():
+                    input_['amplitudes_data'] = [{
+                        'freq': o.source.getFrequency(),
+                        'name': o.name,
+                        'processed': processed if o is self.object_ else o.processed,
+                        'offset': o.source.offset
+                    } for o in self.objects]
+
+                # calculate
+                step.input = input_
+                # states are told whether they are threadsafe, see StepState.calculate
+                kwargs = {'threadsafe': step.threadsafe} if isinstance(step.feature, StepState) else {}
+                with self.measure(step):
+                    step.output = step.feature.calculate(step.method, {**input_, **step.parameters}, **kwargs)
+                output = step.output
+            else:
+                output = step.feature.output
+
+            # get output
+            if 'y' in output.keys() and output['y'] is not None:
+                processed = output['y']
+            if 'noise_std' in output.keys() and output['noise_std'] is not None:
+                object_noise_std = output['noise_std']
+            if 'time' in output.keys():
+                if 'burst_time' in step.feature.produces:
+                    burst_time = output['time']
+                elif 'spike_time' in step.feature.produces:
+                    spike_time = output['time']
+
+        self.raw = raw
+        self.processed = processed
+        return True
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+import threading
+import weakref
+import hashlib
+import numpy as np
+
+from util.conf import rc_params
+
+# the digests of read-only arrays, see arrayDigest. id of the array: (weak reference to the array, digest)
+array_digests = {}
+
+def fingerprint(value):
+    '''
+    value:
+        numpy arrays, numbers, strings, None, objects with calculationAttributes (e.g. sources), and lists,
+        tuples and dicts of them.
+    returns a digest of the value. arrays are hashed with their dtype, shape and content, objects with their
+        type and calculationAttributes. raises a TypeError for other objects.
+    '''
+    digest = hashlib.blake2b(digest_size = 20)
+    updateFingerprint(digest, value)
+    return digest.digest()
+
+def arrayDigest(value):
+    '''
+    returns the digest of the dtype, shape and content of the array. the digests of frozen arrays are kept
+        as long as the arrays exist, such that the outputs of the steps, which are frozen (see
+        Feature.readOnlyOutput), are hashed once although they are the input of several steps.
+    '''
+    frozen = isFrozen(value)
+    if frozen:
+        entry = array_digests.get(id(value))
+        if entry is not None and entry[0]() is value:
+            return entry[1]
+    digest = hashlib.blake2b('array {} {}'.format(value.dtype, value.shape).encode(), digest_size = 20)
+    digest.update(np.ascontiguousarray(value).data)
+    digest = digest.digest()
+    if frozen:
+        key = id(value)
+        # the entry is removed when the array is deleted, before its id can be used again
+        array_digests[key] = (weakref.ref(value, lambda _: array_digests.pop(key, None)), digest)
+    return digest
+
+def isFrozen(value):
+    '''
+    returns whether the content of the array can not change: the array and all its bases are read-only. a
+        read-only view of a writable array changes with the array.
+    '''
+    while isinstance(value, np.ndarray):
+        if value.flags.writeable:
+            return False
+        value = value.base
+    # the data is owned by a read-only array, not by another buffer (e.g. a memory map)
+    return value is None
+
+def updateFingerprint(digest, value):
+    if isinstance(value, np.ndarray):
+        digest.update(b'array')
+        digest.update(arrayDigest(value))
+    elif isinstance(value, (list, tuple)):
+        digest.update('{} {}'.format(type(value).__name__, len(value)).encode())
+        for item in value:
+            updateFingerprint(digest, item)
+    elif isinstance(value, dict):
+        digest.update('dict {}'.format(len(value)).encode())
+        for key in sorted(value.keys(), key = str):
+            updateFingerprint(digest, key)
+            updateFingerprint(digest, value[key])
+    elif value is None or isinstance(value, (bool, int, float, str, np.generic)):
+        digest.update('{} {!r}'.format(type(value).__name__, value).encode())
+    elif hasattr(value, 'calculationAttributes'):
+        digest.update(type(value).__name__.encode())
+        updateFingerprint(digest, value.calculationAttributes())
+    else:
+        raise TypeError('{} can not be fingerprinted.'.format(type(value).__name__))
+
+def outputSize(value):
+    '''
+    returns the amount of bytes of the arrays in value (an output dict of a feature).
+    '''
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(outputSize(item) for item in value)
+    if isinstance(value, dict):
+        return sum(outputSize(item) for item in value.values())
+    return 0
+
+class ResultCache():
+    '''
+    Results of feature methods in memory. Entries are identified by a key that is calculated from the feature
+        name, the method name, the input and the parameters (see key). If the size of the results exceeds
+        max_size bytes, the least recently used entries are removed.
+    The cache can be used from several threads.
+    '''
+
+    def __init__(self, max_size = None):
+        '''
+        max_size:
+            int, or None. default is None.
+            the maximum size of the results in bytes. if None, rc_params['max_size'] is used.
+        '''
+        self.max_size = max_size if max_size is not None else rc_params['max_size']
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def key(self, feature_name, method_name, input_dict):
+        '''
+        input_dict:
+            dict.
+            the input and the parameters the method is called with.
+        returns the key of the result.
+        '''
+        return fingerprint((feature_name, method_name, input_dict))
+
+    def load(self, key):
+        '''
+        returns a copy of the output dict stored with the key, or None if there is no entry for the key.
+            the arrays in the output are not copied.
+        '''
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return dict(entry[0])
+
+    def store(self, key, output):
+        '''
+        stores a copy of the output dict and removes the least recently used entries if the cache is too large.
+            outputs that are larger than the cache are not stored.
+        '''
+        size = outputSize(output)
+        if size > self.max_size:
+            return
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (dict(output), size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, removed_size) = self.entries.popitem(last = False)
+                self.size -= removed_size
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 import numpy as np
 
-from features.AdjustFrequency import AdjustFrequency
+from util.conf import pr_params
 
 @dataclass
 class Source():
@@ -16,7 +16,16 @@ class Source():
     offset: float = None
     _data: np.ndarray = None
     _data_corrected: np.ndarray = None
+    # keeps the memory that _data is stored in alive, e.g. a shared memory block. None if _data owns its memory.
+    _data_owner: object = None
+    # ImagePyramid of the data, built in the background. only used if it belongs to the current data.
+    _pyramid: object = None
+    # IntegralImage of the data, built in the background when a rectangular roi is dragged first. only used if
+    # it belongs to the current data.
+    _integral_image: object = None
     unit: str = ''
+    # dtype of the roi means and traces of this source. if None, pr_params['dtype'] is used.
+    precision: str = None
     # for naming purposes
     object_number: int = 1
     short_name: int = None
@@ -24,9 +33,19 @@ class Source():
     def __eq__(self, other):
         return self is other
 
+    def calculationAttributes(self):
+        '''
+        returns the attributes that the results of the kernels depend on, see ResultCache.fingerprint.
+        '''
+        return {name: getattr(self, name) for name in ['filetype', 'original_frequency', 'adjusted_frequency',
+            'adjust_frequency_active', 'adjust_frequency_method', 'start', 'end', 'offset', 'precision']}
+
     def frameRange(self):
         return np.arange(self.start, self.end)
 
+    def getPrecision(self):
+        return np.dtype(self.precision if self.precision is not None else pr_params['dtype'])
+
     def getFrequency(self):
         return self.adjusted_frequency if self.adjust_frequency_active else self.original_frequency
 
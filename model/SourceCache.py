@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+from util.conf import sc_params
+
+class SourceCache():
+    '''
+    Directory with decoded sources. Each entry consists of a .json file with metadata (e.g. frequency, unit) and,
+        optionally, a .npy file with the decoded data that is loaded as memmap. Entries are identified by a key
+        that is calculated from the path, size, modification time and header of the source files.
+        If the size of the directory exceeds sc_params['max_size'] bytes, the least recently used entries
+        are removed.
+    '''
+
+    # amount of bytes of the beginning of a file that are hashed
+    HEADER_BYTES = 65536
+
+    def __init__(self, directory = None, max_size = None):
+        '''
+        directory:
+            str, or None. default is None.
+            the cache directory. if None, sc_params['directory'] is used.
+        max_size:
+            int, or None. default is None.
+            the maximum size of the cache directory in bytes. if None, sc_params['max_size'] is used.
+        '''
+        self.directory = os.path.expanduser(directory if directory is not None else sc_params['directory'])
+        self.max_size = max_size if max_size is not None else sc_params['max_size']
+
+    def key(self, filepaths, **selection):
+        '''
+        filepaths:
+            list of str.
+            the files of the source.
+        selection:
+            further keyword arguments that identify the source, e.g. the channel of an abf file.
+        returns the key of the source.
+        '''
+        key = hashlib.blake2b(digest_size = 20)
+        for filepath in filepaths:
+            stat = os.stat(filepath)
+            key.update(json.dumps([os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns]).encode())
+            with open(filepath, 'rb') as f:
+                key.update(f.read(self.HEADER_BYTES))
+        key.update(json.dumps(selection, sort_keys = True, default = str).encode())
+        return key.hexdigest()
+
+    def paths(self, key):
+        return os.path.join(self.directory, key + '.json'), os.path.join(self.directory, key + '.npy')
+
+    def load(self, key):
+        '''
+        returns a tuple (data, metadata) of the entry. data is a read-only memmap, or None if only the metadata
+            is stored. returns None if there is no entry for the key.
+        '''
+        metadata_path, data_path = self.paths(key)
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            data = np.load(data_path, mmap_mode = 'r') if metadata['data'] else None
+        except (OSError, ValueError):
+            return None
+        # mark the entry as recently used
+        for path in [metadata_path, data_path] if metadata['data'] else [metadata_path]:
+            os.utime(path)
+        return data, metadata
+
+    def store(self, key, metadata, data = None):
+        '''
+        stores the entry and removes least recently used entries afterwards. data that is larger than max_size
+            is not stored, only the metadata.
+        metadata:
+            dict.
+            json serializable metadata of the source.
+        data:
+            np.ndarray, or None. default is None.
+            the decoded data. if None, only the metadata is stored.
+        '''
+        os.makedirs(self.directory, exist_ok = True)
+        metadata_path, data_path = self.paths(key)
+        if data is not None and data.nbytes > self.max_size:
+            data = None
+        metadata = {**metadata, 'data': data is not None}
+        # write to temporary files first, such that other processes never load incomplete entries
+        if data is not None:
+            self.write(data_path, lambda f: np.save(f, data), 'wb')
+        elif os.path.exists(data_path):
+            os.remove(data_path)
+        self.write(metadata_path, lambda f: json.dump(metadata, f), 'w')
+        self.evict(keep = key)
+
+    def write(self, path, write, mode):
+        '''
+        calls write with a temporary file that is opened with the mode and replaces the path with it afterwards.
+            the name of the temporary file is unique, such that processes that store the same entry do not
+            write to the same file.
+        '''
+        handle, temporary_path = tempfile.mkstemp(dir = self.directory, prefix = os.path.basename(path) + '.', suffix = '.tmp')
+        try:
+            with os.fdopen(handle, mode) as f:
+                write(f)
+            os.replace(temporary_path, path)
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+
+    def evict(self, keep = None):
+        '''
+        removes the least recently used entries until the cache directory is not larger than max_size.
+        keep:
+            str, or None. default is None.
+            key of an entry that shall not be removed.
+        '''
+        entries = {}
+        for filename in os.listdir(self.directory):
+            key, extension = os.path.splitext(filename)
+            if extension not in ['.json', '.npy']:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+        total_size = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key = lambda entry: entry[1][1]):
+            if total_size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
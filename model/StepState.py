@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from functools import wraps
+import inspect
+
+@dataclass(eq = False)
+class StepState():
+    '''
+    The state of a feature in the pipeline of an object: the active state, the selected method, the parameters
+        of all methods, the input and the output. The feature widgets are created once and are shared by the
+        objects (see PipelineManager), they work with the state they are bound to (see Feature.bind) and show
+        the state of the selected object (see Feature.display). Thus, adding an object only creates states.
+    Attributes that are not part of the state are taken from the feature while it is bound to the state, so
+        a StepState can be used like the feature of the object, e.g. step.inputConfiguration().
+    StepStates are compared by identity.
+    '''
+    feature: object
+    active: bool
+    # the name of the selected method
+    method: str
+    # the name of the method: the parameters of the method
+    parameters: dict
+    input: dict = field(default_factory = dict)
+    output: dict = field(default_factory = dict)
+
+    @property
+    def name(self):
+        return self.feature.name
+
+    @property
+    def consumes(self):
+        return self.feature.consumes
+
+    @property
+    def produces(self):
+        return self.feature.produces
+
+    @property
+    def threadsafe(self):
+        '''
+        whether the selected method of the state can be calculated on another thread. a feature may decide it
+            with its state (a threadsafe property), which binds the feature, so it is read on the main thread when
+            a refresh is prepared and stored in the refresh, see DataManager.preparePipelineRefresh.
+        '''
+        threadsafe = type(self.feature).threadsafe
+        if isinstance(threadsafe, property):
+            with self.feature.boundTo(self):
+                return self.feature.threadsafe
+        return threadsafe
+
+    @property
+    def methods(self):
+        return {name: MethodState(self, method) for name, method in self.feature.methods.items()}
+
+    def getMethod(self):
+        return MethodState(self, self.feature.methods[self.method])
+
+    def calculate(self, method, input_dict, threadsafe = None):
+        '''
+        see Feature.calculate. the feature is bound to the state if it is not threadsafe, because its methods may
+            use the state of the feature, e.g. the input. threadsafe features are not bound, such that they can
+            be calculated on another thread: binding the shared feature there would change the state that the
+            main thread shows.
+        threadsafe:
+            bool, or None. default is None.
+            the thread-safety that was read on the main thread, see StepRefresh.threadsafe. if None: the
+            threadsafe attribute of the feature class. a threadsafe property is not read here, because that
+            binds the feature, so the feature is bound then, which is only done on the main thread.
+        '''
+        if threadsafe is None:
+            threadsafe = type(self.feature).threadsafe is True
+        if threadsafe:
+            return self.feature.calculate(method, input_dict)
+        with self.feature.boundTo(self):
+            return self.feature.calculate(method, input_dict)
+
+    def clearData(self):
+        for name in self.output.keys():
+            self.output[name] = None
+
+    def copy(self):
+        '''
+        returns a new state with the active state, the method and a copy of the parameters of this state.
+            input and output are empty.
+        '''
+        return self.feature.createState(self)
+
+    def __getattr__(self, name):
+        # only called for attributes that are not part of the state
+        feature = self.__dict__.get('feature')
+        if feature is None or name.startswith('__'):
+            raise AttributeError(name)
+        with feature.boundTo(self):
+            value = getattr(feature, name)
+        if inspect.ismethod(value) and value.__self__ is feature:
+            @wraps(value)
+            def bound(*args, **kwargs):
+                with feature.boundTo(self):
+                    return value(*args, **kwargs)
+            return bound
+        return value
+
+class MethodState():
+    '''
+    A FeatureMethod with the parameters of a StepState, see StepState.methods.
+    '''
+
+    def __init__(self, state, method):
+        self.state = state
+        self.method = method
+
+    def __eq__(self, other):
+        return isinstance(other, MethodState) and self.state is other.state and self.method is other.method
+
+    @property
+    def name(self):
+        return self.method.name
+
+    @property
+    def function(self):
+        return self.method.function
+
+    @property
+    def parameters(self):
+        return self.state.parameters[self.method.name]
+
+    @parameters.setter
+    def parameters(self, parameters):
+        self.state.parameters[self.method.name] = parameters
+
+    @property
+    def prevent_update(self):
+        return self.method.prevent_update
+
+    @prevent_update.setter
+    def prevent_update(self, prevent_update):
+        self.method.prevent_update = prevent_update
+
+    def getParameters(self):
+        return self.parameters
+
+    def setParameters(self, params, prevent_update = False):
+        '''
+        see FeatureMethod.setParameters. the graphical objects are only set if the state is displayed.
+        '''
+        with self.state.feature.boundTo(self.state):
+            self.method.setParameters(params, prevent_update = prevent_update)
+
+    def getParametersGUI(self, param_name):
+        return self.method.getParametersGUI(param_name)
@@ -1,10 +1,143 @@
 import tifffile
 from PyQt5 import QtWidgets, QtCore
 import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
 
 from threads.Worker import Worker
 from model.Source import Source
+from model.MultiFileSource import MultiFileSource
+from model.VirtualStack import VirtualStack, memoryMapTIF, readTIFHeader
+from model.SourceCache import SourceCache
 from features.MovementCorrection import MovementCorrection
+from util.conf import tl_params, sc_params
+
+def decodeWorkers():
+    '''
+    returns the amount of workers used to decode TIF pages, as set in tl_params['decode_workers'].
+        0 means one worker per CPU.
+    '''
+    workers = tl_params['decode_workers']
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def pageRanges(frame_amount):
+    '''
+    returns a list of (start, stop) tuples that split the pages into about 100 ranges, such that the progress
+        can be reported after each range.
+    '''
+    step = max(1, int(frame_amount / 100))
+    return [(start, min(start + step, frame_amount)) for start in range(0, frame_amount, step)]
+
+def decodeTIFPages(filepath, start, stop, shm_name, shape, dtype):
+    '''
+    decodes the pages start to stop of the TIF file into the shared memory block with the name shm_name.
+        used by the worker processes if tl_params['executor'] is 'process'.
+    filepath:
+        str.
+        path of the TIF file.
+    start, stop:
+        int.
+        range of pages to decode.
+    shm_name:
+        str.
+        name of the shared memory block that holds the image data with the given shape and dtype.
+    returns the amount of decoded pages.
+    '''
+    shm = shared_memory.SharedMemory(name = shm_name)
+    try:
+        data = np.ndarray(shape, dtype = dtype, buffer = shm.buf)
+        with tifffile.TiffFile(filepath) as tif:
+            tif.asarray(key = slice(start, stop, 1), out = data[start:stop], maxworkers = 1)
+        del data
+    finally:
+        shm.close()
+    return stop - start
+
+def decodeTIF(tif, filepath, shape, dtype, worker_progress_signal):
+    '''
+    decodes all pages of the (compressed) TIF file in parallel into a preallocated array with shape
+        (frames, height, width).
+    tif:
+        tifffile.TiffFile.
+        the opened TIF file.
+    filepath:
+        str.
+        path of the TIF file.
+    worker_progress_signal:
+        pyqtSignal.
+        emits the amount of decoded pages.
+    returns a tuple (data, data_owner). data_owner is the shared memory block that holds data if
+        tl_params['executor'] is 'process' and must be kept alive as long as data is used, otherwise None.
+    '''
+    workers = decodeWorkers()
+    ranges = pageRanges(shape[0])
+    decoded = 0
+    if tl_params['executor'] == 'process' and workers > 1:
+        shm = shared_memory.SharedMemory(create = True, size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+        try:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                futures = [executor.submit(decodeTIFPages, filepath, start, stop, shm.name, shape, dtype) for start, stop in ranges]
+                for future in as_completed(futures):
+                    decoded += future.result()
+                    worker_progress_signal.emit(decoded)
+        except:
+            shm.close()
+            shm.unlink()
+            raise
+        # unlinking only removes the name of the block. the memory is released when the block is garbage collected.
+        shm.unlink()
+        return np.ndarray(shape, dtype = dtype, buffer = shm.buf), shm
+    # tifffile decodes the pages of each range in a thread pool, writing directly into the output array.
+    data = np.empty(shape, dtype)
+    for start, stop in ranges:
+        tif.asarray(key = slice(start, stop, 1), out = data[start:stop], maxworkers = workers)
+        decoded += stop - start
+        worker_progress_signal.emit(decoded)
+    return data, None
+
+def lookUpCache(filepaths):
+    '''
+    returns a tuple (cache, key, entry) for the TIF files. cache and key are None if caching is not active,
+        entry is None if the files are not in the cache, see SourceCache.load.
+    '''
+    if not sc_params['active']:
+        return None, None, None
+    cache = SourceCache()
+    key = cache.key(filepaths)
+    return cache, key, cache.load(key)
+
+def loadTIF(filepath, worker_max_progress_signal, worker_progress_signal):
+    '''
+    loads the TIF file from the cache, as memmap or by decoding it. does not need a QApplication.
+    worker_max_progress_signal, worker_progress_signal:
+        pyqtSignal, or any object with an emit method.
+        emit the amount of pages and the amount of loaded pages.
+    returns a dict with the data, the filepath, the data owner (see decodeTIF), whether the data was decoded
+        and the cache, cache key and cached metadata (see lookUpCache).
+    '''
+    cache, cache_key, cache_entry = lookUpCache([filepath])
+    cache_result = {'cache': cache, 'cache_key': cache_key, 'cache_metadata': cache_entry[1] if cache_entry is not None else None}
+    # decoded data from the cache is memory-mapped
+    if cache_entry is not None and cache_entry[0] is not None:
+        return {'data': cache_entry[0], 'filepath': filepath, 'data_owner': None, 'decoded': False, **cache_result}
+    with tifffile.TiffFile(filepath) as tif:
+        frame_amount = len(tif.pages)
+        worker_max_progress_signal.emit(frame_amount)
+        # uncompressed, contiguous data is memory-mapped instead of read. swapaxes only creates a view,
+        # so frames are read from the file when they are accessed.
+        if tl_params['memory_map']:
+            data = memoryMapTIF(filepath, frame_amount)
+            if data is not None:
+                data = np.swapaxes(data, 1, 2)
+                worker_progress_signal.emit(frame_amount)
+                return {'data': data, 'filepath': filepath, 'data_owner': None, 'decoded': False, **cache_result}
+        first_page = tif.asarray(key=0)
+        shape = (frame_amount, first_page.shape[0], first_page.shape[1])
+        data, data_owner = decodeTIF(tif, filepath, shape, first_page.dtype, worker_progress_signal)
+        data = np.swapaxes(data, 1, 2)
+        worker_progress_signal.emit(frame_amount)
+        return {'data': data, 'filepath': filepath, 'data_owner': data_owner, 'decoded': True, **cache_result}
 
 class TIFLoader():
 
@@ -13,30 +146,38 @@ class TIFLoader():
         Starts the ProgressDialog.
         
         Starts a Worker that loads the file and calls a callback that handles the result afterwards.
+
+        If filepath is a list of several files, they are combined to one MultiFileSource. Only the headers
+        of the files are read, the pages are decoded when they are accessed.
         """
 
         data_manager.progressDialog()
         data_manager.progress_dialog.setMinimum(0)
         data_manager.progress_dialog.setMaximum(0)
 
-        def work(filepath, worker_max_progress_signal, worker_progress_signal):
-            with tifffile.TiffFile(filepath) as tif:
-                frame_amount = len(tif.pages)
-                worker_max_progress_signal.emit(frame_amount)
-                first_page = tif.asarray(key=0)
-                data = np.zeros((frame_amount, first_page.shape[0], first_page.shape[1]), first_page.dtype)
-                step = int(frame_amount / 100)
-                if (step == 0): #if frame_amount < 100, step will be 0. to avoid this, we set step=1.
-                    step = 1
-                frame_counter = 0
-                while frame_counter + step < frame_amount:
-                    data[frame_counter : frame_counter + step] = tif.asarray(key=slice(frame_counter, frame_counter + step, 1))
-                    frame_counter += step
-                    worker_progress_signal.emit(frame_counter)
-                data[frame_counter : frame_amount] = tif.asarray(key=slice(frame_counter, frame_amount, 1))
-                data = np.swapaxes(data, 1, 2)
-                worker_progress_signal.emit(frame_amount)
-                return {'data': data, 'filepath': filepath}
+        def workMultiFile(filepath, worker_max_progress_signal, worker_progress_signal):
+            worker_max_progress_signal.emit(len(filepath))
+            page_counts = []
+            for index, path in enumerate(filepath):
+                page_count, page_shape, dtype = readTIFHeader(path)
+                if index == 0:
+                    first_page_shape, first_dtype = page_shape, dtype
+                elif page_shape != first_page_shape or dtype != first_dtype:
+                    return {'error': 'The frames of {} do not have the same size or type as the frames of {}.'.format(path, filepath[0])}
+                page_counts.append(page_count)
+                worker_progress_signal.emit(index + 1)
+            data = VirtualStack(filepath, page_counts, first_page_shape[::-1], first_dtype)
+            cache, cache_key, cache_entry = lookUpCache(filepath)
+            return {
+                'data': data,
+                'filepath': filepath[0],
+                'filepaths': filepath,
+                'data_owner': None,
+                'decoded': False,
+                'cache': cache,
+                'cache_key': cache_key,
+                'cache_metadata': cache_entry[1] if cache_entry is not None else None
+            }
 
         def max_progress_callback(max_progress):
             data_manager.progress_dialog.setMaximum(max_progress)
@@ -46,32 +187,46 @@ class TIFLoader():
 
         def callback(result):
             """
-            Asks the user for the image sequence frequency and creates the
+            Asks the user for the image sequence frequency, if it is not cached, and creates the
             data object afterwards.
             """
-            freq, ok = QtWidgets.QInputDialog.getDouble(
-                data_manager.source_manager,
-                'Frequency',
-                'Please set the recording frequency of the image sequence (in Hz)',
-                value = 250.0,
-                min = 0.001,
-                decimals = 3
-            )
+            if 'error' in result['result']:
+                data_manager.progress_dialog.close()
+                QtWidgets.QMessageBox.warning(data_manager.source_manager, 'Loading failed', result['result']['error'])
+                return
+            cache_metadata = result['result']['cache_metadata']
+            if cache_metadata is not None:
+                freq, ok = cache_metadata['frequency'], True
+            else:
+                freq, ok = QtWidgets.QInputDialog.getDouble(
+                    data_manager.source_manager,
+                    'Frequency',
+                    'Please set the recording frequency of the image sequence (in Hz)',
+                    value = 250.0,
+                    min = 0.001,
+                    decimals = 3
+                )
             if ok:
                 data = result['result']['data']
                 filepath = result['result']['filepath']
                 name = filepath.split('/')[-1].split('.')[0]
-                data_manager.sources.append(
-                    Source(
-                        filetype = 'tif',
-                        name = name,
-                        original_frequency = freq,
-                        start = 0,
-                        end = len(data),
-                        offset = 0.0,
-                        _data = data,
-                        short_name = data_manager._source_name,
-                        unit = 'Fluorescence Int.'))
+                source_kwargs = {
+                    'filetype': 'tif',
+                    'name': name,
+                    'original_frequency': freq,
+                    'start': 0,
+                    'end': len(data),
+                    'offset': 0.0,
+                    '_data': data,
+                    '_data_owner': result['result']['data_owner'],
+                    'short_name': data_manager._source_name,
+                    'unit': 'Fluorescence Int.'
+                }
+                if 'filepaths' in result['result']:
+                    source = MultiFileSource(filepaths = result['result']['filepaths'], **source_kwargs)
+                else:
+                    source = Source(**source_kwargs)
+                data_manager.sources.append(source)
                 movement_correction = MovementCorrection(
                     data_manager,
                     data_manager.source_manager.movement_correction.feature_view,
@@ -80,8 +235,24 @@ class TIFLoader():
                 data_manager.movement_corrections.append(movement_correction)
                 data_manager.finishLoadSource()
 
+                # cache the frequency and, if it had to be decoded, the data in the background
+                if result['result']['cache'] is not None and cache_metadata is None:
+                    metadata = {'frequency': freq, 'unit': source.unit, 'dtype': str(data.dtype), 'shape': list(data.shape)}
+                    cache_worker = Worker(
+                        work = result['result']['cache'].store,
+                        kwargs = {
+                            'key': result['result']['cache_key'],
+                            'metadata': metadata,
+                            'data': data if result['result']['decoded'] else None
+                        }
+                    )
+                    QtCore.QThreadPool.globalInstance().start(cache_worker)
+
+        if isinstance(filepath, list) and len(filepath) == 1:
+            filepath = filepath[0]
+
         worker = Worker(
-            work = work,
+            work = workMultiFile if isinstance(filepath, list) else loadTIF,
             kwargs = {'filepath': filepath},
             callback = callback,
             max_progress_callback = max_progress_callback,
@@ -0,0 +1,191 @@
+import tifffile
+import numpy as np
+import threading
+from collections import OrderedDict
+
+def memoryMapTIF(filepath, frame_amount):
+    '''
+    filepath:
+        str.
+        path of the TIF file.
+    frame_amount:
+        int.
+        amount of pages in the TIF file.
+    returns the image data as read-only memmap with shape (frames, height, width) without reading it into memory.
+        returns None if the image data can not be memory-mapped, e.g. because it is compressed, tiled or not
+        stored contiguously.
+    '''
+    try:
+        data = tifffile.memmap(filepath, mode = 'r')
+    except ValueError:
+        return None
+    # a single page is mapped as 2d array
+    if data.ndim == 2:
+        data = data[np.newaxis]
+    # only use the memmap if it represents the pages as frames, e.g. not for hyperstacks with multiple channels
+    if data.ndim != 3 or len(data) != frame_amount:
+        return None
+    return data
+
+def readTIFHeader(filepath):
+    '''
+    returns (page amount, page shape, dtype) of the TIF file. only the headers are read, not the image data.
+    '''
+    with tifffile.TiffFile(filepath) as tif:
+        return len(tif.pages), tif.pages[0].shape, tif.pages[0].dtype
+
+class VirtualStack():
+    '''
+    Image sequence with shape (frames, width, height) that is stored in an ordered list of TIF files. Behaves
+        like a read-only array: slicing only the frames returns another VirtualStack, every other indexing
+        returns an np.ndarray. Files are only opened, and pages only decoded, when their frames are accessed.
+    '''
+
+    # maximum amount of files that are kept open at the same time
+    MAX_OPEN_FILES = 16
+    # maximum amount of frame views that are cached, the least recently used views are removed
+    MAX_VIEWS = 64
+
+    def __init__(self, filepaths, page_counts, frame_shape, dtype, frames = None, _files = None):
+        '''
+        filepaths:
+            list of str.
+            ordered paths of the TIF files.
+        page_counts:
+            list of int.
+            amount of pages of each file.
+        frame_shape:
+            tuple.
+            (width, height) of the frames.
+        dtype:
+            np.dtype.
+            dtype of the pages.
+        frames:
+            np.ndarray, or None. default is None.
+            indices of the frames of all files this VirtualStack consists of. if None, all frames are used.
+        '''
+        self.filepaths = filepaths
+        self.page_counts = page_counts
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.offsets = np.concatenate([[0], np.cumsum(page_counts)]).astype(int)
+        self.frames = np.arange(self.offsets[-1]) if frames is None else frames
+        # opened files and frame views are shared by all views on the same files
+        self._files = _files if _files is not None else {'open': OrderedDict(), 'lock': threading.Lock(), 'views': OrderedDict()}
+
+    @property
+    def shape(self):
+        return (len(self.frames),) + self.frame_shape
+
+    @property
+    def ndim(self):
+        return 3
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            index = [k is Ellipsis for k in key].index(True)
+            key = key[:index] + (slice(None),) * (self.ndim + 1 - len(key)) + key[index + 1:]
+        frame_key, spatial_key = key[0], key[1:]
+
+        # only slicing the frames: return a lazy view. views are cached such that the same frames give the same object
+        if isinstance(frame_key, slice) and all(k == slice(None) for k in spatial_key):
+            frames = self.frames[frame_key]
+            view_key = (frames[0], frames[-1], len(frames)) if len(frames) > 0 else (0, 0, 0)
+            views = self._files['views']
+            with self._files['lock']:
+                view = views.get(view_key)
+                if view is None or not np.array_equal(view.frames, frames):
+                    view = VirtualStack(self.filepaths, self.page_counts, self.frame_shape, self.dtype, frames, self._files)
+                views[view_key] = view
+                views.move_to_end(view_key)
+                while len(views) > self.MAX_VIEWS:
+                    views.popitem(last = False)
+            return view
+
+        frames = self.frames[frame_key]
+        # slices of the width and height are applied while reading, other indices afterwards
+        if all(isinstance(k, slice) for k in spatial_key):
+            data = self.readFrames(np.atleast_1d(frames), spatial_key)
+        else:
+            data = self.readFrames(np.atleast_1d(frames))[(slice(None),) + spatial_key]
+        if np.ndim(frames) == 0:
+            data = data[0]
+        return data
+
+    def __array__(self, dtype = None, copy = None):
+        data = self.readFrames(self.frames)
+        return data if dtype is None else data.astype(dtype)
+
+    def transpose(self, *axes):
+        axes = tuple(axes[0]) if len(axes) == 1 and axes[0] is not None else axes
+        if axes in [(), (0, 1, 2)]:
+            return self
+        return np.asarray(self).transpose(axes)
+
+    def min(self):
+        return min(self.readFrames(self.frames[start:start + 100]).min() for start in range(0, len(self), 100))
+
+    def max(self):
+        return max(self.readFrames(self.frames[start:start + 100]).max() for start in range(0, len(self), 100))
+
+    def openFile(self, file_index):
+        '''
+        returns the memmap of the file if it can be memory-mapped, otherwise the opened tifffile.TiffFile.
+        '''
+        open_files = self._files['open']
+        if file_index in open_files:
+            open_files.move_to_end(file_index)
+            return open_files[file_index]
+        filepath = self.filepaths[file_index]
+        file_ = memoryMapTIF(filepath, self.page_counts[file_index])
+        if file_ is None:
+            file_ = tifffile.TiffFile(filepath)
+        open_files[file_index] = file_
+        if len(open_files) > self.MAX_OPEN_FILES:
+            _, closed = open_files.popitem(last = False)
+            if isinstance(closed, tifffile.TiffFile):
+                closed.close()
+        return file_
+
+    def readFrames(self, frames, spatial_key = ()):
+        '''
+        frames:
+            np.ndarray.
+            indices of the frames of all files that shall be read.
+        spatial_key:
+            tuple. default is ().
+            slices of the width and height axes.
+        returns the frames as np.ndarray with shape (frames, width, height), indexed with spatial_key.
+        '''
+        # the pages are stored as (height, width). thus the spatial key is applied to the swapped axes.
+        spatial_key = tuple(spatial_key) + (slice(None),) * (2 - len(spatial_key))
+        page_key = (spatial_key[1], spatial_key[0])
+        frames = np.asarray(frames, dtype = int)
+        file_indices = np.searchsorted(self.offsets, frames, side = 'right') - 1
+        data = None
+        with self._files['lock']:
+            for file_index in np.unique(file_indices):
+                positions = np.nonzero(file_indices == file_index)[0]
+                pages = frames[positions] - self.offsets[file_index]
+                file_ = self.openFile(file_index)
+                if isinstance(file_, np.ndarray):
+                    file_data = file_[(pages,) + page_key]
+                else:
+                    file_data = file_.asarray(key = pages.tolist())
+                    file_data = file_data.reshape((len(pages),) + file_data.shape[-2:])[(slice(None),) + page_key]
+                file_data = np.swapaxes(file_data, 1, 2)
+                if data is None:
+                    data = np.empty((len(frames),) + file_data.shape[1:], dtype = self.dtype)
+                data[positions] = file_data
+        if data is None:
+            data = np.empty((0,) + np.empty(self.frame_shape)[spatial_key].shape, dtype = self.dtype)
+        return data
@@ -0,0 +1,511 @@
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+import numpy as np
+import traceback
+import json
+import time
+import os
+import pyabf
+
+from model.Source import Source
+from model.Object import Object
+from model.TIFLoader import loadTIF
+from model.ABFLoader import memoryMapABF, abfSignals, readABFSignal
+from model.extraction import extractMeans
+from model.export import export_work
+from kernels import background, baseline, frequency, smoothing, events, shape, spectrum, correlation
+from util.conf import (cs_roi_params,
+    bs_active, bs_roi_params, bs_perisomatic_params,
+    bl_active, bl_polynomial_fitting_params, bl_asymmetric_ls_params, bl_top_hat_params, bl_moving_average_params,
+    sg_active, sg_savitzky_golay_params, sg_moving_average_params, sg_butterworth_params, sg_scaled_window_convolution_params,
+    bd_active, bd_params, sd_active, sd_params, fs_active, fs_fft_params, es_active, es_params,
+    cc_active, cc_train_params, cc_amplitude_params, af_params)
+from util.functions import readOnly
+
+# the steps of the calculating pipeline in the order they are calculated, see Pipeline.getCalculatingPipeline.
+# every step has the same name, input, output and methods as its feature, but calls the kernels directly.
+# the method functions are called with the input and the parameters of the method as keyword arguments.
+calculating_steps = [
+    {
+        'name': 'Background Subtraction',
+        'active': bs_active,
+        'input': ['y', 'roi_params', 'roi_image', 'roi_ellipse_mode'],
+        'output': ['background mean', 'y'],
+        'methods': {
+            'ROI': (bs_roi_params, background.roiBackgroundSubtraction),
+            'Perisomatic': (bs_perisomatic_params, background.perisomaticBackgroundSubtraction)
+        }
+    },
+    {
+        'name': 'Baseline',
+        'active': bl_active,
+        'input': ['y', 'object_source'],
+        'output': ['baseline', 'y'],
+        'methods': {
+            'Polynomial Fitting': (bl_polynomial_fitting_params, baseline.polynomialFitting),
+            'Asymmetric Least Squares': (bl_asymmetric_ls_params, baseline.asymmetricLeastSquares),
+            'Top Hat': (bl_top_hat_params, baseline.topHat),
+            'Moving Average': (bl_moving_average_params, baseline.movingAverage)
+        }
+    },
+    {
+        'name': 'Adjust Frequency',
+        'active': False,
+        'input': ['y', 'object_source_af_params'],
+        'output': ['y'],
+        'methods': {
+            'Nearest Neighbour': (af_params, frequency.nearestNeighbour),
+            'Linear': (af_params, frequency.linear),
+            'Cubic': (af_params, frequency.cubic)
+        }
+    },
+    {
+        'name': 'Smoothing',
+        'active': sg_active,
+        'input': ['y', 'object_source_frequency'],
+        'output': ['y', 'noise_std'],
+        'methods': {
+            'Savitzky Golay': (sg_savitzky_golay_params, smoothing.savitzkyGolay),
+            'Moving Average': (sg_moving_average_params, smoothing.movingAverage),
+            'Butterworth': (sg_butterworth_params, smoothing.butterworth),
+            'Scaled Window Convolution': (sg_scaled_window_convolution_params, smoothing.scaledWindowConvolution)
+        }
+    },
+    {
+        'name': 'Spike Detection',
+        'active': sd_active,
+        'input': ['y', 'object_source_frequency', 'object_noise_std'],
+        'output': ['time', 'amplitude', 'train', 'spike frequency', 'mean amplitude', 'τDecay', 'mean τDecay', 'threshold'],
+        'methods': {
+            'Threshold': (sd_params, events.spikeDetection)
+        }
+    },
+    {
+        'name': 'Burst Detection',
+        'active': bd_active,
+        'input': ['y', 'object_source_frequency', 'object_noise_std'],
+        'output': ['start', 'end', 'time', 'amplitude', 'duration', 'train', 'burst frequency', 'mean amplitude',
+            'mean duration', 'tPeak', 'aMax', 'τDecay', 'mean tPeak', 'mean aMax', 'mean τDecay',
+            'amplitude threshold', 'base threshold'],
+        'methods': {
+            'Threshold': (bd_params, events.burstDetection)
+        }
+    },
+    {
+        'name': 'Event Shape',
+        'active': es_active,
+        'input': ['y', 'burst_time', 'spike_time', 'object_source_frequency'],
+        'output': ['shapes', 'mean shape', 'mean shape smoothed'],
+        'methods': {
+            'Spike Shape': (es_params, shape.spikeShape),
+            'Burst Shape': (es_params, shape.burstShape)
+        }
+    },
+    {
+        'name': 'Power Spectrum',
+        'active': fs_active,
+        'input': ['y', 'object_source_frequency'],
+        'output': ['frequencies', 'psd', 'max power', 'max power frequency'],
+        'methods': {
+            'Fast Fourier Transform': (fs_fft_params, spectrum.fourier)
+        }
+    },
+    {
+        'name': 'Spike Cross Correlation',
+        'active': cc_active,
+        'input': ['trains_data'],
+        'output': ['xrange', 'correlation', 'coefficient', 'delay', 'delay coefficient'],
+        'methods': {
+            'Spike Train': (cc_train_params, correlation.trainCorrelation)
+        }
+    },
+    {
+        'name': 'Amplitude Cross Correlation',
+        'active': cc_active,
+        'input': ['amplitudes_data'],
+        'output': ['xrange', 'correlation', 'coefficient', 'delay', 'delay coefficient'],
+        'methods': {
+            'Amplitude': (cc_amplitude_params, correlation.amplitudeCorrelation)
+        }
+    }
+]
+
+# the steps that change the raw data and the steps that change the processed data, see Pipeline.getRawFeatures
+# and Pipeline.getProcessingFeatures
+raw_steps = ['Background Subtraction']
+processing_steps = ['Background Subtraction', 'Baseline', 'Adjust Frequency', 'Smoothing']
+
+def getKernel(name, method):
+    '''
+    returns the kernel of the method of the step with the name.
+    '''
+    step = next(step for step in calculating_steps if step['name'] == name)
+    return step['methods'][method][1]
+
+class NoProgress():
+    '''
+    replaces the progress signals of a Worker when there is no progress to show.
+    '''
+    def emit(self, *args):
+        pass
+
+@dataclass
+class BatchMethod():
+    name: str
+    parameters: dict
+    function: object
+
+@dataclass
+class BatchStep():
+    '''
+    a pipeline step that provides what model.export needs from a Feature, without any widget.
+    '''
+    name: str
+    active: bool
+    methods: dict
+    method: str
+    input: dict
+    output: dict
+    input_data_name: str = None
+
+    def getMethod(self):
+        return self.methods[self.method]
+
+    def update(self):
+        method = self.getMethod()
+        output = method.function(**self.input, **method.parameters)
+        self.output = {key: readOnly(value) for key, value in output.items()}
+
+@dataclass
+class BatchPipeline():
+    steps: list
+    _spike_cross_correlation: BatchStep = None
+    _amplitude_cross_correlation: BatchStep = None
+
+    def getCalculatingPipeline(self):
+        return self.steps + [self._spike_cross_correlation, self._amplitude_cross_correlation]
+
+    def getCalculatingActiveStates(self):
+        return [step.active for step in self.getCalculatingPipeline()]
+
+@dataclass
+class BatchDataManager():
+    '''
+    holds the sources and objects of one file, like DataManager.
+    '''
+    sources: list = field(default_factory = list)
+    objects: list = field(default_factory = list)
+    movement_corrections: list = field(default_factory = list)
+    pipeline: BatchPipeline = None
+
+    def getCurrentPipeline(self):
+        return self.pipeline
+
+class ExportFile():
+    '''
+    replaces the QFileInfo of the export file.
+    '''
+    def __init__(self, path):
+        self.path = path
+
+    def absoluteFilePath(self):
+        return os.path.abspath(self.path)
+
+def readROIs(path):
+    '''
+    path:
+        str or None.
+        path of a JSON file with a list of rois. every roi is a dict with the (optional) keys 'name', 'pos',
+        'size', 'angle', 'ellipse_mode' and 'invert'. missing keys are set to cs_roi_params or False.
+    returns the list of rois. if path is None, there is one roi with the default position, size and angle.
+    '''
+    if path is None:
+        return [{}]
+    with open(path) as f:
+        return json.load(f)
+
+def readPipelineConfiguration(path):
+    '''
+    path:
+        str or None.
+        path of a JSON file with a dict that maps step names to a dict with the (optional) keys 'active',
+        'method' and 'parameters', e.g. {"Smoothing": {"active": true, "method": "Butterworth",
+        "parameters": {"highcut": 50.0}}}. missing keys are set to the defaults of util/conf.py.
+    returns the configuration dict. if path is None, it is empty.
+    '''
+    if path is None:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def createStep(step, configuration, filetype):
+    '''
+    returns the BatchStep for the step dict of calculating_steps, configured with the configuration of the step
+        (see readPipelineConfiguration).
+    '''
+    methods = {}
+    for name, (parameters, function) in step['methods'].items():
+        parameters = deepcopy(parameters)
+        if configuration.get('method', name) == name:
+            parameters.update(configuration.get('parameters', {}))
+        methods[name] = BatchMethod(name, parameters, function)
+    method = configuration.get('method', list(methods.keys())[0])
+    if method not in methods:
+        raise ValueError('{} has no method {}. Possible methods: {}.'.format(step['name'], method, ', '.join(methods.keys())))
+    active = configuration.get('active', step['active'])
+    # never activate background subtraction for non-tif-sources
+    if step['name'] == 'Background Subtraction' and filetype != 'tif':
+        active = False
+    return BatchStep(
+        name = step['name'],
+        active = active,
+        methods = methods,
+        method = method,
+        input = {key: None for key in step['input']},
+        output = {key: None for key in step['output']},
+        input_data_name = step['input'][0] if step['name'].endswith('Cross Correlation') else None)
+
+def createPipeline(configuration, filetype, spike_cross_correlation, amplitude_cross_correlation):
+    '''
+    returns a BatchPipeline with new steps, except for the cross correlations, which are shared by all objects.
+    '''
+    steps = [createStep(step, configuration.get(step['name'], {}), filetype) for step in calculating_steps[:-2]]
+    return BatchPipeline(steps, spike_cross_correlation, amplitude_cross_correlation)
+
+def loadSources(filepath, original_frequency):
+    '''
+    loads the sources of a TIF or ABF file without a QApplication. all connected signals of an ABF file are loaded.
+    original_frequency:
+        float.
+        recording frequency of TIF files whose frequency is not cached.
+    returns the list of sources.
+    '''
+    name = filepath.split('/')[-1].split('.')[0]
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension in ['.tif', '.tiff']:
+        result = loadTIF(filepath, NoProgress(), NoProgress())
+        if result['cache_metadata'] is not None:
+            original_frequency = result['cache_metadata']['frequency']
+        data = result['data']
+        return [Source(
+            filetype = 'tif',
+            name = name,
+            original_frequency = original_frequency,
+            start = 0,
+            end = len(data),
+            offset = 0.0,
+            _data = data,
+            _data_owner = result['data_owner'],
+            short_name = 1,
+            unit = 'Fluorescence Int.')]
+    elif extension == '.abf':
+        abf = pyabf.ABF(filepath, loadData = False)
+        raw = memoryMapABF(abf)
+        signals, _ = abfSignals(abf, raw)
+        sources = []
+        for index, signal in enumerate(signals):
+            data = readABFSignal(abf, raw, signal['channel'], signal['sweeps'])
+            sources.append(Source(
+                filetype = 'abf',
+                name = name if len(signals) == 1 else '{} ({})'.format(name, signal['tabledata'][0]),
+                original_frequency = abf.dataRate,
+                start = 0,
+                end = len(data),
+                offset = 0.0,
+                _data = data,
+                short_name = index + 1,
+                unit = signal['tabledata'][4]))
+        return sources
+    raise ValueError('{} is neither a TIF nor an ABF file.'.format(filepath))
+
+def calculatePipeline(object_):
+    '''
+    calculates the pipeline of the object, except for the cross correlations, like DataManager.refreshPipeline.
+    '''
+    source = object_.source
+    precision = source.getPrecision()
+    if object_.cell_mean is None:
+        object_.processed = readOnly(np.asarray(source.getData(), dtype = precision))
+    else:
+        object_.processed = readOnly(np.asarray(object_.cell_mean, dtype = precision))
+    object_.raw = object_.processed
+
+    steps = object_.pipeline.steps
+    names = [step.name for step in steps]
+    max_raw_index = max(names.index(name) for name in raw_steps)
+    max_processing_index = max(names.index(name) for name in processing_steps)
+
+    burst_time = False
+    spike_time = False
+    object_noise_std = 0
+    for index, step in enumerate(steps):
+
+        # if we just finished with raw: set raw
+        if index == max_raw_index + 1:
+            object_.raw = object_.processed
+
+        # if we just finished with processed: invert
+        if index == max_processing_index + 1 and object_.invert:
+            object_.processed = readOnly(-object_.processed)
+
+        if not step.active:
+            continue
+
+        input_ = {
+            'y': object_.processed,
+            'roi_ellipse_mode': object_.ellipse_mode,
+            'roi_params': (object_.pos, object_.size, object_.angle),
+            'roi_image': source.getData() if source.filetype == 'tif' else None,
+            'object_source': source,
+            'object_source_frequency': source.getFrequency(),
+            'object_source_af_params': (source.original_frequency,
+                source.adjusted_frequency,
+                source.adjust_frequency_active,
+                source.adjust_frequency_method),
+            'object_noise_std': object_noise_std,
+            'burst_time': burst_time,
+            'spike_time': spike_time
+        }
+        step.input = {key: input_[key] for key in step.input.keys()}
+        step.update()
+
+        if 'y' in step.output.keys() and step.output['y'] is not None:
+            object_.processed = step.output['y']
+        if 'noise_std' in step.output.keys() and step.output['noise_std'] is not None:
+            object_noise_std = step.output['noise_std']
+        if step.name == 'Burst Detection':
+            burst_time = step.output['time']
+        elif step.name == 'Spike Detection':
+            spike_time = step.output['time']
+
+def calculateCrossCorrelations(data_manager):
+    '''
+    calculates the cross correlations of the active objects of the data manager.
+    '''
+    active_objects = [o for o in data_manager.objects if o.active]
+    spike_cross_correlation = data_manager.pipeline._spike_cross_correlation
+    if spike_cross_correlation.active:
+        spike_cross_correlation.input['trains_data'] = [
+            {
+                'train': o.pipeline.steps[[step.name for step in o.pipeline.steps].index('Spike Detection')].output['train'],
+                'freq': o.source.getFrequency(),
+                'name': o.name,
+                'offset': o.source.offset
+            } for o in active_objects]
+        spike_cross_correlation.update()
+    amplitude_cross_correlation = data_manager.pipeline._amplitude_cross_correlation
+    if amplitude_cross_correlation.active:
+        amplitude_cross_correlation.input['amplitudes_data'] = [
+            {
+                'freq': o.source.getFrequency(),
+                'name': o.name,
+                'processed': o.processed,
+                'offset': o.source.offset
+            } for o in active_objects]
+        amplitude_cross_correlation.update()
+
+def processFile(filepath, rois, configuration, output_directory, original_frequency):
+    '''
+    loads the file, calculates the roi means and the pipeline of every object and exports everything to
+        <output_directory>/<file name>.xlsx. runs in a worker process of runBatch.
+    rois:
+        list of dict.
+        see readROIs. only used for TIF files, every source of an ABF file has one object.
+    configuration:
+        dict.
+        see readPipelineConfiguration.
+    original_frequency:
+        float.
+        see loadSources.
+    returns a tuple (filepath, path of the exported file or None, error message or None).
+    '''
+    try:
+        data_manager = BatchDataManager()
+        data_manager.sources = loadSources(filepath, original_frequency)
+        data_manager.movement_corrections = [None for _ in data_manager.sources]
+
+        # the cross correlations are shared by all objects of the file
+        spike_cross_correlation = createStep(calculating_steps[-2], configuration.get(calculating_steps[-2]['name'], {}), 'tif')
+        amplitude_cross_correlation = createStep(calculating_steps[-1], configuration.get(calculating_steps[-1]['name'], {}), 'tif')
+
+        # set the adjust frequency settings of the sources
+        af_configuration = configuration.get('Adjust Frequency', {})
+        af_methods = list(calculating_steps[2]['methods'].keys())
+        for source in data_manager.sources:
+            source.adjust_frequency_active = af_configuration.get('active', False)
+            source.adjust_frequency_method = af_methods.index(af_configuration.get('method', af_methods[0]))
+            source.adjusted_frequency = af_configuration.get('parameters', {}).get('adjusted_frequency', af_params['adjusted_frequency'])
+
+        for source in data_manager.sources:
+            if source.filetype == 'tif':
+                data = source.getData()
+                pos, size, angle = cs_roi_params['roi']
+                for roi in rois:
+                    object_ = Object(
+                        name = roi.get('name', 'ROI {} - {}'.format(source.short_name, source.object_number)),
+                        source = source,
+                        pos = tuple(roi.get('pos', pos)),
+                        size = tuple(roi.get('size', size)),
+                        angle = roi.get('angle', angle),
+                        invert = roi.get('invert', False),
+                        ellipse_mode = roi.get('ellipse_mode', False),
+                        pipeline = createPipeline(configuration, source.filetype, spike_cross_correlation, amplitude_cross_correlation))
+                    source.object_number += 1
+                    data_manager.objects.append(object_)
+                # the roi means of all objects are calculated in one pass over the frames
+                tif_objects = [o for o in data_manager.objects if o.source is source]
+                cell_means = extractMeans(data, [(o.pos, o.size, o.angle, o.ellipse_mode) for o in tif_objects], dtype = source.getPrecision())
+                for object_, cell_mean in zip(tif_objects, cell_means):
+                    object_.cell_mean = cell_mean
+            else:
+                data_manager.objects.append(Object(
+                    name = 'ABF {} - {}'.format(source.short_name, source.object_number),
+                    source = source,
+                    pipeline = createPipeline(configuration, source.filetype, spike_cross_correlation, amplitude_cross_correlation)))
+                source.object_number += 1
+
+        for object_ in data_manager.objects:
+            calculatePipeline(object_)
+        data_manager.pipeline = data_manager.objects[0].pipeline
+        calculateCrossCorrelations(data_manager)
+
+        # export raw, processed and all features
+        export_path = os.path.join(output_directory, filepath.split('/')[-1].split('.')[0] + '.xlsx')
+        exported = export_work(
+            data_manager = data_manager,
+            objects = [True for _ in data_manager.objects],
+            data = [True, True] + [True for _ in data_manager.pipeline.getCalculatingPipeline()],
+            file_info = ExportFile(export_path),
+            export_time = time.localtime(),
+            cc_only_inside_sources = False,
+            worker_progress_signal = NoProgress())
+        if not exported:
+            return (filepath, None, 'Exporting data was not successful.')
+        return (filepath, export_path, None)
+    except (SystemExit, KeyboardInterrupt):
+        raise
+    except:
+        return (filepath, None, traceback.format_exc())
+
+def runBatch(filepaths, rois, configuration, output_directory, original_frequency = 250.0, workers = 0, callback = None):
+    '''
+    processes the files in a process pool, see processFile.
+    workers:
+        int. default is 0.
+        amount of worker processes, 0 means one per CPU.
+    callback:
+        function or None. default is None.
+        called with the result of processFile whenever a file is finished.
+    returns the list of results of processFile, in the order the files were finished.
+    '''
+    os.makedirs(output_directory, exist_ok = True)
+    results = []
+    with ProcessPoolExecutor(max_workers = workers if workers > 0 else None) as executor:
+        futures = [executor.submit(processFile, filepath, rois, configuration, output_directory, original_frequency) for filepath in filepaths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if callback is not None:
+                callback(result)
+    return results
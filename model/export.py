@@ -1,6 +1,5 @@
 from PyQt5 import QtCore, QtWidgets
 import numpy as np
-import xlsxwriter
 import time
 import traceback
 
@@ -42,6 +41,8 @@ def writeFeature(worksheet, wrap, col, objects_names, data, label, x_axis = Fals
 
 
 def export_work(data_manager, objects, data, file_info, export_time, cc_only_inside_sources, worker_progress_signal):
+    # xlsxwriter is only needed for exporting, so it is not imported at startup
+    import xlsxwriter
     try:
         progress = 0
         # get object indices list from binary list
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+import numpy as np
+import math
+
+from util.conf import ex_params
+
+@dataclass
+class ROIWeights():
+    # bounding box of the roi in the frame
+    x_slice: slice
+    y_slice: slice
+    # weights of the pixels in the bounding box. the weighted sum is the roi mean.
+    weights: np.ndarray
+    # amount of samples the roi mean is calculated of
+    area: int
+
+def ellipseWeights(frame_shape, pos, size, angle):
+    '''
+    returns the ROIWeights of an ellipse roi. the weights are the same as the ones used by the mean of
+        pyqtgraph's EllipseROI.getArrayRegion: the roi is sampled with bilinear interpolation on a grid of
+        ceil(size) points, the samples outside of the ellipse are set to 0 and the mean is taken over all samples.
+    '''
+    width, height = frame_shape
+    w, h = math.ceil(abs(size[0])), math.ceil(abs(size[1]))
+    if w == 0 or h == 0:
+        return ROIWeights(slice(0, 0), slice(0, 0), np.zeros((0, 0)), 0)
+
+    # sample coordinates
+    a = math.radians(angle)
+    gx, gy = np.mgrid[0:w, 0:h]
+    x = pos[0] + gx * math.cos(a) - gy * math.sin(a)
+    y = pos[1] + gx * math.sin(a) + gy * math.cos(a)
+
+    # samples outside of the ellipse or the frame are 0
+    ellipse = np.hypot((gx + 0.5) / (w / 2.) - 1, (gy + 0.5) / (h / 2.) - 1) < 1
+    x0 = np.floor(x).astype(int)
+    y0 = np.floor(y).astype(int)
+    valid = ellipse & (x0 >= 0) & (x <= width - 1) & (y0 >= 0) & (y <= height - 1)
+    x, y, x0, y0 = x[valid], y[valid], x0[valid], y0[valid]
+    dx = x - x0
+    dy = y - y0
+
+    # distribute the bilinear interpolation weights. the last row and column only get weights of 0.
+    weights = np.zeros((width + 1, height + 1))
+    np.add.at(weights, (x0, y0), (1 - dx) * (1 - dy))
+    np.add.at(weights, (x0 + 1, y0), dx * (1 - dy))
+    np.add.at(weights, (x0, y0 + 1), (1 - dx) * dy)
+    np.add.at(weights, (x0 + 1, y0 + 1), dx * dy)
+    weights = weights[:width, :height] / (w * h)
+
+    if len(x0) == 0:
+        return ROIWeights(slice(0, 0), slice(0, 0), np.zeros((0, 0)), w * h)
+    x_slice = slice(x0.min(), min(x0.max() + 2, width))
+    y_slice = slice(y0.min(), min(y0.max() + 2, height))
+    return ROIWeights(x_slice, y_slice, weights[x_slice, y_slice], w * h)
+
+def rectWeights(frame_shape, pos, size):
+    '''
+    returns the ROIWeights of a not rotated rectangular roi. the pixels are the same as the ones of the slice
+        returned by pyqtgraph's ROI.getArraySlice.
+    '''
+    width, height = frame_shape
+    bounds = []
+    for p, s, length in [(pos[0], size[0], width), (pos[1], size[1], height)]:
+        bounds.append((max(min(p, p + s), 0), min(max(p, p + s), length)))
+    # if the roi does not intersect the frame, the intersection is an empty rectangle at 0
+    if any(start >= stop for start, stop in bounds):
+        bounds = [(0, 0), (0, 0)]
+    x_slice, y_slice = [slice(int(start), min(int(1 + stop), length)) for (start, stop), length in zip(bounds, frame_shape)]
+    area = (x_slice.stop - x_slice.start) * (y_slice.stop - y_slice.start)
+    weights = np.full((x_slice.stop - x_slice.start, y_slice.stop - y_slice.start), 1 / area if area else 0.)
+    return ROIWeights(x_slice, y_slice, weights, area)
+
+def ringWeights(outer, inner):
+    '''
+    outer, inner:
+        ROIWeights.
+        the weights of a roi and of a roi inside of it, e.g. the perisomatic roi and the cell roi.
+    returns the ROIWeights of the ring between the rois: the weighted sum is the mean of the samples of the outer
+        roi that are not samples of the inner roi.
+    '''
+    area = outer.area - inner.area
+    # the sums of the samples of the rois, the empty ones are left out
+    parts = [(w, factor) for w, factor in [(outer, outer.area), (inner, -inner.area)] if w.weights.size > 0]
+    if area <= 0 or len(parts) == 0:
+        return ROIWeights(slice(0, 0), slice(0, 0), np.zeros((0, 0)), max(area, 0))
+    x_slice = slice(min(w.x_slice.start for w, _ in parts), max(w.x_slice.stop for w, _ in parts))
+    y_slice = slice(min(w.y_slice.start for w, _ in parts), max(w.y_slice.stop for w, _ in parts))
+    weights = np.zeros((x_slice.stop - x_slice.start, y_slice.stop - y_slice.start))
+    for w, factor in parts:
+        weights[w.x_slice.start - x_slice.start:w.x_slice.stop - x_slice.start,
+            w.y_slice.start - y_slice.start:w.y_slice.stop - y_slice.start] += w.weights * factor
+    return ROIWeights(x_slice, y_slice, weights / area, area)
+
+def roiWeights(frame_shape, pos, size, angle, ellipse_mode):
+    '''
+    frame_shape:
+        tuple.
+        (width, height) of the frames.
+    pos, size, angle:
+        tuple, tuple, float.
+        parameters of the roi.
+    ellipse_mode:
+        bool.
+        determines if the roi is an ellipse or a rectangle.
+    returns the ROIWeights of the roi.
+    '''
+    if ellipse_mode:
+        return ellipseWeights(frame_shape, pos, size, angle)
+    return rectWeights(frame_shape, pos, size)
+
+def extractTraces(data, rois_weights, progress_callback = None, dtype = np.float64):
+    '''
+    data:
+        np.ndarray.
+        the image sequence with shape (frames, width, height). can be a memmap, because it is read in blocks of
+            ex_params['block_size'] frames, and only the part of the frames that is covered by the rois.
+    rois_weights:
+        list of ROIWeights.
+    progress_callback:
+        function, or None. default is None.
+        called with the amount of processed frames after each block.
+    dtype:
+        np.dtype. default is np.float64.
+        dtype of the traces. the weighted sums are calculated in this dtype, the data keeps its own dtype.
+    returns a list with the weighted sums (the roi means) of all rois for each frame. every block of frames is
+        read once for all rois, and each roi only multiplies its bounding box.
+    '''
+    frame_amount = len(data)
+    traces = [np.full(frame_amount, np.nan, dtype = dtype) if w.area == 0 else np.zeros(frame_amount, dtype = dtype) for w in rois_weights]
+    used = [i for i, w in enumerate(rois_weights) if w.area > 0 and w.weights.size > 0]
+    if len(used) == 0:
+        return traces
+
+    # only read the part of the frames that contains all rois
+    x_start = min(rois_weights[i].x_slice.start for i in used)
+    x_stop = max(rois_weights[i].x_slice.stop for i in used)
+    y_start = min(rois_weights[i].y_slice.start for i in used)
+    y_stop = max(rois_weights[i].y_slice.stop for i in used)
+
+    # the bounding boxes relative to the read part and the weights in the dtype of the traces
+    regions = [(i,
+        slice(rois_weights[i].x_slice.start - x_start, rois_weights[i].x_slice.stop - x_start),
+        slice(rois_weights[i].y_slice.start - y_start, rois_weights[i].y_slice.stop - y_start),
+        rois_weights[i].weights.astype(dtype, copy = False)) for i in used]
+
+    block_size = ex_params['block_size']
+    for start in range(0, frame_amount, block_size):
+        stop = min(start + block_size, frame_amount)
+        block = np.asarray(data[start:stop, x_start:x_stop, y_start:y_stop])
+        for i, x_slice, y_slice, weights in regions:
+            traces[i][start:stop] = np.tensordot(block[:, x_slice, y_slice], weights, axes = 2)
+        if progress_callback is not None:
+            progress_callback(stop)
+    return traces
+
+def extractMeans(data, rois, progress_callback = None, dtype = np.float64):
+    '''
+    data:
+        np.ndarray.
+        the image sequence with shape (frames, width, height).
+    rois:
+        list of tuples.
+        (pos, size, angle, ellipse_mode) of each roi.
+    returns a list with the mean of each roi for each frame with the given dtype, calculated in one pass over the data.
+    '''
+    frame_shape = data.shape[1:]
+    rois_weights = [roiWeights(frame_shape, pos, size, angle, ellipse_mode) for pos, size, angle, ellipse_mode in rois]
+    return extractTraces(data, rois_weights, progress_callback, dtype)
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+from kernels import baseline
+from kernels.benchmark import syntheticTrace
+from util import functions
+
+def sparseALS(y, iterations, smooth, p = 0.001):
+    # the previous implementation with a generic sparse solve
+    smooth = smooth**3
+    L = len(y)
+    D = sparse.diags([1, -2, 1], [0, -1, -2], shape = (L, L-2))
+    w = np.ones(L)
+    for i in range(iterations):
+        W = sparse.spdiags(w, 0, L, L)
+        Z = (W + smooth * D.dot(D.transpose())).tocsc()
+        z = linalg.spsolve(Z, w*y)
+        w = p * (y > z) + (1-p) * (y < z)
+    return z
+
+class ALSTest(unittest.TestCase):
+
+    def setUp(self):
+        self.y, self.source = syntheticTrace(5000, 250.0)
+
+    def test_penalty(self):
+        for L in [3, 4, 7]:
+            D = sparse.diags([1, -2, 1], [0, -1, -2], shape = (L, L-2))
+            expected = 8 * (D @ D.T).toarray()
+            bands = functions.alsPenalty(L, 2)
+            penalty = np.diag(bands[2]) + np.diag(bands[1, 1:], 1) + np.diag(bands[1, 1:], -1) + np.diag(bands[0, 2:], 2) + np.diag(bands[0, 2:], -2)
+            self.assertTrue(np.array_equal(penalty, expected))
+        self.assertFalse(functions.alsPenalty(7, 2).flags.writeable)
+
+    def test_sparse(self):
+        for iterations, smooth in [(1, 3), (3, 100), (10, 100)]:
+            expected = sparseALS(self.y, iterations, smooth)
+            self.assertTrue(np.allclose(functions.als(self.y, iterations, smooth), expected, rtol = 0, atol = 1e-6))
+
+    def test_dtype(self):
+        self.assertEqual(functions.als(self.y.astype(np.float32), 2, 100).dtype, np.float32)
+        self.assertEqual(baseline.asymmetricLeastSquares(self.y.astype(np.float32), self.source, 2, 100, 0)['baseline'].dtype, np.float32)
+        self.assertRaises(ValueError, functions.als, self.y, 0, 100)
+
+    def test_warm_start(self):
+        states = baseline.ALSStates()
+        first = states.calculate(self.y, 2, 100, 0.001)
+        self.assertTrue(np.array_equal(first, functions.als(self.y, 2, 100)))
+        # more iterations continue from the stored weights, with the same result as a new calculation
+        more = states.calculate(self.y, 5, 100, 0.001)
+        self.assertTrue(np.array_equal(more, functions.als(self.y, 5, 100)))
+        less = states.calculate(self.y, 1, 100, 0.001)
+        self.assertTrue(np.array_equal(less, functions.als(self.y, 1, 100)))
+        # other traces have their own states
+        other = states.calculate(self.y[::-1].copy(), 2, 100, 0.001)
+        self.assertTrue(np.array_equal(other, functions.als(self.y[::-1], 2, 100)))
+        self.assertEqual(len(states.states), 2)
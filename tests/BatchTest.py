@@ -0,0 +1,55 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import tifffile
+
+from model.batch import processFile, createPipeline, createStep, calculatePipeline, calculating_steps
+from model.Source import Source
+from model.Object import Object
+from model.extraction import extractMeans
+from kernels import smoothing
+from util.conf import sc_params
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_active = sc_params['active']
+        sc_params['active'] = False
+        self.data = np.random.default_rng(0).normal(100, 5, (200, 16, 12)).astype(np.uint16)
+        self.filepath = os.path.join(self.directory.name, 'recording.tif')
+        tifffile.imwrite(self.filepath, self.data)
+        self.configuration = {
+            'Smoothing': {'active': True, 'method': 'Moving Average', 'parameters': {'window': 5}},
+            'Spike Detection': {'active': True, 'parameters': {'relative_threshold': True}},
+            'Amplitude Cross Correlation': {'active': True}
+        }
+
+    def tearDown(self):
+        sc_params['active'] = self.cache_active
+        self.directory.cleanup()
+
+    def test_process_file(self):
+        rois = [{'name': 'a', 'pos': (1, 1), 'size': (5, 5)}, {'pos': (6, 4), 'size': (6, 6), 'ellipse_mode': True}]
+        filepath, export_path, error = processFile(self.filepath, rois, self.configuration, self.directory.name, 100.0)
+        self.assertIsNone(error)
+        self.assertEqual(export_path, os.path.join(self.directory.name, 'recording.xlsx'))
+        self.assertTrue(os.path.isfile(export_path))
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            createStep(calculating_steps[1], {'method': 'Unknown'}, 'tif')
+
+    def test_pipeline(self):
+        source = Source(filetype = 'tif', original_frequency = 100.0, start = 0, end = len(self.data), offset = 0.0, _data = np.swapaxes(self.data, 1, 2))
+        roi = ((2, 3), (6, 5), 0, False)
+        cell_mean = extractMeans(source.getData(), [roi])[0]
+        spike_cc = createStep(calculating_steps[-2], {}, 'tif')
+        amplitude_cc = createStep(calculating_steps[-1], {}, 'tif')
+        object_ = Object(name = 'ROI', source = source, cell_mean = cell_mean, pos = roi[0], size = roi[1], angle = roi[2],
+            invert = True, pipeline = createPipeline(self.configuration, 'tif', spike_cc, amplitude_cc))
+        calculatePipeline(object_)
+        expected = smoothing.movingAverage(cell_mean, 100.0, window = 5)['y']
+        self.assertTrue(np.allclose(object_.raw, cell_mean))
+        self.assertTrue(np.allclose(object_.processed, -expected))
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+
+from kernels import baseline
+from kernels.benchmark import syntheticTrace
+from util import functions
+from util.conf import bb_params
+
+class BlockBaselineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.y, self.source = syntheticTrace(60000, 250.0)
+
+    def test_blockwise(self):
+        # the blocks are blended, the result of the identity is the trace
+        parts = []
+        def identity(part):
+            parts.append(part)
+            return self.y[part]
+        z = functions.blockwise(identity, len(self.y), 7000, 100, workers = 2)
+        self.assertTrue(np.allclose(z, self.y, rtol = 0, atol = 1e-12))
+        # the rest of the trace belongs to the last block
+        self.assertEqual(len(parts), 8)
+        self.assertEqual(max(part.stop for part in parts), len(self.y))
+        # short traces are one block
+        self.assertTrue(np.array_equal(functions.blockwise(identity, 5000, 7000, 100), self.y[:5000]))
+
+    def test_top_hat(self):
+        for factor in [0.001, 0.01]:
+            expected = functions.topHat(self.y, factor)
+            z = functions.blockTopHat(self.y, factor, 5000, workers = 2)
+            self.assertTrue(np.allclose(z, expected, rtol = 0, atol = 1e-12))
+
+    def test_als(self):
+        amplitude = np.ptp(self.y)
+        for iterations, smooth, p in [(1, 100, 0.001), (5, 100, 0.001), (10, 30, 0.01)]:
+            tolerance = 1e-6
+            expected = functions.alsIterations(self.y, iterations, smooth, p)[0]
+            z, w = functions.blockALS(self.y, iterations, smooth, p, block_size = 5000, tolerance = tolerance, workers = 2)
+            self.assertLess(np.abs(z - expected).max(), tolerance * amplitude)
+            # the weights continue the calculation
+            more = functions.blockALS(self.y, 2, smooth, p, w, block_size = 5000, tolerance = tolerance)[0]
+            self.assertLess(np.abs(more - functions.alsIterations(self.y, iterations + 2, smooth, p)[0]).max(), 10 * tolerance * amplitude)
+
+    def test_kernels(self):
+        min_length = bb_params['min_length']
+        block_size = bb_params['block_size']
+        bb_params['min_length'] = 20000
+        bb_params['block_size'] = 8000
+        try:
+            self.assertTrue(baseline.blockMode(self.y))
+            als = baseline.ALSStates().calculate(self.y, 3, 100, 0.001)
+            self.assertLess(np.abs(als - functions.als(self.y, 3, 100)).max(), bb_params['tolerance'] * np.ptp(self.y))
+            top_hat = baseline.topHat(self.y, self.source, 0.01)['baseline']
+            self.assertTrue(np.allclose(top_hat, functions.topHat(self.y, 0.01), rtol = 0, atol = 1e-12))
+        finally:
+            bb_params['min_length'] = min_length
+            bb_params['block_size'] = block_size
+        self.assertFalse(baseline.blockMode(self.y))
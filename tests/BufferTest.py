@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+
+from model.batch import createPipeline, createStep, calculatePipeline, calculating_steps
+from model.Source import Source
+from model.Object import Object
+from util.functions import readOnly
+from util.profiling import AllocationCounter
+
+class BufferTest(unittest.TestCase):
+
+    def test_read_only(self):
+        y = np.arange(10.0)
+        view = readOnly(y)
+        self.assertTrue(np.shares_memory(view, y))
+        self.assertFalse(view.flags.writeable)
+        self.assertTrue(y.flags.writeable)
+        with self.assertRaises(ValueError):
+            view[0] = 1
+        self.assertIs(readOnly(view), view)
+        self.assertIsNone(readOnly(None))
+
+    def test_allocation_counter(self):
+        with AllocationCounter('test', report = False) as counter:
+            with AllocationCounter('nested', report = False) as nested:
+                y = np.ones(2**20)
+            z = y * 2
+            del z
+        self.assertIsNone(nested.peak)
+        self.assertGreaterEqual(counter.peak, 2 * y.nbytes)
+        self.assertGreaterEqual(counter.retained, y.nbytes)
+        self.assertLess(counter.retained, 2 * y.nbytes)
+        with AllocationCounter('inactive', active = False) as inactive:
+            y = np.ones(2**20)
+        self.assertIsNone(inactive.peak)
+
+    def test_pipeline_shares_traces(self):
+        cell_mean = np.random.default_rng(0).normal(0, 1, 1000)
+        source = Source(filetype = 'abf', original_frequency = 100.0, start = 0, end = len(cell_mean), offset = 0.0, _data = cell_mean)
+        configuration = {
+            'Background Subtraction': {'active': False},
+            'Baseline': {'active': False},
+            'Smoothing': {'active': True, 'method': 'Moving Average', 'parameters': {'window': 5}}
+        }
+        object_ = Object(name = 'ABF', source = source, cell_mean = cell_mean,
+            pipeline = createPipeline(configuration, 'abf', createStep(calculating_steps[-2], {}, 'abf'), createStep(calculating_steps[-1], {}, 'abf')))
+        calculatePipeline(object_)
+        # the raw trace is not copied, and the traces of the pipeline can not be changed
+        self.assertTrue(np.shares_memory(object_.raw, cell_mean))
+        self.assertFalse(object_.raw.flags.writeable)
+        self.assertFalse(object_.processed.flags.writeable)
+        self.assertTrue(cell_mean.flags.writeable)
@@ -0,0 +1,55 @@
+import unittest
+from types import SimpleNamespace
+
+from model.Pipeline import Pipeline
+
+class DependencyTest(unittest.TestCase):
+
+    def setUp(self):
+        def step(consumes, produces):
+            return SimpleNamespace(consumes = consumes, produces = produces, active = True)
+        # the consumed and produced data of the features, in the order of the calculating pipeline
+        self.pipeline = Pipeline(
+            _background_subtraction = step(('y', 'roi'), ('y',)),
+            _baseline = step(('y',), ('y',)),
+            _smoothing = step(('y', 'frequency'), ('y', 'noise_std')),
+            _spike_detection = step(('y', 'noise_std', 'frequency'), ('spike_time', 'trains_data')),
+            _burst_detection = step(('y', 'noise_std', 'frequency'), ('burst_time',)),
+            _event_shape = step(('y', 'spike_time', 'burst_time', 'frequency'), ()),
+            _power_spectrum = step(('y', 'frequency'), ()),
+            _spike_cross_correlation = step(('trains_data', 'frequency'), ()),
+            _amplitude_cross_correlation = step(('y', 'frequency'), ()))
+        self.pipeline._adjust_frequency = step(('y',), ('y', 'frequency'))
+        self.calculating_pipeline = self.pipeline.getCalculatingPipeline()
+
+    def index(self, step):
+        return self.calculating_pipeline.index(step)
+
+    def test_processing(self):
+        # everything after the smoothing depends on it
+        start = self.index(self.pipeline._smoothing) + 1
+        indices = self.pipeline.getDependentIndices(start, self.pipeline._smoothing.produces)
+        self.assertEqual(indices, list(range(start, len(self.calculating_pipeline))))
+
+    def test_spike_detection(self):
+        start = self.index(self.pipeline._spike_detection) + 1
+        indices = self.pipeline.getDependentIndices(start, self.pipeline._spike_detection.produces)
+        self.assertEqual(indices, [self.index(self.pipeline._event_shape), self.index(self.pipeline._spike_cross_correlation)])
+
+    def test_inactive(self):
+        # an inactive burst detection does not produce burst times
+        self.pipeline._burst_detection.active = False
+        self.pipeline._event_shape.consumes = ('burst_time',)
+        start = self.index(self.pipeline._spike_detection)
+        indices = self.pipeline.getDependentIndices(start, ['noise_std'])
+        self.assertEqual(indices, [
+            self.index(self.pipeline._spike_detection),
+            self.index(self.pipeline._burst_detection),
+            self.index(self.pipeline._spike_cross_correlation)])
+
+    def test_invert(self):
+        start = self.index(self.pipeline._smoothing) + 1
+        self.assertEqual(self.pipeline.getDependentIndices(start, []), [])
+        indices = self.pipeline.getDependentIndices(start, [], invert_changed = True)
+        self.assertIn(self.index(self.pipeline._amplitude_cross_correlation), indices)
+        self.assertIn(self.index(self.pipeline._spike_cross_correlation), indices)
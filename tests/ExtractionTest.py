@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtWidgets
+
+from model.extraction import extractMeans, extractTraces, roiWeights, ringWeights
+from util.conf import ex_params
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+class ExtractionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.data = self.rng.random((20, 40, 30)) * 1000
+        self.imv = pg.ImageView()
+        self.imv.setImage(self.data)
+        self.img = self.imv.getProcessedImage().view(np.ndarray)
+
+    def tearDown(self):
+        self.imv.deleteLater()
+
+    def randomROI(self):
+        pos = (self.rng.uniform(-10, 45), self.rng.uniform(-10, 35))
+        size = (self.rng.uniform(0.5, 25), self.rng.uniform(0.5, 25))
+        angle = self.rng.uniform(-180, 180)
+        return pos, size, angle
+
+    def test_ellipse(self):
+        for _ in range(50):
+            pos, size, angle = self.randomROI()
+            roi = pg.EllipseROI(pos, size, angle = angle)
+            self.imv.addItem(roi)
+            expected = roi.getArrayRegion(self.img, self.imv.imageItem, axes=(1,2)).mean(axis=(1,2))
+            self.imv.removeItem(roi)
+            cell_mean = extractMeans(self.data, [(pos, size, angle, True)])[0]
+            self.assertTrue(np.allclose(cell_mean, expected))
+
+    def test_rect(self):
+        for _ in range(50):
+            pos, size, _ = self.randomROI()
+            roi = pg.RectROI(pos, size)
+            self.imv.addItem(roi)
+            _slice = roi.getArraySlice(self.img, self.imv.imageItem, axes=(1,2))
+            expected = self.img[_slice[0]].mean(axis=(1,2))
+            self.imv.removeItem(roi)
+            cell_mean = extractMeans(self.data, [(pos, size, 0, False)])[0]
+            self.assertTrue(np.allclose(cell_mean, expected))
+
+    def test_one_pass(self):
+        rois = [(*self.randomROI(), ellipse_mode) for ellipse_mode in [True, False, True]]
+        cell_means = extractMeans(self.data, rois)
+        for roi, cell_mean in zip(rois, cell_means):
+            self.assertTrue(np.allclose(cell_mean, extractMeans(self.data, [roi])[0]))
+
+    def test_ring(self):
+        # the ring mean is the mean of the samples of the outer roi without the samples of the inner roi
+        for ellipse_mode in [True, False]:
+            for _ in range(10):
+                pos, size, angle = self.randomROI()
+                angle = angle if ellipse_mode else 0
+                outer = roiWeights(self.data.shape[1:], (pos[0] - 3, pos[1] - 3), (size[0] + 6, size[1] + 6), angle, ellipse_mode)
+                inner = roiWeights(self.data.shape[1:], pos, size, angle, ellipse_mode)
+                outer_mean, inner_mean = extractTraces(self.data, [outer, inner])
+                ring_mean = extractTraces(self.data, [ringWeights(outer, inner)])[0]
+                expected = (outer_mean * outer.area - inner_mean * inner.area) / (outer.area - inner.area)
+                self.assertTrue(np.allclose(ring_mean, expected, equal_nan = True))
+
+    def test_blocks(self):
+        roi = (*self.randomROI(), True)
+        cell_mean = extractMeans(self.data, [roi])[0]
+        block_size = ex_params['block_size']
+        ex_params['block_size'] = 3
+        try:
+            self.assertTrue(np.allclose(cell_mean, extractMeans(self.data, [roi])[0]))
+        finally:
+            ex_params['block_size'] = block_size
@@ -3,4 +3,22 @@ from tests.SmoothingTest import SmoothingTest
 from tests.SpikeDetectionTest import SpikeDetectionTest
 from tests.BurstDetectionTest import BurstDetectionTest
 from tests.EventShapeTest import EventShapeTest
-from tests.PowerSpectrumTest import PowerSpectrumTest
\ No newline at end of file
+from tests.PowerSpectrumTest import PowerSpectrumTest
+from tests.ExtractionTest import ExtractionTest
+from tests.VirtualStackTest import VirtualStackTest
+from tests.SourceCacheTest import SourceCacheTest
+from tests.PrecisionTest import PrecisionTest
+from tests.BatchTest import BatchTest
+from tests.ResultCacheTest import ResultCacheTest
+from tests.DependencyTest import DependencyTest
+from tests.BufferTest import BufferTest
+from tests.RefreshTest import RefreshTest
+from tests.StepStateTest import StepStateTest
+from tests.KernelTest import KernelTest
+from tests.ProfilerTest import ProfilerTest
+from tests.IntegralImageTest import IntegralImageTest
+from tests.ALSTest import ALSTest
+from tests.BlockBaselineTest import BlockBaselineTest
+from tests.FittingTest import FittingTest
+from tests.GradientTest import GradientTest
+from tests.MovingAverageTest import MovingAverageTest
\ No newline at end of file
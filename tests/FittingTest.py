@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from scipy.optimize import curve_fit
+
+from kernels import baseline
+from kernels.benchmark import syntheticTrace
+from util import functions
+
+def curveFitting(x1, x2, y, intercept, degree):
+    # the previous implementation with an iterative fit of the polynomial
+    func = lambda x, *coefficients: np.polyval(coefficients, x)
+    popt, _ = curve_fit(func, xdata = x2, ydata = y, p0 = np.zeros(degree + 1))
+    return func(x1, *popt) + intercept
+
+class FittingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.y, self.source = syntheticTrace(2000, 250.0)
+        self.x = self.source.frameRange()
+
+    def test_curve_fit(self):
+        for degree in range(1, 7):
+            expected = curveFitting(self.x, self.x, self.y, 3, degree)
+            fit = functions.fitting(self.x, self.x, self.y, 3, degree)
+            self.assertTrue(np.allclose(fit, expected, rtol = 0, atol = 1e-6), degree)
+        # degree 0 is the mean
+        self.assertTrue(np.allclose(functions.fitting(self.x, self.x, self.y, 0, 0), self.y.mean()))
+
+    def test_high_degree(self):
+        # a polynomial of a high degree is reproduced on a shifted range
+        x = np.arange(10000, 12000)
+        t = (x - 11000) / 1000
+        y = np.polynomial.legendre.legval(t, np.linspace(1, 0.1, 16))
+        self.assertTrue(np.allclose(functions.fitting(x, x, y, 0, 15), y, rtol = 0, atol = 1e-9))
+        self.assertEqual(functions.fitting(x, x, y.astype(np.float32), 0, 15).dtype, np.float32)
+
+    def test_markers(self):
+        # the markers are positions in the trace, also if the trace does not start at frame 0
+        source = self.source
+        source.start, source.end = 100, 2100
+        output = baseline.polynomialFitting(self.y, source, 0, 2, True, [10, 1000, 1990])
+        expected = curveFitting(np.arange(2000), [10, 1000, 1990], self.y[[10, 1000, 1990]], 0, 2)
+        self.assertTrue(np.allclose(output['baseline'], expected, rtol = 0, atol = 1e-6))
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+
+from util import functions
+
+def loopGradient(y, baseline):
+    # the previous implementation with a loop over the samples
+    grad = np.zeros(len(y), dtype = functions.floatType(y))
+    for i in range(len(y)):
+        bli = baseline[i]
+        try:
+            grad[i] = (float(y[i]-bli)/bli)*100
+        except:
+            pass
+    return grad
+
+class GradientTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = 1000 + rng.normal(0, 20, 3000)
+        self.baseline = functions.movingAverage(self.y, 101)
+        self.baseline[[10, 20]] = 0
+
+    def test_loop(self):
+        gradient = functions.getGradient(self.y, self.baseline)
+        with np.errstate(divide = 'ignore'):
+            expected = loopGradient(self.y, self.baseline)
+        # the loop divided zero baselines by zero
+        self.assertTrue(np.isinf(expected[[10, 20]]).all())
+        self.assertTrue(np.array_equal(gradient[[10, 20]], [0, 0]))
+        expected[[10, 20]] = 0
+        self.assertTrue(np.allclose(gradient, expected))
+        self.assertEqual(functions.getGradient(self.y.astype(np.float32), self.baseline.astype(np.float32)).dtype, np.float32)
+
+    def test_zero_baseline(self):
+        self.baseline[30] = -1e-12
+        nan = functions.getGradient(self.y, self.baseline, 'nan', 1e-9)
+        self.assertTrue(np.isnan(nan[[10, 20, 30]]).all())
+        self.assertEqual(np.isnan(nan).sum(), 3)
+        zero = functions.getGradient(self.y, self.baseline, 'zero', 1e-9)
+        self.assertTrue(np.array_equal(zero[[10, 20, 30]], [0, 0, 0]))
+        epsilon = functions.getGradient(self.y, self.baseline, 'epsilon', 1e-9)
+        self.assertTrue(np.allclose(epsilon[[10, 30]], [(self.y[10] - 0) / 1e-9 * 100, (self.y[30] + 1e-12) / -1e-9 * 100]))
+        self.assertTrue(np.array_equal(epsilon[40:], nan[40:]))
+        self.assertRaises(ValueError, functions.getGradient, self.y, self.baseline, 'inf')
+
+    def test_batch(self):
+        ys = np.stack([self.y, self.y[::-1], self.y * 2])
+        out = np.empty(ys.shape)
+        result = functions.getGradient(ys, self.baseline, out = out)
+        self.assertIs(result, out)
+        for y, gradient in zip(ys, out):
+            self.assertTrue(np.array_equal(gradient, functions.getGradient(y, self.baseline)))
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+
+from model.IntegralImage import IntegralImage
+from model.extraction import extractMeans
+from kernels import background
+from util.conf import ii_params
+
+class IntegralImageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def randomRect(self):
+        pos = (self.rng.uniform(-10, 45), self.rng.uniform(-10, 35))
+        size = (self.rng.uniform(0.5, 25), self.rng.uniform(0.5, 25))
+        return pos, size
+
+    def assertMeans(self, data):
+        integral_image = IntegralImage(data)
+        integral_image.build()
+        for _ in range(50):
+            pos, size = self.randomRect()
+            expected = extractMeans(data, [(pos, size, 0, False)])[0]
+            self.assertTrue(np.allclose(integral_image.rectMeans([(pos, size)])[0], expected, equal_nan = True))
+
+    def test_dtypes(self):
+        self.assertMeans(self.rng.integers(0, 2**16, (20, 40, 30)).astype(np.uint16))
+        self.assertMeans(self.rng.integers(-2**15, 2**15, (20, 40, 30)).astype(np.int16))
+        self.assertMeans(self.rng.random((20, 40, 30)) * 1000)
+
+    def test_sums_dtype(self):
+        # uint16 frames of this size can not overflow uint32 sums
+        integral_image = IntegralImage(np.zeros((2, 40, 30), dtype = np.uint16))
+        integral_image.build()
+        self.assertEqual(integral_image.sums.dtype, np.uint32)
+        self.assertEqual(integral_image.sums.shape, (2, 41, 31))
+
+    def test_memmap(self):
+        memmap_size = ii_params['memmap_size']
+        block_size = ii_params['block_size']
+        ii_params['memmap_size'] = 0
+        ii_params['block_size'] = 3
+        try:
+            data = self.rng.integers(0, 2**16, (20, 40, 30)).astype(np.uint16)
+            integral_image = IntegralImage(data)
+            integral_image.build()
+            self.assertIsInstance(integral_image.sums, np.memmap)
+            self.assertMeans(data)
+        finally:
+            ii_params['memmap_size'] = memmap_size
+            ii_params['block_size'] = block_size
+
+    def test_background_subtraction(self):
+        data = self.rng.random((20, 40, 30)) * 1000
+        integral_image = IntegralImage(data)
+        integral_image.build()
+        y = self.rng.random(20)
+        roi_params = ((12, 9), (8, 6), 0)
+        expected = background.roiBackgroundSubtraction(y, roi_params, data, False, ((3, 4), (5, 7), 0))
+        output = background.roiBackgroundSubtraction(y, roi_params, data, False, ((3, 4), (5, 7), 0), integral_image = integral_image)
+        self.assertTrue(np.allclose(output['y'], expected['y']))
+        expected = background.perisomaticBackgroundSubtraction(y, roi_params, data, False, 4)
+        output = background.perisomaticBackgroundSubtraction(y, roi_params, data, False, 4, integral_image = integral_image)
+        self.assertTrue(np.allclose(output['background mean'], expected['background mean']))
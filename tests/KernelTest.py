@@ -0,0 +1,49 @@
+import unittest
+import subprocess
+import sys
+import numpy as np
+
+from kernels import baseline, events
+from kernels.benchmark import syntheticTrace, benchmarkKernels, benchmark_kernels
+from util import functions
+from util.conf import sd_params
+
+class KernelTest(unittest.TestCase):
+
+    def test_without_qt(self):
+        # the kernels and the benchmark can be used without Qt
+        code = 'import sys, kernels.benchmark, kernels.background, kernels.correlation; print("PyQt5" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True, check = True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+    def test_complete_markers(self):
+        self.assertEqual(baseline.completeMarkers([], 2, 101), [33, 67, 100])
+        self.assertEqual(baseline.completeMarkers([50], 1, 101), [50, 75])
+        self.assertEqual(baseline.completeMarkers([10, 20], 1, 101), [10, 20])
+        # markers are not placed within 4 frames of another marker
+        self.assertEqual(baseline.validMarkerPosition([48], 50, 101), 74)
+        self.assertEqual(baseline.validMarkerPosition([0, 2], 1, 4), -1)
+
+    def test_polynomial_fitting(self):
+        y, source = syntheticTrace(101, 250.0)
+        marker = [50]
+        output = baseline.polynomialFitting(y, source, 0, 2, True, marker)
+        self.assertEqual(marker, [50])
+        x = source.frameRange()
+        completed = np.array([50, 75, 100])
+        expected = functions.fitting(x, completed, y[completed], 0, 2)
+        self.assertTrue(np.allclose(output['baseline'], expected))
+        self.assertTrue(np.allclose(output['y'], y - expected))
+
+    def test_spike_detection(self):
+        y = np.zeros(1000)
+        y[[100, 400, 700]] = 5
+        output = events.spikeDetection(y, 250.0, 0, **sd_params)
+        self.assertTrue(np.array_equal(output['time'], [100, 400, 700]))
+        self.assertTrue(np.array_equal(output['amplitude'], [5, 5, 5]))
+        self.assertEqual(output['train'].sum(), 3)
+
+    def test_benchmark(self):
+        results = benchmarkKernels(length = 2000, repeat = 1)
+        self.assertEqual([(name, method) for name, method, _ in results], [(name, method) for name, method, _, _ in benchmark_kernels])
+        self.assertTrue(all(seconds >= 0 for _, _, seconds in results))
@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+
+from util import functions
+
+def convolveMovingAverage(y, window, w = None):
+    # the previous implementation with a direct convolution of the padded trace
+    if window%2 == 0:
+        window+=1
+    s = np.pad(y, int(window/2), mode='reflect')
+    w = np.hanning(window).astype(functions.floatType(y)) if w is None else w(window)
+    return np.convolve(w / np.sum(w), s, mode='valid')
+
+class MovingAverageTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = 100 + np.cumsum(rng.normal(0, 1, 20000))
+        # rounding errors relative to the magnitude of the trace
+        self.atol = 1e-12 * np.abs(self.y).max()
+
+    def test_hanning(self):
+        # the direct and the FFT convolution
+        for window in [1, 2, 11, 100, functions.fft_window, 999]:
+            expected = convolveMovingAverage(self.y, window)
+            z = functions.movingAverage(self.y, window)
+            self.assertEqual(z.shape, self.y.shape)
+            self.assertTrue(np.allclose(z, expected, rtol = 0, atol = self.atol), window)
+            z32 = functions.movingAverage(self.y.astype(np.float32), window)
+            self.assertEqual(z32.dtype, np.float32)
+            self.assertTrue(np.allclose(z32, expected, rtol = 0, atol = 1e7 * self.atol), window)
+        self.assertIs(functions.movingAverage(self.y, 0), self.y)
+
+    def test_boxcar(self):
+        for window in [1, 10, 101, 1000]:
+            expected = convolveMovingAverage(self.y, window, np.ones)
+            z = functions.movingAverage(self.y, window, 'boxcar')
+            self.assertTrue(np.allclose(z, expected, rtol = 0, atol = self.atol), window)
+            self.assertEqual(functions.movingAverage(self.y.astype(np.float32), window, 'boxcar').dtype, np.float32)
+        # short traces are reflected
+        self.assertTrue(np.allclose(functions.movingAverage(self.y[:5], 5, 'boxcar'), convolveMovingAverage(self.y[:5], 5, np.ones)))
+
+    def test_window(self):
+        w = functions.smoothingWindow(11)
+        self.assertIs(functions.smoothingWindow(11), w)
+        self.assertFalse(w.flags.writeable)
+        self.assertAlmostEqual(w.sum(), 1)
+        self.assertEqual(functions.smoothingWindow(11, 'hanning', np.float32).dtype, np.float32)
+        self.assertRaises(ValueError, functions.smoothingWindow, 11, 'triangle')
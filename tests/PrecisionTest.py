@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from scipy.signal import savgol_filter, correlate
+
+from model.extraction import extractMeans
+from util.functions import fitting, getGradient, topHat, als, movingAverage, butter_lowpass_filter, floatType
+
+class PrecisionTest(unittest.TestCase):
+    '''
+    Compares the float32 path of the trace pipeline with the float64 path. The differences are bounded relative
+        to the range of the float64 result.
+    '''
+
+    # maximum difference relative to the range of the float64 result
+    tolerance = 1e-4
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        x = np.arange(n)
+        # fluorescence-like trace: bleaching baseline, events and noise
+        trace = 1000 + 200 * np.exp(-x / 800) + 50 * (np.sin(x / 30) > 0.95) + rng.normal(0, 5, n)
+        self.y64 = trace
+        self.y32 = trace.astype(np.float32)
+        # uint16 image sequence around the trace
+        self.data = (trace[:, np.newaxis, np.newaxis] + rng.normal(0, 20, (n, 12, 10))).astype(np.uint16)
+
+    def assertBounded(self, result32, result64):
+        self.assertEqual(result32.dtype, np.float32)
+        self.assertEqual(result64.dtype, np.float64)
+        scale = max(np.ptp(result64), np.abs(result64).max() * 1e-3)
+        self.assertLess(np.abs(result32 - result64).max() / scale, self.tolerance)
+
+    def test_float_type(self):
+        self.assertEqual(floatType(self.y32), np.float32)
+        self.assertEqual(floatType(self.y64), np.float64)
+        self.assertEqual(floatType(self.data), np.float64)
+
+    def test_extraction(self):
+        rois = [((1.5, 2.), (6., 5.), 20., True), ((0, 0), (8, 7), 0, False)]
+        means32 = extractMeans(self.data, rois, dtype = np.float32)
+        means64 = extractMeans(self.data, rois)
+        for mean32, mean64 in zip(means32, means64):
+            self.assertBounded(mean32, mean64)
+
+    def test_baseline(self):
+        x = np.arange(len(self.y64))
+        for function in [
+                lambda y: fitting(x, x, y, 0, 3),
+                lambda y: als(y, 3, 100),
+                lambda y: topHat(y, 0.1),
+                lambda y: movingAverage(y, 101)]:
+            baseline32, baseline64 = function(self.y32), function(self.y64)
+            self.assertBounded(baseline32, baseline64)
+            self.assertBounded(getGradient(self.y32, baseline32), getGradient(self.y64, baseline64))
+
+    def test_smoothing(self):
+        self.assertBounded(movingAverage(self.y32, 11), movingAverage(self.y64, 11))
+        self.assertBounded(butter_lowpass_filter(self.y32, 250., 20, 4), butter_lowpass_filter(self.y64, 250., 20, 4))
+        self.assertBounded(savgol_filter(self.y32, 11, 3), savgol_filter(self.y64, 11, 3))
+
+    def test_correlation(self):
+        y32 = self.y32 - self.y32.mean()
+        y64 = self.y64 - self.y64.mean()
+        norm32 = correlate(np.ones(len(y32), dtype = np.float32), np.ones(len(y32), dtype = np.float32), mode = 'same')
+        norm64 = correlate(np.ones(len(y64)), np.ones(len(y64)), mode = 'same')
+        cc32 = correlate(y32, y32[::-1], mode = 'same') / (np.std(y32) ** 2 * norm32)
+        cc64 = correlate(y64, y64[::-1], mode = 'same') / (np.std(y64) ** 2 * norm64)
+        self.assertBounded(cc32, cc64)
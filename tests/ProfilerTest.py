@@ -0,0 +1,103 @@
+import unittest
+import tempfile
+import json
+import os
+import numpy as np
+
+from model.PipelineRefresh import PipelineRefresh, StepRefresh
+from model.Object import Object
+from util.profiling import Profiler
+from util.conf import pf_params
+import util.profiling
+import model.PipelineRefresh
+
+class Step():
+    threadsafe = True
+    produces = ('y',)
+    output = {}
+
+    def __init__(self, name):
+        self.name = name
+
+    def calculate(self, method, input_dict):
+        return method(**input_dict)
+
+class Method():
+
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+
+    def __call__(self, **kwargs):
+        return self.function(**kwargs)
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.params = dict(pf_params)
+        pf_params['record'] = True
+        self.profiler = Profiler()
+
+    def tearDown(self):
+        self.profiler.setActive(False)
+        pf_params.update(self.params)
+
+    def test_inactive(self):
+        self.profiler.setActive(False)
+        with self.profiler.measure('update', 'update'):
+            pass
+        self.assertEqual(self.profiler.getRecords(), [])
+
+    def test_measure(self):
+        with self.profiler.measure('update', 'update', 'ROI', 'Smoothing', 'Moving Average'):
+            with self.profiler.measure('calculate', 'calculate', 'ROI', 'Smoothing', 'Moving Average'):
+                data = np.ones(2**18)
+                del data
+        inner, outer = self.profiler.getRecords()
+        self.assertEqual((inner.name, inner.object_name, inner.feature, inner.method), ('calculate', 'ROI', 'Smoothing', 'Moving Average'))
+        # the peak of the outer call includes the peak of the inner call
+        self.assertGreaterEqual(inner.peak, 2**21)
+        self.assertGreaterEqual(outer.peak, inner.peak)
+        self.assertGreaterEqual(outer.wall, inner.wall)
+        self.assertLessEqual(outer.start, inner.start)
+        summary = self.profiler.summary()
+        self.assertEqual([(group['category'], group['calls']) for group in summary], [('update', 1), ('calculate', 1)])
+
+    def test_without_allocations(self):
+        pf_params['record_allocations'] = False
+        with self.profiler.measure('refreshPlots', 'plot'):
+            pass
+        self.assertIsNone(self.profiler.getRecords()[0].peak)
+        self.assertIsNone(self.profiler.summary()[0]['peak'])
+
+    def test_chrome_trace(self):
+        with self.profiler.measure('update', 'update', None, 'Baseline', 'Top Hat'):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.json')
+            self.profiler.exportChromeTrace(path)
+            with open(path) as file:
+                trace = json.load(file)
+        event, = trace['traceEvents']
+        self.assertEqual((event['name'], event['cat'], event['ph']), ('Baseline update', 'update', 'X'))
+        self.assertEqual(event['args']['method'], 'Top Hat')
+        self.assertNotIn('object_name', event['args'])
+        self.assertGreaterEqual(event['dur'], 0)
+
+    def test_refresh(self):
+        # the calculation of every step of a refresh is recorded
+        profiler = util.profiling.profiler
+        model.PipelineRefresh.profiler = self.profiler
+        try:
+            object_ = Object(name = 'ROI', source = None)
+            add = Method('Add', lambda y, value: {'y': y + value})
+            steps = [StepRefresh(0, Step('Baseline'), True, True, add, {'value': 1}, {'y': None}),
+                StepRefresh(1, Step('Smoothing'), True, True, add, {'value': 2}, {'y': None})]
+            refresh = PipelineRefresh(object_index = 0, object_ = object_, objects = [object_], spike_detection = None,
+                max_raw_index = 0, max_processing_index = 1, stop_after = 1, calculate_indices = [0, 1],
+                start_with_cell = False, edit_roi = False, invert = False, processed = np.zeros(3), steps = steps)
+            refresh.calculate()
+        finally:
+            model.PipelineRefresh.profiler = profiler
+        self.assertEqual([(record.object_name, record.feature, record.method) for record in self.profiler.getRecords()],
+            [('ROI', 'Baseline', 'Add'), ('ROI', 'Smoothing', 'Add')])
@@ -0,0 +1,136 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+from PyQt5 import QtCore
+
+from model.PipelineRefresh import PipelineRefresh, StepRefresh, calculateInProcess
+from model.Object import Object
+from model.Pipeline import Pipeline
+from model.Source import Source
+from model.batch import getKernel
+from kernels import baseline, smoothing
+from threads.RefreshScheduler import RefreshScheduler
+
+class Step():
+    '''
+    a step with the attributes of a feature that a refresh uses.
+    '''
+    threadsafe = True
+
+    def __init__(self, produces = ('y',), output = None, name = None):
+        self.name = name
+        self.produces = produces
+        self.output = output if output is not None else {}
+
+    def calculate(self, method, input_dict):
+        return method(**input_dict)
+
+def add(y, value):
+    return {'y': y + value}
+
+def scale(y, factor):
+    return {'y': y * factor}
+
+class RefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.object_ = Object(name = 'ROI', source = None, invert = True)
+        self.y = np.arange(5.0)
+
+    def createRefresh(self, steps):
+        return PipelineRefresh(object_index = 0, object_ = self.object_, objects = [self.object_], spike_detection = None,
+            max_raw_index = 0, max_processing_index = 1, stop_after = len(steps) - 1,
+            calculate_indices = [step.index for step in steps if step.calculate], start_with_cell = False, edit_roi = False,
+            invert = self.object_.invert, processed = self.y, steps = steps)
+
+    def test_calculate(self):
+        kept = Step(output = {'y': np.full(5, 10.0)})
+        steps = [
+            StepRefresh(0, Step(), True, True, add, {'value': 1}, {'y': None}),
+            StepRefresh(1, kept, True, False),
+            StepRefresh(2, Step(), True, True, scale, {'factor': 2}, {'y': None}),
+        ]
+        refresh = self.createRefresh(steps)
+        self.assertTrue(refresh.calculate())
+        # raw is set after the raw steps, the output of the step that is not calculated is used and inverted
+        self.assertTrue(np.array_equal(refresh.raw, self.y + 1))
+        self.assertTrue(np.array_equal(refresh.processed, np.full(5, -20.0)))
+        self.assertTrue(np.array_equal(steps[2].input['y'], np.full(5, -10.0)))
+        self.assertIsNone(steps[1].output)
+        self.assertIs(refresh.getOutput(kept), kept.output)
+        # nothing is set on the object or the features before the refresh is published
+        self.assertIsNone(self.object_.processed)
+        self.assertEqual(steps[0].feature.output, {})
+
+    def test_cancelled(self):
+        refresh = self.createRefresh([StepRefresh(0, Step(), True, True, add, {'value': 1}, {'y': None})])
+        refresh.cancelled = True
+        self.assertFalse(refresh.calculate())
+        self.assertIsNone(refresh.raw)
+
+    def test_thread_safe(self):
+        # the thread-safety that was stored when the refresh was prepared is used, not the feature
+        steps = [StepRefresh(0, Step(), True, False, threadsafe = False), StepRefresh(1, Step(), True, True, add, {'value': 1}, {'y': None})]
+        self.assertTrue(self.createRefresh(steps).isThreadSafe())
+        steps[0].calculate = True
+        self.assertFalse(self.createRefresh(steps).isThreadSafe())
+
+    def test_merge(self):
+        application = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+        scheduler = RefreshScheduler(None)
+        first, second = Step(), Step()
+        pipeline = Pipeline()
+        pipeline.getCalculatingPipeline = lambda: [first, second]
+        object_ = Object(name = 'ROI', source = None, pipeline = pipeline)
+        a = {'start_with_feature': second}
+        b = {'start_with_feature': first}
+        self.assertEqual(scheduler.merge(object_, a, a), a)
+        self.assertEqual(scheduler.merge(object_, a, b), {'start_with_feature': 0})
+        self.assertEqual(scheduler.merge(object_, a, {'start_with_feature': first, 'processing_changed': True}), {})
+        # a running refresh that is cancelled is merged into the pending refresh
+        refresh = self.createRefresh([])
+        scheduler.running[id(object_)] = (refresh, False, a)
+        scheduler.cancel(object_)
+        scheduler.add(object_, True, b)
+        self.assertTrue(refresh.cancelled)
+        self.assertEqual(scheduler.pending[id(object_)], (object_, True, {'start_with_feature': 0}))
+        self.assertEqual(scheduler.running, {})
+        # a failed refresh is reported with the name of the object instead of being published
+        errors = []
+        scheduler.failed.disconnect()
+        scheduler.failed.connect(lambda name, error: errors.append((name, error)))
+        refresh.object_ = object_
+        scheduler.running[id(object_)] = (refresh, False, a)
+        scheduler.finished({'result': 'Traceback', 'callback_kwargs': {'key': id(object_), 'refresh': refresh}})
+        self.assertEqual(errors, [('ROI', 'Traceback')])
+        self.assertEqual(scheduler.running, {})
+
+    def test_process(self):
+        source = Source(filetype = 'abf', original_frequency = 100.0, start = 0, end = 5, offset = 0.0, _data = self.y)
+        features = [Step(name = 'Baseline'), Step(produces = ('y', 'noise_std'), name = 'Smoothing')]
+        steps = [
+            StepRefresh(0, features[0], True, True, SimpleNamespace(name = 'Moving Average'), {'window': 3}, {'y': None, 'object_source': source}),
+            StepRefresh(1, features[1], True, True, SimpleNamespace(name = 'Savitzky Golay'), {'polyorder': 1, 'window': 3}, {'y': None, 'object_source_frequency': 100.0})
+        ]
+        refresh = self.createRefresh(steps)
+        copy = refresh.forProcess(getKernel)
+        # the data of the source is not sent to the process
+        self.assertIsNone(copy.steps[0].input['object_source']._data)
+        self.assertIsNone(copy.object_)
+        with ProcessPoolExecutor(max_workers = 1) as executor:
+            result = executor.submit(calculateInProcess, copy).result()
+        refresh.setProcessResult(result)
+        y = baseline.movingAverage(self.y, source, 3)['y']
+        expected = smoothing.savitzkyGolay(y, 100.0, 1, 3)
+        self.assertTrue(np.allclose(refresh.processed, expected['y']))
+        self.assertTrue(np.allclose(refresh.raw, y))
+        self.assertEqual(steps[1].output['noise_std'], expected['noise_std'])
+        self.assertIs(steps[0].input['object_source'], source)
+        self.assertFalse(steps[1].output['y'].flags.writeable)
+        # errors of the kernels are returned
+        copy.steps[1].parameters = {'polyorder': 1, 'window': 'three'}
+        with ProcessPoolExecutor(max_workers = 1) as executor:
+            result = executor.submit(calculateInProcess, copy).result()
+        self.assertIsInstance(result, str)
+        self.assertIn('Traceback', result)
@@ -0,0 +1,120 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+
+from features.Feature import Feature
+from features.Baseline import Baseline
+from kernels.benchmark import syntheticTrace
+from model.ResultCache import ResultCache, fingerprint, array_digests
+from model.Source import Source
+from util.functions import readOnly
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+class ALS(Feature):
+    '''
+    the asymmetric least squares method of Baseline, without the widgets of Baseline.
+    '''
+
+    als_failed = QtCore.pyqtSignal()
+    alsWrapper = Baseline.alsWrapper
+
+    def __init__(self):
+        Feature.__init__(self, 'ALS', None)
+        self.input = {'y': None, 'object_source': None}
+        self.output = {'baseline': None, 'y': None}
+        self.addMethod('Asymmetric Least Squares', {'iterations': 0, 'smooth': 100, 'intercept': 0}, self.alsWrapper)
+        self.initMethodUI()
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResultCache(max_size = 3 * 800)
+        self.y = np.random.rand(100)
+
+    def test_fingerprint(self):
+        input_dict = {'y': self.y, 'window': 3, 'interval': (200, 200), 'data': [{'train': None, 'freq': 250.0}]}
+        self.assertEqual(fingerprint(input_dict), fingerprint({**input_dict, 'y': self.y.copy()}))
+        y = self.y.copy()
+        y[50] += 1e-9
+        self.assertNotEqual(fingerprint(input_dict), fingerprint({**input_dict, 'y': y}))
+        self.assertNotEqual(fingerprint(input_dict), fingerprint({**input_dict, 'y': self.y.astype(np.float32)}))
+        self.assertNotEqual(fingerprint(input_dict), fingerprint({**input_dict, 'window': 3.0}))
+        self.assertNotEqual(fingerprint(input_dict), fingerprint({**input_dict, 'interval': [200, 200]}))
+
+    def test_read_only(self):
+        # the digests of frozen arrays are kept while the arrays exist
+        y = self.y.copy()
+        y.flags.writeable = False
+        key = fingerprint(y)
+        self.assertIn(id(y), array_digests)
+        self.assertEqual(fingerprint(y), key)
+        self.assertEqual(fingerprint(self.y), key)
+        self.assertNotIn(id(self.y), array_digests)
+        y_id = id(y)
+        del y
+        self.assertNotIn(y_id, array_digests)
+        # a read-only view of a writable array changes with the array
+        base = self.y.copy()
+        view = readOnly(base)
+        key = fingerprint(view)
+        self.assertNotIn(id(view), array_digests)
+        base[0] += 1
+        self.assertNotEqual(fingerprint(view), key)
+        # the arrays that the methods create are frozen
+        feature = ALS()
+        output = feature.readOnlyOutput({'y': self.y.copy(), 'view': view})
+        self.assertFalse(output['y'].flags.writeable)
+        self.assertIsNone(output['y'].base)
+        self.assertTrue(base.flags.writeable)
+
+    def test_objects(self):
+        # sources are identified by the attributes that the kernels use
+        source = Source(filetype = 'abf', start = 0, end = 100)
+        key = fingerprint({'object_source': source})
+        self.assertEqual(key, fingerprint({'object_source': Source(filetype = 'abf', start = 0, end = 100, name = 'other')}))
+        source.end = 50
+        self.assertNotEqual(key, fingerprint({'object_source': source}))
+        self.assertRaises(TypeError, fingerprint, {'object': object()})
+
+    def test_failed(self):
+        # failed calculations are not stored, such that they are reported again
+        feature = ALS()
+        failures = []
+        feature.als_failed.connect(lambda: failures.append(True))
+        y, source = syntheticTrace(1000, 250.0)
+        method = feature.getMethod()
+        for _ in range(2):
+            output = feature.calculate(method, {'y': readOnly(y), 'object_source': source, **method.parameters})
+            self.assertIsNone(output['baseline'])
+        self.assertEqual(len(failures), 2)
+
+    def test_markers(self):
+        # the markers are completed before the key of the polynomial fitting is calculated
+        source = Source(filetype = 'abf', start = 0, end = 101)
+        feature = SimpleNamespace(input = {'object_source': source})
+        parameters = {'polyorder': 2, 'intercept': 0, 'use_marker': True, 'marker': [50]}
+        Baseline.prepareParameters(feature, SimpleNamespace(name = 'Polynomial Fitting', parameters = parameters))
+        self.assertEqual(parameters['marker'], [50, 75, 100])
+
+    def test_store_load(self):
+        key = self.cache.key('Smoothing', 'Moving Average', {'y': self.y, 'window': 3})
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, {'y': self.y, 'noise_std': 0.5})
+        output = self.cache.load(key)
+        self.assertIs(output['y'], self.y)
+        # the stored output is not changed when the loaded output is changed
+        output['y'] = None
+        self.assertIs(self.cache.load(key)['y'], self.y)
+        self.assertNotEqual(key, self.cache.key('Smoothing', 'Butterworth', {'y': self.y, 'window': 3}))
+
+    def test_max_size(self):
+        keys = [self.cache.key('Smoothing', 'Moving Average', {'y': self.y, 'window': window}) for window in range(4)]
+        for key in keys:
+            self.cache.store(key, {'y': self.y})
+        self.assertLessEqual(self.cache.size, self.cache.max_size)
+        self.assertIsNone(self.cache.load(keys[0]))
+        self.assertIsNotNone(self.cache.load(keys[3]))
+        self.cache.store(keys[0], {'y': np.zeros(1000)})
+        self.assertIsNone(self.cache.load(keys[0]))
@@ -0,0 +1,67 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+
+from model.SourceCache import SourceCache
+
+class SourceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SourceCache(directory = os.path.join(self.directory.name, 'cache'), max_size = 2**20)
+        self.filepath = os.path.join(self.directory.name, 'recording.tif')
+        with open(self.filepath, 'wb') as f:
+            f.write(b'header' * 100)
+        self.data = np.random.rand(20, 8, 6)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_load(self):
+        key = self.cache.key([self.filepath])
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, {'frequency': 100.0}, self.data)
+        data, metadata = self.cache.load(key)
+        self.assertIsInstance(data, np.memmap)
+        self.assertTrue(np.array_equal(data, self.data))
+        self.assertEqual(metadata['frequency'], 100.0)
+
+    def test_metadata_only(self):
+        key = self.cache.key([self.filepath])
+        self.cache.store(key, {'frequency': 100.0})
+        data, metadata = self.cache.load(key)
+        self.assertIsNone(data)
+        self.assertEqual(metadata['frequency'], 100.0)
+
+    def test_too_large(self):
+        # data that is larger than the cache is not stored, the metadata is
+        key = self.cache.key([self.filepath])
+        self.cache.store(key, {'frequency': 100.0}, np.zeros(2**18))
+        data, metadata = self.cache.load(key)
+        self.assertIsNone(data)
+        self.assertEqual(metadata['frequency'], 100.0)
+        self.assertEqual(sorted(os.listdir(self.cache.directory)), [key + '.json'])
+
+    def test_key(self):
+        key = self.cache.key([self.filepath])
+        self.assertEqual(key, self.cache.key([self.filepath]))
+        self.assertNotEqual(key, self.cache.key([self.filepath], channel = 1))
+        stat = os.stat(self.filepath)
+        os.utime(self.filepath, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertNotEqual(key, self.cache.key([self.filepath]))
+
+    def test_eviction(self):
+        # each entry is about 400 kB, the cache can hold 2 of them
+        data = np.zeros(50000)
+        keys = ['a', 'b', 'c']
+        for index, key in enumerate(keys[:2]):
+            self.cache.store(key, {}, data)
+            for path in self.cache.paths(key):
+                os.utime(path, (index, index))
+        # use the oldest entry, such that the other one is removed when the third is stored
+        self.cache.load('a')
+        self.cache.store('c', {}, data)
+        self.assertIsNotNone(self.cache.load('a'))
+        self.assertIsNone(self.cache.load('b'))
+        self.assertIsNotNone(self.cache.load('c'))
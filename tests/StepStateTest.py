@@ -0,0 +1,178 @@
+import unittest
+import threading
+import numpy as np
+from PyQt5 import QtWidgets
+
+from features.Feature import Feature
+from model.StepState import StepState, MethodState
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+class Scale(Feature):
+    '''
+    a feature with two methods and a checkbox, without a data manager.
+    '''
+
+    def __init__(self):
+        Feature.__init__(self, 'Scale', None)
+        self.input = {'y': None}
+        self.output = {'y': None}
+        self.addMethod('Identity', {'negate': False}, self.identity)
+        self.addMethod('Factor', {'factor': 2}, self.factor)
+        self.initMethodUI()
+        self.methods['Identity'].initCheckbox('negate', updateFunc=lambda: None)
+        self.updateParametersUI()
+
+    def identity(self, y, negate):
+        return {'y': -y if negate else y}
+
+    def factor(self, y, factor):
+        return {'y': y * factor}
+
+    def inputConfiguration(self):
+        self.output['configured'] = self.input['y'] is not None
+
+class Offset(Feature):
+    '''
+    a feature that is not threadsafe and whose method reads the input and the parameters of the feature.
+    '''
+
+    threadsafe = False
+
+    def __init__(self):
+        Feature.__init__(self, 'Offset', None)
+        self.input = {'y': None}
+        self.output = {'y': None}
+        self.addMethod('Offset', {'offset': 1}, self.offset)
+        self.initMethodUI()
+
+    def offset(self, y, offset):
+        return {'y': self.input['y'] + self.methods['Offset'].parameters['offset']}
+
+class StepStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.feature = Scale()
+        self.a = self.feature.createState()
+        self.b = self.feature.createState()
+        self.feature.display(self.a)
+
+    def test_create(self):
+        # the states have the defaults and their own parameters
+        self.assertIsInstance(self.a, StepState)
+        self.assertEqual(self.a.method, 'Identity')
+        self.assertEqual(self.a.parameters, {'Identity': {'negate': False}, 'Factor': {'factor': 2}})
+        self.assertIsNot(self.a.parameters['Factor'], self.b.parameters['Factor'])
+        self.assertEqual(self.a.input, {'y': None})
+        self.assertEqual(self.a.name, 'Scale')
+        # copies keep the method and the parameters, but not the data
+        self.b.method = 'Factor'
+        self.b.parameters['Factor']['factor'] = 3
+        self.b.output['y'] = np.ones(2)
+        c = self.b.copy()
+        self.assertEqual(c.method, 'Factor')
+        self.assertEqual(c.parameters['Factor'], {'factor': 3})
+        self.assertIsNone(c.output['y'])
+
+    def test_bound(self):
+        # the feature works with the state it is bound to
+        self.b.method = 'Factor'
+        self.assertEqual(self.feature.getMethod().name, 'Identity')
+        with self.feature.boundTo(self.b):
+            self.assertEqual(self.feature.getMethod().name, 'Factor')
+            self.feature.methods['Factor'].parameters['factor'] = 5
+            self.feature.input = {'y': np.arange(3.0)}
+        self.assertIs(self.feature.state, self.a)
+        self.assertEqual(self.b.parameters['Factor'], {'factor': 5})
+        self.assertEqual(self.a.parameters['Factor'], {'factor': 2})
+        self.assertIsNone(self.a.input['y'])
+
+    def test_proxy(self):
+        # methods of the feature are called bound to the state
+        self.b.input['y'] = np.arange(3.0)
+        self.b.inputConfiguration()
+        self.assertTrue(self.b.output['configured'])
+        self.assertNotIn('configured', self.a.output)
+        self.assertIs(self.feature.state, self.a)
+
+    def test_method_state(self):
+        method = self.b.getMethod()
+        self.assertIsInstance(method, MethodState)
+        self.assertEqual(method, self.b.methods['Identity'])
+        self.assertNotEqual(method, self.a.getMethod())
+        output = self.b.calculate(method, {'y': np.arange(3.0), **method.parameters})
+        self.assertTrue(np.array_equal(output['y'], np.arange(3.0)))
+        self.assertFalse(output['y'].flags.writeable)
+
+    def test_calculate_bound(self):
+        # features that are not threadsafe calculate a state that is not displayed with the state
+        feature = Offset()
+        a, b = feature.createState(), feature.createState()
+        feature.display(a)
+        a.input['y'] = np.zeros(2)
+        b.input['y'] = np.ones(2)
+        b.parameters['Offset']['offset'] = 5
+        method = b.getMethod()
+        output = b.calculate(method, {**b.input, **method.parameters})
+        self.assertTrue(np.array_equal(output['y'], [6, 6]))
+        self.assertEqual(a.parameters['Offset'], {'offset': 1})
+        self.assertIs(feature.state, a)
+
+    def test_calculate_thread(self):
+        # threadsafe states are calculated on another thread without binding the feature, which shows another state
+        states = []
+        def identity(y, negate):
+            states.append(self.feature.state)
+            return {'y': y}
+        self.feature.methods['Identity'].function = identity
+        method = self.b.getMethod()
+        # the thread-safety is read on the main thread, like when a refresh is prepared
+        threadsafe = self.b.threadsafe
+        bind = self.feature.bind
+        def checkedBind(state):
+            states.append(self.feature.state)
+            self.assertIs(threading.current_thread(), threading.main_thread())
+            bind(state)
+        self.feature.bind = checkedBind
+        outputs = []
+        def calculate():
+            # different inputs, such that the outputs are not taken from the result cache
+            for i in range(20):
+                outputs.append(self.b.calculate(method, {'y': np.full(3, i), **method.parameters}, threadsafe = threadsafe))
+                outputs.append(self.b.calculate(method, {'y': np.full(3, i + 0.5), **method.parameters}))
+        thread = threading.Thread(target = calculate)
+        thread.start()
+        while thread.is_alive():
+            self.assertIs(self.feature.state, self.a)
+        thread.join()
+        self.assertEqual(len(outputs), 40)
+        self.assertEqual(len(states), 40)
+        self.assertTrue(all(state is self.a for state in states))
+        self.assertIs(self.feature.state, self.a)
+
+    def test_display(self):
+        checkbox = self.feature.methods['Identity'].getParametersGUI('negate')
+        # parameters of a state that is not displayed do not change the GUI
+        self.b.methods['Identity'].setParameters({'negate': True}, prevent_update = True)
+        self.assertTrue(self.b.parameters['Identity']['negate'])
+        self.assertFalse(checkbox.isChecked())
+        # the GUI shows the displayed state
+        self.b.method = 'Factor'
+        self.feature.display(self.b)
+        self.assertTrue(checkbox.isChecked())
+        self.assertEqual(self.feature.method_combo.currentText(), 'Factor')
+        self.feature.display(self.a)
+        self.assertFalse(checkbox.isChecked())
+        self.assertEqual(self.feature.method_combo.currentText(), 'Identity')
+        # changing the method in the GUI changes the displayed state
+        self.feature.method_combo.setCurrentText('Factor')
+        self.assertEqual(self.a.method, 'Factor')
+        self.assertEqual(self.b.method, 'Factor')
+
+    def test_pipeline_step(self):
+        # a feature that is not bound to an object is its own step
+        unbound = Scale()
+        self.assertIs(unbound.pipelineStep(), unbound)
+        self.assertIs(self.feature.pipelineStep(), self.a)
+        self.assertIs(self.a.feature, self.feature)
+        self.assertIs(unbound.feature, unbound)
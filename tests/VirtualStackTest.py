@@ -0,0 +1,54 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import tifffile
+
+from model.VirtualStack import VirtualStack, readTIFHeader
+
+class VirtualStackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        pages = (np.random.rand(60, 12, 16) * 1000).astype(np.uint16)
+        self.filepaths = []
+        for index, (start, stop) in enumerate([(0, 25), (25, 26), (26, 60)]):
+            filepath = os.path.join(self.directory.name, 'recording_{:05d}.tif'.format(index + 1))
+            # mix uncompressed (memory-mapped) and compressed (decoded) files
+            tifffile.imwrite(filepath, pages[start:stop], compression = 'zlib' if index % 2 else None)
+            self.filepaths.append(filepath)
+        headers = [readTIFHeader(filepath) for filepath in self.filepaths]
+        self.data = np.swapaxes(pages, 1, 2)
+        self.stack = VirtualStack(self.filepaths, [h[0] for h in headers], headers[0][1][::-1], headers[0][2])
+
+    def tearDown(self):
+        for file_ in self.stack._files['open'].values():
+            if isinstance(file_, tifffile.TiffFile):
+                file_.close()
+        self.stack._files['open'].clear()
+        self.directory.cleanup()
+
+    def test_shape(self):
+        self.assertEqual(self.stack.shape, self.data.shape)
+        self.assertEqual(len(self.stack[10:50]), 40)
+
+    def test_indexing(self):
+        for key in [0, 25, -1, slice(20, 30), slice(None, None, 7), (slice(24, 27), slice(2, 5)), (30, slice(None), 3), [3, 59, 25]]:
+            self.assertTrue(np.array_equal(np.asarray(self.stack[key]), self.data[key]))
+
+    def test_view(self):
+        view = self.stack[5:55]
+        self.assertIs(view, self.stack[5:55])
+        self.assertTrue(np.array_equal(view[18:22], self.data[5:55][18:22]))
+        self.assertEqual(view.min(), self.data[5:55].min())
+        self.assertEqual(view.max(), self.data[5:55].max())
+        # the cached views are bounded
+        for start in range(10):
+            for length in range(1, 11):
+                self.stack[start:start + length]
+        self.assertEqual(len(self.stack._files['views']), VirtualStack.MAX_VIEWS)
+        self.assertNotIn((5, 54, 50), self.stack._files['views'])
+
+    def test_lazy(self):
+        self.stack[3]
+        self.assertEqual(list(self.stack._files['open'].keys()), [0])
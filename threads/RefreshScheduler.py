@@ -0,0 +1,189 @@
+import traceback
+from PyQt5 import QtCore, QtWidgets
+
+from threads.Worker import Worker
+from util.conf import ar_params
+
+class RefreshScheduler(QtCore.QObject):
+    '''
+    Refreshes the pipelines of objects after parameter changes on a background thread, see Feature.update.
+    The changes are collected for ar_params['debounce'] ms, and the changes of an object are merged into one
+        refresh. A new change of an object supersedes the refresh of the object that is being calculated: it
+        is cancelled before its next step, it is not published and its changes are merged into the next
+        refresh. Thus, only the latest refresh of an object is published, which sets the outputs and refreshes
+        the plots on the main thread.
+    Refreshes that calculate features that are not threadsafe are calculated on the main thread.
+    '''
+
+    # emitted with the name of the object and the traceback if a refresh could not be calculated
+    failed = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, data_manager):
+        QtCore.QObject.__init__(self)
+        self.data_manager = data_manager
+        self.failed.connect(self.showError)
+        # id of the object: (object, plot, keyword arguments) of the refreshes that wait for the debounce
+        self.pending = {}
+        # id of the object: (PipelineRefresh, plot, keyword arguments) of the refreshes that are calculated
+        self.running = {}
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.start)
+
+    def schedule(self, feature, plot = True, object_index = None, **kwargs):
+        '''
+        schedules a refresh of the pipeline of the object that starts with the feature.
+        object_index:
+            int, or None. default is None.
+            if None: use the selected object.
+        for keyword arguments, see DataManager._preparePipelineLoop.
+        returns False if the refresh has not been scheduled and has to be done right away, which is the case
+            if ar_params['active'] is not set, the feature is not threadsafe or it is not in the calculating
+            pipeline of the object.
+        '''
+        data = self.data_manager
+        if object_index is None:
+            object_index = data.object_selection
+        if not ar_params['active'] or not feature.threadsafe or object_index is None:
+            return False
+        object_ = data.objects[object_index]
+        if feature not in object_.pipeline.getCalculatingPipeline():
+            return False
+        self.cancel(object_)
+        self.add(object_, plot, {**kwargs, 'start_with_feature': feature})
+        self.timer.start(ar_params['debounce'])
+        return True
+
+    def add(self, object_, plot, kwargs):
+        key = id(object_)
+        if key in self.pending:
+            _, pending_plot, pending_kwargs = self.pending[key]
+            plot = plot or pending_plot
+            kwargs = self.merge(object_, pending_kwargs, kwargs)
+        self.pending[key] = (object_, plot, kwargs)
+
+    def merge(self, object_, a, b):
+        '''
+        returns the keyword arguments of a refresh that calculates at least the steps that the refreshes with
+            the keyword arguments a and b calculate.
+        '''
+        if a == b:
+            return a
+        if set(a.keys()) == set(b.keys()) == {'start_with_feature'}:
+            # all steps from the first feature on
+            calculating_pipeline = object_.pipeline.getCalculatingPipeline()
+            start_indices = [start if isinstance(start, int) else calculating_pipeline.index(start)
+                for start in (a['start_with_feature'], b['start_with_feature'])]
+            return {'start_with_feature': min(start_indices)}
+        # all steps
+        return {}
+
+    def cancel(self, object_):
+        '''
+        cancels the refresh of the object that is calculated, and schedules its changes again.
+        '''
+        running = self.running.pop(id(object_), None)
+        if running is not None:
+            refresh, plot, kwargs = running
+            refresh.cancelled = True
+            self.add(object_, plot, kwargs)
+
+    def objectIndex(self, object_):
+        '''
+        returns the index of the object, or None if it has been removed.
+        '''
+        for index, o in enumerate(self.data_manager.objects):
+            if o is object_:
+                return index
+        return None
+
+    def start(self):
+        '''
+        prepares the pending refreshes and calculates them on background threads.
+        '''
+        pending, self.pending = self.pending, {}
+        for key, (object_, plot, kwargs) in pending.items():
+            object_index = self.objectIndex(object_)
+            if object_index is None:
+                continue
+            refresh = self.data_manager.preparePipelineRefresh(object_index = object_index, **kwargs)
+            if refresh is None:
+                continue
+            if not refresh.isThreadSafe():
+                refresh.calculate()
+                self.data_manager.publishPipelineRefresh(refresh, plot, object_index = object_index, **kwargs)
+                continue
+            self.running[key] = (refresh, plot, kwargs)
+            worker = Worker(
+                work = self.calculate,
+                kwargs = {'refresh': refresh},
+                callback = self.finished,
+                callback_kwargs = {'key': key, 'refresh': refresh}
+            )
+            QtCore.QThreadPool.globalInstance().start(worker)
+
+    @staticmethod
+    def calculate(refresh):
+        '''
+        returns True if the refresh has been calculated, False if it has been cancelled, or the traceback if
+            the calculation failed.
+        '''
+        try:
+            return refresh.calculate()
+        except Exception:
+            return traceback.format_exc()
+
+    def finished(self, result):
+        '''
+        publishes the refresh if it is the latest refresh of its object.
+        '''
+        key = result['callback_kwargs']['key']
+        refresh = result['callback_kwargs']['refresh']
+        running = self.running.get(key)
+        if running is None or running[0] is not refresh:
+            return
+        del self.running[key]
+        if result['result'] is not True:
+            if isinstance(result['result'], str):
+                self.failed.emit(refresh.object_.name, result['result'])
+            return
+        object_index = self.objectIndex(refresh.object_)
+        if object_index is None:
+            return
+        _, plot, kwargs = running
+        refresh.object_index = object_index
+        self.data_manager.publishPipelineRefresh(refresh, plot, object_index = object_index, **kwargs)
+
+    def showError(self, object_name, error):
+        '''
+        shows that the refresh of the object failed and that its data has not been refreshed.
+        '''
+        warning = QtWidgets.QMessageBox(
+            QtWidgets.QMessageBox.Warning,
+            'Calculation failed',
+            'The pipeline of {} could not be calculated. The shown data is not up to date.'.format(object_name),
+            buttons = QtWidgets.QMessageBox.Ok,
+            parent = self.data_manager.parent
+            )
+        warning.setDetailedText(error)
+        warning.setWindowModality(QtCore.Qt.NonModal)
+        warning.show()
+
+    def flush(self, object_index = None):
+        '''
+        calculates the scheduled refresh of the object right away.
+        object_index:
+            int, or None. default is None.
+            if None: use the selected object.
+        '''
+        data = self.data_manager
+        if object_index is None:
+            object_index = data.object_selection
+        if object_index is None or object_index >= len(data.objects):
+            return
+        object_ = data.objects[object_index]
+        self.cancel(object_)
+        if id(object_) not in self.pending:
+            return
+        _, plot, kwargs = self.pending.pop(id(object_))
+        data._refreshPipeline(plot, object_index = object_index, **kwargs)
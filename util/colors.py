@@ -1,10 +1,11 @@
 import pyqtgraph as pg
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
 
 white = (254,254,254)
 
-prop_cycle = plt.rcParams['axes.prop_cycle']
+# the default color cycle of matplotlib. pyplot is not imported, it takes long to import.
+prop_cycle = matplotlib.rcParams['axes.prop_cycle']
 colors = prop_cycle.by_key()['color']
 n = len(colors)
 
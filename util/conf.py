@@ -15,6 +15,9 @@ bl_polynomial_fitting_params = {'polyorder':1, 'intercept':0, 'use_marker': Fals
 bl_asymmetric_ls_params = {'smooth':100,'iterations':1, 'intercept':0}
 bl_top_hat_params = {'factor':0.1}
 bl_moving_average_params = {'window':100}
+# the baseline of image sequences is subtracted as dF/F in percent, see functions.getGradient. baselines whose absolute
+#     value is not larger than epsilon give 0 ('zero'), NaN ('nan') or are replaced by epsilon ('epsilon').
+bl_gradient_params = {'zero_baseline': 'zero', 'epsilon': 1e-9}
 
 # Smoothing
 sg_active = False
@@ -65,4 +68,94 @@ cc_amplitude_params = {'maxlag':1, 'use_bandpass': False, 'order': 4, 'highpass_
 mc_params = {'correction': 'None [original image]'}
 
 # Adjust Frequency
-af_params = {'adjusted_frequency': 250.0}
\ No newline at end of file
+af_params = {'adjusted_frequency': 250.0}
+
+''' Loader Parameters '''
+
+# TIF Loader
+# decode_workers: amount of threads or processes that decode compressed pages, 0 means one per CPU.
+# executor: 'thread' or 'process'.
+tl_params = {'memory_map': True, 'decode_workers': 0, 'executor': 'thread'}
+
+''' Extraction Parameters '''
+
+# block_size: amount of frames that are read at once when the roi means are extracted.
+ex_params = {'block_size': 512}
+
+''' Image Pyramid Parameters '''
+
+# levels: (spatial bin, temporal step) of each level.
+# display_level: level that is shown while the timeline is dragged.
+# preview_level: level that the roi means are calculated from while a roi is dragged.
+# min_size: minimum amount of pixels of an image sequence to build a pyramid for it.
+ip_params = {'levels': ((4, 8), (8, 32)), 'display_level': 0, 'preview_level': 0, 'block_size': 512, 'min_size': 2**26}
+
+''' Integral Image Parameters '''
+
+# active: determines if the means of rectangular rois are calculated from the integral image of the source while
+#     the rois are dragged. the integral image is built in the background when a rectangular roi is dragged first.
+# block_size: amount of frames that are summed at once.
+# memmap_size: minimum size of an integral image in bytes to store it in a temporary file instead of memory.
+# directory: directory of the temporary files. if None, the default temporary directory is used.
+ii_params = {'active': True, 'block_size': 256, 'memmap_size': 2**28, 'directory': None}
+
+''' Asymmetric Least Squares Parameters '''
+
+# states: amount of asymmetric least squares calculations whose weights are kept, such that a calculation of the
+#     same trace with more iterations continues from them. each state needs 16 bytes per sample.
+al_params = {'states': 4}
+
+''' Block-wise Baseline Parameters '''
+
+# active: determines if the asymmetric least squares and top hat baselines of long traces are calculated in
+#     overlapping blocks that are blended at their borders, see functions.blockwise.
+# min_length: minimum amount of samples of a trace to calculate its baseline in blocks.
+# block_size: amount of samples of a block without the overlap.
+# workers: amount of threads that calculate the blocks, 0 means one per CPU.
+# tolerance: the asymmetric least squares baseline deviates from the baseline of the whole trace by about tolerance
+#     times the amplitude of the trace, see functions.alsOverlap. the top hat baseline is the same.
+bb_params = {'active': True, 'min_length': 2**21, 'block_size': 2**18, 'workers': 0, 'tolerance': 1e-6}
+
+''' Source Cache Parameters '''
+
+# active: determines if decoded sources and their settings are cached.
+# directory: the cache directory. may be on a shared disk.
+# max_size: maximum size of the cache directory in bytes. least recently used entries are removed.
+sc_params = {'active': True, 'directory': '~/.nosa/cache', 'max_size': 20 * 2**30}
+
+''' Precision Parameters '''
+
+# dtype: dtype of the roi means and of the traces in the pipeline, 'float64' or 'float32'. can be set for each
+#     source with Source.precision. image sequences always keep the dtype they are stored with.
+pr_params = {'dtype': 'float64'}
+
+''' Result Cache Parameters '''
+
+# active: determines if the results of the pipeline steps are cached, such that steps whose input and parameters
+#     did not change are not calculated again.
+# max_size: maximum size of the cached results in bytes. least recently used results are removed.
+rc_params = {'active': True, 'max_size': 256 * 2**20}
+
+''' Profiling Parameters '''
+
+# report_allocations: determines if the bytes that are allocated by every refresh of the pipeline are printed
+#     to stderr. slows down the refreshes.
+# record: determines if the profiler records the wall time, the CPU time and the peak allocation of every feature
+#     update, step calculation and plot refresh, see util.profiling.Profiler.
+# record_allocations: determines if the recording profiler counts the peak allocation. slows down the refreshes.
+# max_records: the maximum amount of records of the profiler. the oldest records are removed.
+pf_params = {'report_allocations': False, 'record': False, 'record_allocations': True, 'max_records': 100000}
+
+''' Asynchronous Refresh Parameters '''
+
+# active: determines if parameter changes refresh the pipeline on a background thread, see RefreshScheduler.
+# debounce: time in ms that parameter changes are collected before the refresh starts.
+ar_params = {'active': True, 'debounce': 50}
+
+''' Bulk Refresh Parameters '''
+
+# workers: amount of processes that calculate the pipelines when several objects are refreshed at once, 0 means
+#     one per CPU. see DataManager.refreshPipelines.
+# min_objects: minimum amount of objects that are calculated in processes. less objects are calculated on the
+#     main thread, because starting the processes takes time.
+br_params = {'workers': 0, 'min_objects': 4}
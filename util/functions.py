@@ -1,10 +1,9 @@
 # load Modules
 import numpy as np
 from copy import deepcopy
+from functools import lru_cache
 from scipy import signal
-from scipy.optimize import curve_fit
 from scipy import ndimage
-from scipy import sparse
 from scipy.signal import butter, lfilter, lfilter_zi
 
 
@@ -14,46 +13,70 @@ from scipy.signal import butter, lfilter, lfilter_zi
 def func_exp(x, a, b):
     return a * np.exp(-b * x)
 
-def func_lin(x, a, b):
-    return a*x + b
+## PRECISION ##
 
-def func_poly2(x, a, b, c):
-    return a*np.float_power(x,2) + b*x + c
-
-def func_poly3(x, a, b, c, d):
-    return a*np.float_power(x,3) + b*np.float_power(x,2) + c*x + d
-
-def func_poly4(x, c, d, e, f, g):
-    return c*np.float_power(x,4) + d*np.float_power(x,3) + e*np.float_power(x,2) + f*x + g
-
-def func_poly5(x, b, c, d, e, f, g):
-    return b*np.float_power(x,5) + c*np.float_power(x,4) + d*np.float_power(x,3) + e*np.float_power(x,2) + f*x + g
-
-def func_poly6(x, a, b, c, d, e, f, g):
-    return a*np.float_power(x,6) + b*np.float_power(x,5) + c*np.float_power(x,4) + d*np.float_power(x,3) + e*np.float_power(x,2) + f*x + g
+def floatType(y):
+    '''
+    returns the dtype of y if it is a floating point dtype, otherwise np.float64.
+    the functions of this module return their results with this dtype, such that float32 traces stay float32.
+    functions that are numerically sensitive (fitting, als, butterworth) calculate in float64 internally.
+    '''
+    dtype = np.asarray(y).dtype
+    return dtype if dtype.kind == 'f' else np.dtype(np.float64)
 
-funcList = [func_lin,func_poly2,func_poly3, func_poly4,func_poly5,func_poly6]
 
 # fit data
 def fitting(x1, x2, y, intercept=0, degree=0):
-    func = funcList[degree-1]
-    if degree > 0 and degree <= 6:
-        popt, _ = curve_fit(func, xdata=x2, ydata=y)
-        fit = func(x1, *popt)
-    else:
-        fit = np.repeat(np.mean(y),len(x1))
-    return fit+intercept
+    '''
+    returns the least squares polynomial of the degree through the points (x2, y), evaluated at x1, plus the
+        intercept. the polynomial is a linear least squares problem, which is solved directly in the Chebyshev
+        basis on x mapped to [-1, 1] (see np.polynomial), such that high degrees are well conditioned.
+    '''
+    from numpy.polynomial import chebyshev
+
+    x1 = np.asarray(x1, dtype=np.float64)
+    x2 = np.asarray(x2, dtype=np.float64)
+    # map the domain of the points to [-1, 1]
+    low = min(x1.min(initial=np.inf), x2.min(initial=np.inf))
+    high = max(x1.max(initial=-np.inf), x2.max(initial=-np.inf))
+    scale = 2 / (high - low) if high > low else 1.0
+    vander = chebyshev.chebvander((x2 - low) * scale - 1, degree)
+    coef = np.linalg.lstsq(vander, np.asarray(y, dtype=np.float64), rcond=None)[0]
+    fit = chebyshev.chebval((x1 - low) * scale - 1, coef)
+    return (fit+intercept).astype(floatType(y), copy=False)
 
 # d/dx
-def getGradient(y, baseline):
-    grad = np.zeros(len(y), dtype=float)
-    for i in range(len(y)):
-        bli = baseline[i]
-        try:
-            grad[i] = (float(y[i]-bli)/bli)*100
-        except:
-            pass
-    return grad
+def getGradient(y, baseline, zero_baseline='zero', epsilon=0.0, out=None):
+    '''
+    returns (y-baseline)/baseline*100, the change relative to the baseline in percent (dF/F).
+    y, baseline:
+        np.ndarray.
+        the traces and their baselines. several traces can be calculated at once in the rows of 2d arrays, a 1d
+        baseline is used for all rows.
+    zero_baseline:
+        str. default is 'zero'.
+        the result where the absolute value of the baseline is not larger than epsilon: 'zero' for 0, 'nan' for
+        NaN or 'epsilon' to divide by epsilon with the sign of the baseline instead.
+    out:
+        np.ndarray, or None. default is None.
+        the array that the result is written to. if None, a new array with the dtype of floatType(y) is returned.
+    '''
+    if zero_baseline not in ('zero', 'nan', 'epsilon'):
+        raise ValueError('unknown handling of zero baselines: {}'.format(zero_baseline))
+    baseline = np.asarray(baseline)
+    if out is None:
+        out = np.empty(np.broadcast_shapes(np.shape(y), baseline.shape), dtype=floatType(y))
+    zero = np.abs(baseline) <= epsilon
+    if zero_baseline == 'epsilon':
+        divisor = np.where(zero, np.copysign(epsilon, baseline), baseline)
+    else:
+        divisor = np.where(zero, 1, baseline)
+    np.subtract(y, baseline, out=out)
+    np.divide(out, divisor, out=out)
+    np.multiply(out, 100, out=out)
+    if zero_baseline != 'epsilon':
+        np.copyto(out, 0 if zero_baseline == 'zero' else np.nan, where=zero)
+    return out
 
 
 ## TOP HAT FILTER ##
@@ -71,6 +94,17 @@ def topHat(y, pntFactor):
     tFil = ndimage.white_tophat(y, None, str_el)
     return y-tFil
 
+def blockTopHat(y, pntFactor, block_size, workers=1):
+    '''
+    returns topHat(y, pntFactor), calculated in overlapping blocks, see blockwise. the structuring element is
+        determined by the length of the whole trace. the opening only depends on the values within the length
+        of the structuring element, so an overlap of twice that length (the blends are half of the overlap away
+        from the borders) gives the same result as topHat.
+    '''
+    struct_pts = int(round(y.size*pntFactor))
+    str_el = np.repeat([1], struct_pts)
+    return blockwise(lambda part: y[part] - ndimage.white_tophat(y[part], None, str_el), len(y), block_size, 2*struct_pts + 2, workers).astype(y.dtype, copy=False)
+
 
 ## ASYMMETRIC LEAST SQUARES FILTER ##
 
@@ -89,31 +123,180 @@ def als(y, iterations, smooth, p=0.001):
         https://stackoverflow.com/a/50160920
         Stackoverflow user jpantina (https://stackoverflow.com/users/6126163/jpantina)
     '''
-    smooth=smooth**3
-    L = len(y)
-    D = sparse.diags([1,-2,1],[0,-1,-2], shape=(L,L-2))
-    w = np.ones(L)
+    return alsIterations(y, iterations, smooth, p)[0].astype(floatType(y), copy=False)
+
+@lru_cache(maxsize=8)
+def alsPenalty(L, smooth):
+    '''
+    returns smooth**3 * D·Dᵀ of the asymmetric least squares, where D is the second order difference matrix
+        with shape (L, L-2), in the upper banded form of scipy.linalg.solveh_banded: the pentadiagonal matrix
+        is stored as its 3 upper diagonals with shape (3, L). the array is read-only, because it is cached.
+    '''
+    # every column of D is (1, -2, 1), so the diagonals of D·Dᵀ are sums over the columns
+    columns = np.ones(max(L - 2, 0))
+    bands = np.zeros((3, L))
+    bands[2] = np.convolve(columns, [1, 4, 1])[:L] if L > 2 else 0
+    bands[1, 1:] = np.convolve(columns, [-2, -2])[:L-1] if L > 2 else 0
+    bands[0, 2:] = columns
+    bands *= smooth**3
+    bands.flags.writeable = False
+    return bands
+
+def alsIterations(y, iterations, smooth, p=0.001, w=None):
+    '''
+    calculates the asymmetric least squares baseline (see als) with a banded Cholesky solve: O(len(y)) time and
+        memory per iteration.
+    w:
+        np.ndarray, or None. default is None.
+        the weights to start with. if None, all weights are 1. the weights returned by a call with k iterations
+        let another call continue with iteration k+1.
+    returns the baseline (float64) and the weights after the iterations.
+    '''
+    from scipy.linalg import solveh_banded
+
+    if iterations < 1:
+        raise ValueError('als needs at least one iteration.')
+    y = np.asarray(y, dtype=np.float64)
+    penalty = alsPenalty(len(y), smooth)
+    w = np.ones(len(y)) if w is None else w
     for i in range(iterations):
-        W = sparse.spdiags(w, 0, L, L)
-        Z = W + smooth * D.dot(D.transpose())
-        z = sparse.linalg.spsolve(Z, w*y)
+        bands = penalty.copy()
+        bands[2] += w
+        z = solveh_banded(bands, w*y, overwrite_ab=True, check_finite=False)
         w = p * (y > z) + (1-p) * (y < z)
+    return z, w
+
+def alsOverlap(smooth, p=0.001, tolerance=1e-6):
+    '''
+    returns the overlap of the blocks of blockALS. a change at the border of a block changes the baseline like
+        exp(-d / (sqrt(2) * l)) at the distance d, where l = (smooth**3 / p)**(1/4) is the decay length for the
+        smallest weight p. the blends of blockwise are at least half of the overlap away from the borders, so
+        their deviation from the global solution is about tolerance times the amplitude of the trace.
+    '''
+    decay = np.sqrt(2) * (smooth**3 / p)**0.25
+    return 2 * int(np.ceil(decay * np.log(1 / tolerance)))
+
+def blockALS(y, iterations, smooth, p=0.001, w=None, block_size=2**18, tolerance=1e-6, workers=1):
+    '''
+    calculates alsIterations in overlapping blocks, see blockwise and alsOverlap. every block needs
+        O(block_size + overlap) memory instead of O(len(y)).
+    returns the baseline (float64) and the weights of the blended baseline, such that a call with the weights
+        continues from it, like alsIterations.
+    '''
+    y = np.asarray(y)
+    z = blockwise(lambda part: alsIterations(y[part], iterations, smooth, p, None if w is None else w[part])[0],
+        len(y), block_size, alsOverlap(smooth, p, tolerance), workers)
+    return z, p * (y > z) + (1-p) * (y < z)
+
+## BLOCK-WISE CALCULATION ##
+
+def blockwise(function, n, block_size, overlap, workers=1):
+    '''
+    calculates a function of a trace in overlapping blocks and blends the results.
+    function:
+        function.
+        returns the result for a slice of the trace, an array with the length of the slice.
+    n:
+        int.
+        the length of the trace.
+    block_size:
+        int.
+        the distance between the borders of two blocks. every block is extended by overlap on both sides. if
+        block_size is smaller than overlap, overlap is used.
+    overlap:
+        int.
+        amount of samples that neighbouring blocks share on each side of their border. the results are blended
+        linearly over the middle half of the overlap around the border, so the blended values are at least half
+        of the overlap away from the borders of the blocks.
+    workers:
+        int.
+        amount of threads that calculate the blocks, 0 means one per CPU.
+    returns the blended result (float64).
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    import os
+
+    block_size = max(int(block_size), int(overlap), 1)
+    # the last block also takes the rest of the trace, so it is at least block_size long
+    borders = list(range(block_size, n - block_size + 1, block_size))
+    if len(borders) == 0:
+        return np.asarray(function(slice(0, n)), dtype=np.float64)
+    starts = [0] + borders
+    stops = borders + [n]
+    parts = [slice(max(0, start - overlap), min(n, stop + overlap)) for start, stop in zip(starts, stops)]
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=min(workers, len(parts))) as executor:
+        results = list(executor.map(function, parts))
+
+    half = overlap // 2
+    ramp = (np.arange(2*half) + 0.5) / (2*half)
+    z = np.empty(n, dtype=np.float64)
+    for start, stop, part, result in zip(starts, stops, parts, results):
+        # the own samples of the block without the blends
+        own_start = start + half if start > 0 else 0
+        own_stop = stop - half if stop < n else n
+        z[own_start:own_stop] = result[own_start - part.start:own_stop - part.start]
+    for k, border in enumerate(borders):
+        blend = slice(border - half, border + half)
+        left = results[k][blend.start - parts[k].start:blend.stop - parts[k].start]
+        right = results[k+1][blend.start - parts[k+1].start:blend.stop - parts[k+1].start]
+        z[blend] = (1 - ramp) * left + ramp * right
     return z
 
 ## Moving Average
 
-def movingAverage(y, window=11):
+# windows with at least this amount of samples are convolved with the FFT (scipy.signal.oaconvolve)
+fft_window = 200
+
+@lru_cache(maxsize=32)
+def smoothingWindow(window, window_type='hanning', dtype=np.float64):
+    '''
+    returns the normalized coefficients of the window of movingAverage. the array is read-only, because it is
+        cached.
+    '''
+    if window_type == 'hanning':
+        w = np.hanning(window)
+    elif window_type == 'boxcar':
+        w = np.ones(window)
+    else:
+        raise ValueError('unknown window: {}'.format(window_type))
+    w = (w / np.sum(w)).astype(dtype)
+    w.flags.writeable = False
+    return w
+
+def movingAverage(y, window=11, window_type='hanning'):
+    '''
+    returns the moving average of y with a normalized window, which is made odd-sized. y is padded by reflection
+        with half the window, so the result has the length of y.
+    window_type:
+        str. default is 'hanning'.
+        'hanning' convolves with a Hanning window: windows with at least fft_window samples are convolved with
+        the FFT, which differs from the direct convolution by rounding errors only. 'boxcar' averages with equal
+        weights from a cumulative sum in O(len(y)) for all window sizes, calculated in float64 relative to the
+        mean of y.
+    '''
     if window > 0:
         # need an odd-sized window
         if window%2 == 0:
             window+=1
         # pad the original data with the half window size
         s = np.pad(y, int(window/2), mode='reflect')
-        # get a hanning window
-        w = np.hanning(window)
-        # convolve the normalized hanning window with the padded data
-        z = np.convolve(w / np.sum(w), s, mode='valid')
-        return z
+        if window_type == 'boxcar':
+            # the sums of the windows are differences of the cumulative sum
+            mean = np.mean(s, dtype=np.float64)
+            c = np.zeros(len(s) + 1)
+            np.cumsum(s - mean, out=c[1:])
+            z = (c[window:] - c[:-window]) / window + mean
+            return z.astype(floatType(y), copy=False)
+        # get a normalized hanning window
+        w = smoothingWindow(window, window_type, floatType(y))
+        # convolve the window with the padded data
+        if window >= fft_window:
+            from scipy.signal import oaconvolve
+            z = oaconvolve(s, w, mode='valid')
+        else:
+            z = np.convolve(w, s, mode='valid')
+        return z.astype(floatType(y), copy=False)
     else:
         return y
 
@@ -125,7 +308,7 @@ def butter_lowpass_filter(y, freq, highcut, order):
     b, a = butter(order, high, btype='lowpass')
     zi = lfilter_zi(b, a)
     z, _ = lfilter(b, a, y, zi = zi * y[0])
-    return z
+    return z.astype(floatType(y), copy=False)
 
 
 ## Alternative Spike Detection ##
@@ -152,3 +335,33 @@ def findSpikes3(y, thresh, distance):
         else:
             j+=1
     return spikes
+
+
+## Arrays ##
+
+def isSameView(a, b):
+    '''
+    returns True if a and b are the same object, or arrays that view the same memory with the same shape, strides and dtype.
+    in contrast to np.array_equal, no data is read, which matters for memory-mapped image sequences.
+    '''
+    if a is b:
+        return True
+    if not isinstance(a, np.ndarray) or not isinstance(b, np.ndarray):
+        return False
+    return (a.__array_interface__['data'][0] == b.__array_interface__['data'][0]
+        and a.shape == b.shape
+        and a.strides == b.strides
+        and a.dtype == b.dtype)
+
+def readOnly(value):
+    '''
+    returns a read-only view of value if it is an array, otherwise value. the data is not copied.
+    the traces in the pipeline are passed on as read-only views, such that steps can share them instead of
+    copying them. a step that wants to write into a trace has to copy it first, e.g. the amplitude cross
+    correlation copies the processed traces.
+    '''
+    if not isinstance(value, np.ndarray) or not value.flags.writeable:
+        return value
+    view = value.view()
+    view.flags.writeable = False
+    return view
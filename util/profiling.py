@@ -0,0 +1,243 @@
+from dataclasses import dataclass, asdict
+from collections import deque
+from contextlib import contextmanager
+import threading
+import json
+import time
+import sys
+import os
+import tracemalloc
+
+from util.conf import pf_params
+
+class AllocationCounter():
+    '''
+    Counts the memory that is allocated while the counter is entered, with tracemalloc:
+        peak is the maximum amount of bytes that were allocated in addition to the memory at entering,
+        retained is the amount of bytes that are still allocated at exiting.
+    Counters can be nested, but only the outermost counter counts, because tracemalloc has only one peak.
+        tracemalloc slows down allocations, so it is only started while a counter is entered.
+
+    usage:
+        with AllocationCounter('refresh') as counter:
+            ...
+        counter.peak, counter.retained
+    '''
+
+    # amount of entered counters
+    depth = 0
+
+    def __init__(self, name, active = True, report = True):
+        '''
+        name:
+            str.
+            the name that is reported.
+        active:
+            bool. default is True.
+            determines if the allocations are counted. inactive counters do nothing.
+        report:
+            bool. default is True.
+            determines if the counted bytes are printed to stderr at exiting.
+        '''
+        self.name = name
+        self.active = active
+        self.report = report
+        self.counting = False
+        self.started_tracing = False
+        self.start = 0
+        self.peak = None
+        self.retained = None
+
+    def __enter__(self):
+        AllocationCounter.depth += 1
+        self.counting = self.active and AllocationCounter.depth == 1
+        if self.counting:
+            self.started_tracing = not tracemalloc.is_tracing()
+            if self.started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        AllocationCounter.depth -= 1
+        if not self.counting:
+            return False
+        current, peak = tracemalloc.get_traced_memory()
+        if self.started_tracing:
+            tracemalloc.stop()
+        self.peak = peak - self.start
+        self.retained = current - self.start
+        if self.report:
+            print(self.summary(), file = sys.stderr)
+        return False
+
+    def summary(self):
+        return '{}: {:.1f} MiB allocated (peak), {:.1f} MiB retained'.format(self.name, self.peak / 2**20, self.retained / 2**20)
+
+def refreshAllocationCounter(name):
+    '''
+    returns an AllocationCounter for a refresh of the pipeline or the plots, which is active if
+        pf_params['report_allocations'] is set.
+    '''
+    return AllocationCounter(name, active = pf_params['report_allocations'])
+
+@dataclass
+class ProfileRecord():
+    '''
+    A measured call, see Profiler.measure. times are in seconds, start is relative to the start of the profiler.
+        peak is the maximum amount of bytes that were allocated in addition to the memory at the start of the
+        call, or None if the allocations were not counted.
+    '''
+    name: str
+    category: str
+    object_name: str
+    feature: str
+    method: str
+    start: float
+    wall: float
+    cpu: float
+    peak: int
+    thread: int
+
+class Profiler():
+    '''
+    Records the wall time, the CPU time of the calling thread and the peak allocation of measured calls, if
+        pf_params['record'] is set. Measurements can be nested, the peak of a call includes the peaks of the
+        calls inside it. tracemalloc counts the allocations of all threads, so the peak of a call includes the
+        allocations of other threads at the same time.
+    The records can be summarized per feature and method (see summary) and exported as a Chrome trace file
+        (see exportChromeTrace), which can be opened with chrome://tracing or https://ui.perfetto.dev.
+
+    usage:
+        with profiler.measure('update', 'update', 'Object 1', 'Baseline', 'Top Hat'):
+            ...
+    '''
+
+    def __init__(self):
+        self.records = deque(maxlen = pf_params['max_records'])
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        # the peaks of the entered measurements of every thread
+        self.local = threading.local()
+        self.started_tracing = False
+
+    @property
+    def active(self):
+        return pf_params['record']
+
+    def setActive(self, active):
+        '''
+        starts or stops recording. tracemalloc is stopped if the profiler started it.
+        '''
+        pf_params['record'] = active
+        if not active and self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def measure(self, name, category, object_name = None, feature = None, method = None):
+        '''
+        records the call inside the context, if the profiler is active.
+        name:
+            str.
+            the name of the call, e.g. 'update'.
+        category:
+            str.
+            the kind of the call: 'update', 'calculate' or 'plot'.
+        object_name, feature, method:
+            str, or None. default is None.
+            the object, the feature and the method that the call belongs to.
+        '''
+        if not self.active:
+            yield
+            return
+        count_allocations = pf_params['record_allocations']
+        if count_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        peaks = self.local.__dict__.setdefault('peaks', [])
+        if count_allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if len(peaks) > 0:
+                # the peak of the enclosing call until now
+                peaks[-1][1] = max(peaks[-1][1], peak)
+            tracemalloc.reset_peak()
+            entry = [current, current]
+        else:
+            entry = None
+        peaks.append(entry)
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - start
+            peaks.pop()
+            allocated = None
+            if entry is not None and tracemalloc.is_tracing():
+                entry[1] = max(entry[1], tracemalloc.get_traced_memory()[1])
+                allocated = entry[1] - entry[0]
+                if len(peaks) > 0 and peaks[-1] is not None:
+                    peaks[-1][1] = max(peaks[-1][1], entry[1])
+                tracemalloc.reset_peak()
+            with self.lock:
+                self.records.append(ProfileRecord(name, category, object_name, feature, method,
+                    start - self.origin, wall, cpu, allocated, threading.get_ident()))
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def getRecords(self):
+        with self.lock:
+            return list(self.records)
+
+    def summary(self):
+        '''
+        returns a list of dicts with the amount of calls, the total and maximum wall time, the total CPU time and
+            the maximum peak allocation per category, feature and method, sorted by the total wall time.
+        '''
+        groups = {}
+        for record in self.getRecords():
+            key = (record.category, record.feature, record.method)
+            group = groups.setdefault(key, {'category': record.category, 'feature': record.feature, 'method': record.method,
+                'calls': 0, 'wall': 0.0, 'max wall': 0.0, 'cpu': 0.0, 'peak': None})
+            group['calls'] += 1
+            group['wall'] += record.wall
+            group['max wall'] = max(group['max wall'], record.wall)
+            group['cpu'] += record.cpu
+            if record.peak is not None:
+                group['peak'] = record.peak if group['peak'] is None else max(group['peak'], record.peak)
+        return sorted(groups.values(), key = lambda group: group['wall'], reverse = True)
+
+    def chromeTrace(self):
+        '''
+        returns the records in the Chrome trace event format: every record is a complete event with the
+            times in microseconds.
+        '''
+        pid = os.getpid()
+        events = []
+        for record in self.getRecords():
+            args = {key: value for key, value in asdict(record).items() if key in ['object_name', 'feature', 'method', 'cpu', 'peak'] and value is not None}
+            if 'cpu' in args:
+                args['cpu'] = args['cpu'] * 1e6
+            events.append({
+                'name': record.name if record.feature is None else '{} {}'.format(record.feature, record.name),
+                'cat': record.category,
+                'ph': 'X',
+                'ts': record.start * 1e6,
+                'dur': record.wall * 1e6,
+                'pid': pid,
+                'tid': record.thread,
+                'args': args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def exportChromeTrace(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.chromeTrace(), file)
+
+# the profiler of the application
+profiler = Profiler()
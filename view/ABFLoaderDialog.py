@@ -1,10 +1,14 @@
 from PyQt5 import QtCore, QtWidgets, QtGui
-import quantities as pq
 import numpy as np
 
 class ABFLoaderDialog(QtWidgets.QDialog):
 
-    def __init__(self, parent, abf):
+    def __init__(self, parent, connected_data, unconnected_data):
+        '''
+        connected_data, unconnected_data:
+            list of dict.
+            the signals of the abf file with connected and unconnected sweeps, see model.ABFLoader.abfSignals.
+        '''
 
         QtWidgets.QDialog.__init__(self, parent, flags = QtCore.Qt.WindowTitleHint | QtCore.Qt.WindowCloseButtonHint)
 
@@ -23,9 +27,9 @@ class ABFLoaderDialog(QtWidgets.QDialog):
 
         self.table = QtWidgets.QTableWidget()
         layout.addWidget(self.table)
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(['', 'Name', 'Mean', 'Begin', 'End', 'Unit', 'Length (frames)', 'Description'])
-        for i in range(7):
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels(['', 'Name', 'Begin', 'End', 'Unit', 'Length (frames)', 'Description'])
+        for i in range(6):
             self.table.horizontalHeader().setResizeMode(i, QtGui.QHeaderView.ResizeToContents)
         self.table.horizontalHeader().setFixedHeight(QtGui.QFontMetrics(self.table.horizontalHeader().font()).height() + 10)
         self.table.verticalHeader().setVisible(False)
@@ -34,49 +38,9 @@ class ABFLoaderDialog(QtWidgets.QDialog):
         self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.table.setRowCount(0)
 
-        self.connected_data = []
-        self.unconnected_data = []
-        unconnected_counter = 0
-
-        for channel_index in abf.channelList:
-            connected_data = np.array([], dtype = np.float32)
-            for sweep in abf.sweepList:
-                abf.setSweep(sweepNumber = sweep, channel = channel_index)
-                unconnected_counter += 1
-                self.unconnected_data.append(
-                    {
-                        'tabledata':
-                        [
-                            unconnected_counter,
-                            '{} (sweep {})'.format(abf.adcNames[channel_index], str(sweep)),
-                            np.mean(abf.sweepY),
-                            abf.sweepY[0],
-                            abf.sweepY[-1],
-                            abf.adcUnits[channel_index],
-                            abf.sweepPointCount,
-                            None
-                        ],
-                        'data': abf.sweepY
-                    }
-                )
-                connected_data = np.concatenate((connected_data, abf.sweepY))
-            
-            self.connected_data.append(
-                {
-                    'tabledata':
-                    [
-                        channel_index+1,
-                        abf.adcNames[channel_index],
-                        np.mean(connected_data),
-                        connected_data[0],
-                        connected_data[-1],
-                        abf.adcUnits[channel_index],
-                        len(connected_data),
-                        None
-                    ],
-                    'data': connected_data
-                }
-            )
+        self.connected_data = connected_data
+        self.unconnected_data = unconnected_data
+
         button_widget = QtWidgets.QWidget()
         layout.addWidget(button_widget)
 
@@ -114,6 +78,10 @@ class ABFLoaderDialog(QtWidgets.QDialog):
                 self.table.setItem(row, i, QtWidgets.QTableWidgetItem(str(data['tabledata'][i])))
 
     def getSelectedData(self):
+        '''
+        returns the selected signals and the amount of displayed signals. each signal is a dict with the
+            tabledata, the channel and the sweeps. the samples are not read yet.
+        '''
         selected_data = []
         data_array = self.connected_data if self.connect_checkbox.isChecked() else self.unconnected_data
         displayed_options = len(data_array)
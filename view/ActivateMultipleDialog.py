@@ -76,9 +76,11 @@ class ActivateMultipleDialog(QtWidgets.QDialog):
             # get objects whose feature changed
             indices_that_changed = [i for i, (user_set_, default) in enumerate(zip(user_set, self.defaults)) if user_set_ != default]
 
+            features_that_changed = []
             for index in indices_that_changed:
                 # get the feature
                 feature = self.data_manager.objects[index].pipeline.getPipeline()[self.index]
+                features_that_changed.append(feature)
 
                 # set the new active state
                 feature.active = user_set[index]
@@ -87,8 +89,8 @@ class ActivateMultipleDialog(QtWidgets.QDialog):
                 if not user_set[index]:
                     feature.clearData()
 
-                # update every objects pipeline. only calculate cc once (for the last object).
-                self.data_manager.refreshPipeline(plot = True, object_index = index, start_with_feature = feature, ignore_cross_correlation = index != indices_that_changed[-1])
+            # update the pipelines of the objects at once. cc is calculated once.
+            self.data_manager.refreshPipelines(indices_that_changed, start_with_feature = features_that_changed)
 
             # find out what plot to reset:
             # get current feature
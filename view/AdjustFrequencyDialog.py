@@ -1,5 +1,4 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
-from scipy.interpolate import interp1d
 from copy import deepcopy
 import numpy as np
 
@@ -64,7 +63,7 @@ class AdjustFrequencyDialog(QtWidgets.QDialog):
 
     def synchronizeActiveStateWithView(self):
         if self.af.active:
-            self.feature_view.setCurrentWidget(self.af)
+            self.feature_view.setCurrentWidget(self.af.feature)
             self.af.show()
         else:
             self.af.hide()
@@ -90,8 +89,8 @@ class AdjustFrequencyDialog(QtWidgets.QDialog):
 
         # no need to update when everything is the same
         both_active = self.af.active and self.initial_active_state
-        same_method = self.af.method_combo.currentText() == self.initial_method
-        same_parameters = self.af.getMethod().parameters == self.initial_parameters[self.af.method_combo.currentText()]
+        same_method = self.af.method == self.initial_method
+        same_parameters = self.af.getMethod().parameters == self.initial_parameters[self.af.method]
         if both_active and same_method and same_parameters:
             return
 
@@ -102,7 +101,7 @@ class AdjustFrequencyDialog(QtWidgets.QDialog):
         self.data_manager.setSourceAttributes(attributes = {
             'adjusted_frequency': self.af.getMethod().parameters['adjusted_frequency'],
             'adjust_frequency_active': self.af.active,
-            'adjust_frequency_method': self.af.method_combo.currentIndex()
+            'adjust_frequency_method': list(self.af.methods.keys()).index(self.af.method)
         })
 
     def cancel(self):
@@ -110,8 +109,9 @@ class AdjustFrequencyDialog(QtWidgets.QDialog):
         # correctly reset all parameters
         for name, parameters in self.initial_parameters.items():
             self.af.methods[name].parameters = parameters
-        self.af.method_combo.setCurrentText(self.initial_method)
+        self.af.method = self.initial_method
         self.af.active = self.initial_active_state
+        self.af.feature.display(self.af)
         self.af.hide()
         
         self.reject()
@@ -134,7 +134,7 @@ class AdjustFrequencyDialog(QtWidgets.QDialog):
         
         self.initial_active_state = self.af.active
         self.initial_parameters = {name: deepcopy(method.parameters) for name, method in self.af.methods.items()}
-        self.initial_method = self.af.method_combo.currentText()
+        self.initial_method = self.af.method
 
     def suggest(self):
 
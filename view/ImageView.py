@@ -1,4 +1,5 @@
 import pyqtgraph as pg
+from PyQt5 import QtCore
 from view.Plot import removeExportFromContextMenu
 
 
@@ -14,6 +15,14 @@ class ImageView(pg.ImageView):
         removeExportFromContextMenu(self.ui.roiPlot.sceneObj.contextMenu)
         self.hidePlot()
 
+        # image pyramid of the image. if set, its display level is shown while the timeline is dragged
+        self.pyramid = None
+        self.showing_pyramid = False
+        # integral image of the image. if set, the means of rectangular rois are calculated from it while they
+        # are dragged
+        self.integral_image = None
+        self.timeLine.sigPositionChangeFinished.connect(self.timeLineChangeFinished)
+
 
     def showPlot(self):
         plot = self.ui.roiPlot
@@ -36,3 +45,41 @@ class ImageView(pg.ImageView):
         roi = pg.EllipseROI(pos, size, angle=angle, pen=pen, movable=movable)
         self.getView().addItem(roi)
         return roi
+
+    def setPyramid(self, pyramid):
+        '''
+        pyramid:
+            ImagePyramid, or None.
+            the built image pyramid of the image, or None if there is none.
+        '''
+        if self.showing_pyramid:
+            self.showFullResolution()
+        self.pyramid = pyramid
+
+    def timeLineChanged(self):
+        if self.pyramid is None or not self.timeLine.moving:
+            pg.ImageView.timeLineChanged(self)
+            return
+
+        # the timeline is dragged: show the frame of the coarse display level, stretched to the full image size
+        if not self.ignoreTimeLine:
+            self.play(0)
+        (ind, time) = self.timeIndex(self.timeLine)
+        if ind != self.currentIndex or not self.showing_pyramid:
+            self.currentIndex = ind
+            if not self.showing_pyramid:
+                self.full_resolution_transform = self.imageItem.transform()
+                self.showing_pyramid = True
+            level = self.pyramid.displayLevel()
+            self.imageItem.updateImage(level.frame(ind))
+            self.imageItem.setRect(QtCore.QRectF(0, 0, level.data.shape[1] * level.spatial_bin, level.data.shape[2] * level.spatial_bin))
+        self.sigTimeChanged.emit(ind, time)
+
+    def timeLineChangeFinished(self):
+        if self.showing_pyramid:
+            self.showFullResolution()
+
+    def showFullResolution(self):
+        self.showing_pyramid = False
+        self.imageItem.setTransform(self.full_resolution_transform)
+        self.updateImage(autoHistogramRange = False)
@@ -170,9 +170,8 @@ class MovementCorrectionDialog(QtWidgets.QDialog):
             selected_source.setCorrectedData(self.mc.output['source'])
             self.done(QtWidgets.QDialog.Accepted)
             object_indices_for_this_source = [i for i, o in enumerate(self.data_manager.objects) if o.source is selected_source]
-            for index in object_indices_for_this_source:
-                # refresh pipeline for all objects belonging to the source. only make cc when refreshing the last pipeline.
-                self.data_manager.refreshPipeline(object_index = index, start_with_feature = self.data_manager.cell_selection, ignore_cross_correlation = index != max(object_indices_for_this_source))
+            # refresh the pipelines of all objects belonging to the source at once. cc is calculated once.
+            self.data_manager.refreshPipelines(object_indices_for_this_source, start_with_feature = self.data_manager.cell_selection)
 
     def cancel(self):
         """
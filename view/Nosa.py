@@ -7,6 +7,7 @@ from view.SourceManager import SourceManager
 from view.ObjectManager import ObjectManager
 from view.PipelineManager import PipelineManager
 from view.PlotManager import PlotManager
+from view.ProfilerDialog import ProfilerDialog
 from features.CellSelection import CellSelection
 
 class Nosa(QtGui.QWidget):
@@ -50,3 +51,14 @@ class Nosa(QtGui.QWidget):
         self.main_splitter.addWidget(self.left_splitter)
         self.main_splitter.addWidget(self.plot_manager)
         self.main_splitter.addWidget(self.pipeline_manager)
+
+        # profiler
+        self.profiler_dialog = None
+        QtWidgets.QShortcut(QtGui.QKeySequence('Ctrl+Shift+P'), self, self.showProfiler)
+
+    def showProfiler(self):
+        if self.profiler_dialog is None:
+            self.profiler_dialog = ProfilerDialog(self)
+        self.profiler_dialog.refreshTable()
+        self.profiler_dialog.show()
+        self.profiler_dialog.raise_()
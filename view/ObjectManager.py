@@ -96,9 +96,8 @@ class ObjectManager(QtGui.QWidget):
         objects = [object_.name for object_ in self.data_manager.objects]
         dialog = AddCopyMultipleDialog(self, objects)
         if dialog.exec() == QtWidgets.QDialog.Accepted:
-            for index, checkbox in enumerate(dialog.checkboxes):
-                if checkbox.isChecked():
-                    self.data_manager.addObject(mask_object_index = index)
+            mask_object_indices = [index for index, checkbox in enumerate(dialog.checkboxes) if checkbox.isChecked()]
+            self.data_manager.addObjects(mask_object_indices)
 
     def add(self):
         self.data_manager.addObject()
@@ -115,10 +114,11 @@ class ObjectManager(QtGui.QWidget):
     def itemSelectionChanged(self):
         if len(self.table.selectedIndexes()) > 0:
             self.data_manager.selectObject(self.table.selectedIndexes()[0].row())
-        else:
-            # This should never happen.
-            print('Object Manager, itemSelectionChanged. No selection!')
-            pass
+        elif self.data_manager.object_selection is not None:
+            # the selection was removed, e.g. by a ctrl click. an object is always selected, so select it again.
+            self.tableItemSelectionChangedDisconnect()
+            self.table.selectRow(self.data_manager.object_selection)
+            self.tableItemSelectionChangedConnect()
         
     def contextMenu(self):
         # dont show any option if there is at most 1 object
@@ -10,6 +10,11 @@ from view.SetMultipleDialog import SetMultipleDialog
 from features.BackgroundSubtraction import BackgroundSubtraction
 from features.CrossCorrelation import SpikeCrossCorrelation, AmplitudeCrossCorrelation
 from features.Baseline import Baseline
+from features.Smoothing import Smoothing
+from features.AdjustFrequency import AdjustFrequency
+from features.EventDetection import SpikeDetection, BurstDetection
+from features.EventShape import EventShape
+from features.PowerSpectrum import PowerSpectrum
 
 class PipelineManager(QtGui.QWidget):
 
@@ -36,12 +41,24 @@ class PipelineManager(QtGui.QWidget):
         self.feature_view = QtWidgets.QStackedWidget(self)
         self.feature_view.setMinimumSize(290, 400)
 
-        self.spike_cross_correlation = SpikeCrossCorrelation(data_manager, parent=self.feature_view, liveplot=data_manager.plot_manager.spike_cross_correlation)
-        self.amplitude_cross_correlation = AmplitudeCrossCorrelation(data_manager, parent=self.feature_view, liveplot=data_manager.plot_manager.amplitude_cross_correlation)
+        # the features are shared by the pipelines of all objects. the pipelines keep the states of the features
+        # and the features show the states of the selected object, see displayPipeline.
+        plot_manager = data_manager.plot_manager
+        self.background_subtraction = BackgroundSubtraction(data_manager, parent=self.feature_view, liveplot=plot_manager.background_subtraction)
+        self.baseline = Baseline(data_manager, parent=self.feature_view, liveplot=(plot_manager.cell_selection.ui.roiPlot, plot_manager.baseline))
+        self.smoothing = Smoothing(data_manager, parent=self.feature_view, liveplot=plot_manager.smoothing)
+        self.adjust_frequency = AdjustFrequency(data_manager, parent=data_manager.source_manager.adjust_frequency_dialog.feature_view)
+        self.spike_detection = SpikeDetection(data_manager, parent=self.feature_view, liveplot=plot_manager.spike_detection)
+        self.burst_detection = BurstDetection(data_manager, parent=self.feature_view, liveplot=plot_manager.burst_detection)
+        self.event_shape = EventShape(data_manager, parent=self.feature_view, liveplot=plot_manager.event_shape)
+        self.power_spectrum = PowerSpectrum(data_manager, parent=self.feature_view, liveplot=plot_manager.frequency_spectrum)
+        self.spike_cross_correlation = SpikeCrossCorrelation(data_manager, parent=self.feature_view, liveplot=plot_manager.spike_cross_correlation)
+        self.amplitude_cross_correlation = AmplitudeCrossCorrelation(data_manager, parent=self.feature_view, liveplot=plot_manager.amplitude_cross_correlation)
 
         self.pipeline_steps = []
         self.default_pipeline = Pipeline()
-        self.default_pipeline.initPipeline(self.data_manager, source_is_tif = False, parent = self.feature_view)
+        self.default_pipeline.initPipeline(self.data_manager, source_is_tif = False)
+        self.displayPipeline()
         for index,step in enumerate(self.default_pipeline.getPipeline()):
             button = FeatureButton(step.name, self)
             self.layout.addWidget(button)
@@ -138,10 +155,10 @@ class PipelineManager(QtGui.QWidget):
             self.current_feature_shown.hide()
             self.current_feature_shown = None
         if index != -1:
-            pipeline = self.data_manager.getCurrentPipeline().getPipeline()
-            pipeline[index].show()
-            self.current_feature_shown = pipeline[index]
-            self.feature_view.setCurrentWidget(pipeline[index])
+            feature = self.data_manager.getCurrentPipeline().getPipeline()[index].feature
+            feature.show()
+            self.current_feature_shown = feature
+            self.feature_view.setCurrentWidget(feature)
         else:
             self.feature_view.setCurrentIndex(-1)
 
@@ -185,7 +202,7 @@ class PipelineManager(QtGui.QWidget):
         for index,step in enumerate(pipeline):
             # never activate BSR for non-tif-sources
             # never activate any features for default pipeline
-            if default_pipeline or (isinstance(pipeline[index], BackgroundSubtraction) and non_tif_source):
+            if default_pipeline or (isinstance(pipeline[index].feature, BackgroundSubtraction) and non_tif_source):
                 self.pipeline_steps[index].cb.setCheckable(False)
             else:
                 self.pipeline_steps[index].cb.setCheckable(True)
@@ -206,9 +223,17 @@ class PipelineManager(QtGui.QWidget):
         still_show_feature = False
         if self.current_feature_shown is not None:
             for index, step in enumerate(self.data_manager.getCurrentPipeline().getPipeline()):
-                if type(step) == type(self.current_feature_shown) and step.active:
+                if step.feature is self.current_feature_shown and step.active:
                     self.showFeature(index)
                     still_show_feature = True
                     break
         if not still_show_feature:
-            self.showNoFeature()
\ No newline at end of file
+            self.showNoFeature()
+
+    def displayPipeline(self):
+        """
+        Binds the features to the states of the current Pipeline and shows them, see Feature.display.
+        """
+        for step in self.data_manager.getCurrentPipeline().getCalculatingPipeline():
+            if step.feature is not step:
+                step.feature.display(step)
\ No newline at end of file
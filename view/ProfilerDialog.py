@@ -0,0 +1,85 @@
+from PyQt5 import QtWidgets, QtCore
+
+from util.profiling import profiler
+
+class ProfilerDialog(QtWidgets.QDialog):
+
+    """
+    Dialog that shows the recorded feature updates, step calculations and plot refreshes
+    per feature and method (see util.profiling.Profiler), and lets the user start and stop
+    recording, clear the records and export them as a Chrome trace file.
+    """
+
+    columns = ['Category', 'Feature', 'Method', 'Calls', 'Wall [ms]', 'Max Wall [ms]', 'CPU [ms]', 'Peak [MiB]']
+
+    def __init__(self, parent = None):
+
+        QtWidgets.QDialog.__init__(self, parent, flags = QtCore.Qt.WindowTitleHint | QtCore.Qt.WindowCloseButtonHint)
+
+        self.setWindowTitle('Profiler')
+        self.resize(700, 400)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.record_checkbox = QtWidgets.QCheckBox('Record')
+        self.record_checkbox.setChecked(profiler.active)
+        self.record_checkbox.toggled.connect(self.recordToggled)
+        layout.addWidget(self.record_checkbox)
+
+        self.table = QtWidgets.QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        control_widget = QtWidgets.QWidget()
+        layout.addWidget(control_widget)
+        control_layout = QtWidgets.QHBoxLayout()
+        control_widget.setLayout(control_layout)
+        refresh_button = QtWidgets.QPushButton('Refresh')
+        clear_button = QtWidgets.QPushButton('Clear')
+        export_button = QtWidgets.QPushButton('Export Trace')
+        refresh_button.clicked.connect(lambda _: self.refreshTable())
+        clear_button.clicked.connect(lambda _: self.clearClick())
+        export_button.clicked.connect(lambda _: self.exportClick())
+        control_layout.addWidget(refresh_button)
+        control_layout.addWidget(clear_button)
+        control_layout.addWidget(export_button)
+
+        self.refreshTable()
+
+    def recordToggled(self, checked):
+        profiler.setActive(checked)
+
+    def refreshTable(self):
+        """ Shows the summary of the records, the slowest feature methods first. """
+        summary = profiler.summary()
+        self.table.setRowCount(len(summary))
+        for row, group in enumerate(summary):
+            values = [
+                group['category'],
+                group['feature'] or '',
+                group['method'] or '',
+                str(group['calls']),
+                '{:.2f}'.format(group['wall'] * 1000),
+                '{:.2f}'.format(group['max wall'] * 1000),
+                '{:.2f}'.format(group['cpu'] * 1000),
+                '' if group['peak'] is None else '{:.2f}'.format(group['peak'] / 2**20)
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QtWidgets.QTableWidgetItem(value))
+        self.table.resizeColumnsToContents()
+
+    def clearClick(self):
+        profiler.clear()
+        self.refreshTable()
+
+    def exportClick(self):
+        """ Lets the user choose a file and exports the records as a Chrome trace to it. """
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, 'Export Trace', 'nosa_trace.json', 'Chrome Trace (*.json)')
+        if path == '':
+            return
+        try:
+            profiler.exportChromeTrace(path)
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, 'Export failed', 'The trace could not be exported:\n{}'.format(e))
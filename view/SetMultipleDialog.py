@@ -83,28 +83,20 @@ class SetMultipleDialog(QtWidgets.QDialog):
             # get the feature to copy from
             copy_from = self.data_manager.getCurrentPipeline().getPipeline()[self.index]
 
+            features_copied_to = []
             for index in affected_object_indices:
 
                 # get the feature to copy to
                 copy_to = self.data_manager.objects[index].pipeline.getPipeline()[self.index]
+                features_copied_to.append(copy_to)
 
-                # set selected method without emitting the signal to update. 
-                copy_to.disconnectMethodCombo()
-                copy_to.method_combo.setCurrentIndex(copy_from.method_combo.currentIndex())
-                copy_to.connectMethodCombo()
-                # because we disconnected the signal, we need to update the parametersui manually
-                copy_to.updateParametersUI()
-                # because we called updateparametersui, backgroundsubtraction will show its rois. this is not wanted
-                # for objects other than the selected.
-                if copy_from is self.data_manager.getCurrentPipeline()._background_subtraction:
-                    copy_to.undisplayPlots()
-
-                # set parameters with preventing an update.
-                for key, method in copy_to.methods.items():
-                    method.setParameters(deepcopy(copy_from.methods[key].parameters), prevent_update = True)
-
-                # update the pipeline. only do CC once (for last affected active object)
-                self.data_manager.refreshPipeline(plot = True, object_index = index, start_with_feature = copy_to, ignore_cross_correlation = index != affected_object_indices[-1])
+                # set selected method and parameters. the states of other objects are not displayed, so this
+                # does not update anything.
+                copy_to.method = copy_from.method
+                copy_to.parameters = deepcopy(copy_from.parameters)
+
+            # update the pipelines of the objects at once. cc is calculated once.
+            self.data_manager.refreshPipelines(affected_object_indices, start_with_feature = features_copied_to)
 
     def cancelClick(self):
         """ Hides the dialog. """
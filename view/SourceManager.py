@@ -85,13 +85,17 @@ class SourceManager(QtGui.QWidget):
         self.adjust_frequency_dialog.show()
 
     def add(self):
-        """Opens a file dialog to let the user select a source file (.tif, .tiff, .abf) and loads this file."""
-        fname,ok = QtWidgets.QFileDialog.getOpenFileName(self, 'Open file', directory='', filter='All (*.tiff *.tif *.abf);;TIFF (*.tiff *.tif);;ABF (*.abf)')
-        if ok:
-            if fname.endswith('abf'):
-                _ = ABFLoader(self.data_manager, fname)
-            else:
-                _ = TIFLoader(self.data_manager, fname)
+        """
+        Opens a file dialog to let the user select source files (.tif, .tiff, .abf) and loads these files.
+        Several selected TIF files are loaded as one source, ordered by their filenames.
+        """
+        fnames,_ = QtWidgets.QFileDialog.getOpenFileNames(self, 'Open file', directory='', filter='All (*.tiff *.tif *.abf);;TIFF (*.tiff *.tif);;ABF (*.abf)')
+        abf_fnames = [fname for fname in fnames if fname.endswith('abf')]
+        tif_fnames = sorted([fname for fname in fnames if not fname.endswith('abf')])
+        for fname in abf_fnames:
+            _ = ABFLoader(self.data_manager, fname)
+        if len(tif_fnames) > 0:
+            _ = TIFLoader(self.data_manager, tif_fnames)
 
     def movementCorrection(self):
         self.movement_correction.show()